@@ -0,0 +1,183 @@
+"""Run the benchmark suite, store and compare JSON baselines
+
+Usage (from the repository root):
+    python -m benchmarks.run --save benchmarks/baseline.json
+    python -m benchmarks.run --compare benchmarks/baseline.json --threshold 0.2
+    python -m benchmarks.run --filter "^loss\\." --list
+
+Every benchmark is timed in repeats of as many calls as fit in --min-time
+seconds, the median time per call is compared. The compare mode exits
+with status 1 if any benchmark is slower than (1 + threshold) times its baseline.
+
+benchmarks/baseline.json is a reference baseline, its "environment" entry
+records the machine it was measured on. Timings are only comparable on the
+same machine and setup, so before comparing, store a baseline of your own
+from a checkout without your changes (e.g. git stash):
+    python -m benchmarks.run --save benchmarks/baseline.json
+"""
+import re
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import contextlib
+import statistics
+from pathlib import Path
+import torch
+
+from benchmarks import suite
+
+LOGGER = logging.getLogger(__name__)
+
+
+def time_function(function, repeat=5, min_time=0.1):
+    """Time per call of function
+
+    Returns:
+        timing (dict): median, min and max time per call in seconds,
+            number of calls per repeat and the number of repeats
+    """
+    function()  # Warm up, e.g. lazy allocations
+
+    number = 1
+    while True:
+        elapsed = _time_calls(function, number)
+        if elapsed >= min_time or number >= 2**20:
+            break
+        number *= 2 if elapsed <= 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    times = [elapsed / number] + [_time_calls(function, number) / number for _ in range(repeat - 1)]
+    return {
+        "median": statistics.median(times),
+        "min": min(times),
+        "max": max(times),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def _time_calls(function, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        function()
+    return time.perf_counter() - start
+
+
+def run(names, repeat=5, min_time=0.1):
+    """Run the benchmarks
+
+    Returns:
+        report (dict): {"environment": {...}, "results": {name: timing}}
+    """
+    results = dict()
+    for name in names:
+        with contextlib.ExitStack() as exit_stack:
+            function = suite.setup(name, exit_stack)
+            results[name] = time_function(function, repeat=repeat, min_time=min_time)
+        LOGGER.info("{:<70} {:>12.3f} ms".format(name, results[name]["median"] * 1e3))
+
+    return {"environment": environment(), "results": results}
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "num_threads": torch.get_num_threads(),
+    }
+
+
+def compare(report, baseline, threshold=0.2):
+    """Compare benchmark results with a baseline
+
+    Args:
+        report (dict): output of run
+        baseline (dict): output of run, e.g. loaded from a baseline file
+        threshold (float): relative slowdown regarded as a regression
+
+    Returns:
+        comparison (list(dict)): name, baseline, current (median s), ratio and
+            regression flag, for the benchmarks in both report and baseline
+    """
+    comparison = list()
+    for name, timing in report["results"].items():
+        if name not in baseline["results"]:
+            continue
+        baseline_time = baseline["results"][name]["median"]
+        ratio = timing["median"] / baseline_time if baseline_time > 0 else float("inf")
+        comparison.append({
+            "name": name,
+            "baseline": baseline_time,
+            "current": timing["median"],
+            "ratio": ratio,
+            "regression": ratio > 1 + threshold,
+        })
+    return comparison
+
+
+def format_comparison(comparison):
+    lines = ["{:<70} {:>12} {:>12} {:>8}".format("benchmark", "baseline ms", "current ms", "ratio")]
+    for row in comparison:
+        lines.append("{:<70} {:>12.3f} {:>12.3f} {:>8.2f}{}".format(
+            row["name"], row["baseline"] * 1e3, row["current"] * 1e3, row["ratio"],
+            "  REGRESSION" if row["regression"] else ""))
+    return "\n".join(lines)
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description="Benchmark suite")
+    parser.add_argument("--filter", type=str, default=None, help="Regex, only run matching benchmarks")
+    parser.add_argument("--list", action="store_true", help="List the benchmarks and exit")
+    parser.add_argument("--save", type=Path, default=None, help="Store the results as JSON baseline")
+    parser.add_argument("--compare", type=Path, default=None, help="Compare with a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown regarded as regression")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timing repeats")
+    parser.add_argument("--min-time", type=float, default=0.1, help="Min. time (s) per timing repeat")
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
+    # Only the benchmark results, not the logs of the benchmarked code
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    LOGGER.setLevel(logging.INFO)
+
+    names = [name for name in suite.names() if args.filter is None or re.search(args.filter, name)]
+    if args.list:
+        print("\n".join(names))
+        return 0
+
+    baseline = None
+    if args.compare is not None:
+        if not args.compare.exists():
+            LOGGER.error("No baseline {}, store one first with --save {}".format(args.compare, args.compare))
+            return 2
+        with args.compare.open() as json_file:
+            baseline = json.load(json_file)
+
+    report = run(names, repeat=args.repeat, min_time=args.min_time)
+
+    if args.save is not None:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        with args.save.open("w") as json_file:
+            json.dump(report, json_file, indent=2)
+        LOGGER.info("Saved results to {}".format(args.save))
+
+    if baseline is not None:
+        if baseline.get("environment") != report["environment"]:
+            LOGGER.warning("The baseline was measured in another environment, {}".format(
+                baseline.get("environment")))
+        comparison = compare(report, baseline, threshold=args.threshold)
+        print(format_comparison(comparison))
+        if any(row["regression"] for row in comparison):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
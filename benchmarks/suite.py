@@ -0,0 +1,281 @@
+"""Benchmark cases
+
+Every case is registered with a name and a setup function. The setup creates
+the synthetic inputs (production shapes: B = 100, N = 10/50, K = 10, D = 1-16)
+and returns the function to time, so that only the benchmarked call is timed.
+Cases which need temporary files clean them up through the ExitStack.
+"""
+import sys
+import tempfile
+import subprocess
+from pathlib import Path
+import numpy as np
+import torch
+import h5py
+
+import src.loss as custom_loss
+import src.metrics as metrics
+import src.utils as utils
+from src.ensemble import ensemble
+from src.ensemble import simple_regressor
+from src.distilled import cifar_resnet_distilled
+from src.dataloaders import augmentation
+from src.dataloaders import cifar10_ensemble_pred
+from src.dataloaders import cifar10_corrupted
+from src.dataloaders import cifar10_benchmark_model_predictions
+from src.dataloaders import gaussian
+from src.dataloaders import gaussian_sinus
+from src.dataloaders import one_dim_regression
+from src.experiments.cifar10 import resnet_utils
+
+BENCHMARKS = dict()
+
+BATCH_SIZE = 100
+ENSEMBLE_SIZES = (10, 50)
+NUM_CLASSES = 10
+TARGET_DIMS = (1, 16)
+NUM_ITEMS = 100
+
+# The training import path, which should not pull in plotting, TF or git
+CORE_MODULES = ("src.loss", "src.metrics", "src.ensemble.ensemble")
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def benchmark(name):
+    """Register setup(exit_stack) -> function as benchmark case 'name'"""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _generator():
+    return torch.Generator().manual_seed(0)
+
+
+def _probabilities(*shape):
+    return torch.softmax(torch.randn(shape, generator=_generator()), dim=-1)
+
+
+def _register_losses():
+    for ensemble_size in ENSEMBLE_SIZES:
+        for target_dim in TARGET_DIMS:
+            shape = "B{}_N{}_D{}".format(BATCH_SIZE, ensemble_size, target_dim)
+
+            @benchmark("loss.gaussian_neg_log_likelihood/" + shape)
+            def _(exit_stack, ensemble_size=ensemble_size, target_dim=target_dim):
+                generator = _generator()
+                mean = torch.randn((BATCH_SIZE, target_dim), generator=generator)
+                var = torch.rand((BATCH_SIZE, target_dim), generator=generator) + 0.1
+                target = torch.randn((BATCH_SIZE, ensemble_size, target_dim), generator=generator)
+                return lambda: custom_loss.gaussian_neg_log_likelihood((mean, var), target)
+
+            @benchmark("loss.inv_wish_nll/" + shape)
+            def _(exit_stack, ensemble_size=ensemble_size, target_dim=target_dim):
+                generator = _generator()
+                psi = torch.rand((BATCH_SIZE, target_dim), generator=generator) + 0.1
+                nu = torch.rand((BATCH_SIZE, 1), generator=generator) + target_dim + 1
+                target = torch.rand((BATCH_SIZE, ensemble_size, target_dim), generator=generator) + 0.1
+                return lambda: custom_loss.inv_wish_nll((psi, nu), target)
+
+            @benchmark("loss.norm_inv_wish_nll/" + shape)
+            def _(exit_stack, ensemble_size=ensemble_size, target_dim=target_dim):
+                generator = _generator()
+                mu_0 = torch.randn((BATCH_SIZE, target_dim), generator=generator)
+                lambda_ = torch.rand((BATCH_SIZE, 1), generator=generator) + 0.1
+                psi = torch.rand((BATCH_SIZE, target_dim), generator=generator) + 0.1
+                nu = torch.rand((BATCH_SIZE, 1), generator=generator) + target_dim + 1
+                mean = torch.randn((BATCH_SIZE, ensemble_size, target_dim), generator=generator)
+                var = torch.rand((BATCH_SIZE, ensemble_size, target_dim), generator=generator) + 0.1
+                return lambda: custom_loss.norm_inv_wish_nll((mu_0, lambda_, psi, nu), (mean, var))
+
+        shape = "B{}_N{}_K{}".format(BATCH_SIZE, ensemble_size, NUM_CLASSES)
+
+        @benchmark("loss.dirichlet_nll/" + shape)
+        def _(exit_stack, ensemble_size=ensemble_size):
+            alphas = torch.rand((BATCH_SIZE, NUM_CLASSES), generator=_generator()) + 0.5
+            target = _probabilities(BATCH_SIZE, ensemble_size, NUM_CLASSES)
+            return lambda: custom_loss.dirichlet_nll(alphas, target)
+
+
+def _register_metrics():
+    for binning in ("equal_mass", "equal_width"):
+        @benchmark("metrics.ece/{}_B10000_K{}".format(binning, NUM_CLASSES))
+        def _(exit_stack, binning=binning):
+            predictions = _probabilities(10000, NUM_CLASSES).numpy()
+            labels = np.random.RandomState(0).randint(0, NUM_CLASSES, 10000)
+            return lambda: metrics.ece(predictions, labels, num_bins=10, binning=binning)
+
+    @benchmark("metrics.ClassificationEvaluator/B10000_K{}".format(NUM_CLASSES))
+    def _(exit_stack):
+        predictions = _probabilities(10000, NUM_CLASSES).numpy()
+        labels = np.random.RandomState(0).randint(0, NUM_CLASSES, 10000)
+
+        def evaluate():
+            evaluator = metrics.ClassificationEvaluator()
+            evaluator.update(labels, predictions)
+            return evaluator.compute()
+        return evaluate
+
+    for ensemble_size in ENSEMBLE_SIZES:
+        @benchmark("metrics.uncertainty_separation_entropy/B{}_N{}_K{}".format(BATCH_SIZE, ensemble_size,
+                                                                               NUM_CLASSES))
+        def _(exit_stack, ensemble_size=ensemble_size):
+            predictions = _probabilities(BATCH_SIZE, ensemble_size, NUM_CLASSES)
+            return lambda: metrics.uncertainty_separation_entropy(predictions)
+
+        @benchmark("metrics.uncertainty_separation_gaussian_mixture/B{}_N{}_D1".format(BATCH_SIZE, ensemble_size))
+        def _(exit_stack, ensemble_size=ensemble_size):
+            generator = _generator()
+            predictions = torch.cat((torch.randn((BATCH_SIZE, ensemble_size, 1), generator=generator),
+                                     torch.rand((BATCH_SIZE, ensemble_size, 1), generator=generator)), dim=-1)
+            return lambda: metrics.uncertainty_separation_gaussian_mixture(predictions)
+
+    # Uncertainty grid of the 2D experiments
+    @benchmark("metrics.uncertainty_separation_gaussian_mixture/chunked_B1000000_N10_D1")
+    def _(exit_stack):
+        generator = _generator()
+        predictions = torch.cat((torch.randn((1000000, 10, 1), generator=generator),
+                                 torch.rand((1000000, 10, 1), generator=generator)), dim=-1)
+        return lambda: metrics.uncertainty_separation_gaussian_mixture(predictions, chunk_size=2**16)
+
+    for num_measures in (1, 3):
+        @benchmark("utils.sparsification_error/B10000_D1_M{}".format(num_measures))
+        def _(exit_stack, num_measures=num_measures):
+            generator = _generator()
+            y_true = torch.randn((10000, 1), generator=generator)
+            y_pred = torch.randn((10000, 1), generator=generator)
+            uncert_meas = torch.rand((10000, num_measures), generator=generator).squeeze(-1)
+            return lambda: utils.sparsification_error(y_true, y_pred, uncert_meas, num_partitions=100)
+
+
+def _register_models():
+    for ensemble_size in ENSEMBLE_SIZES:
+        for stacked in (False, True):
+            name = "Ensemble.get_logits/{}B{}_N{}".format("stacked_" if stacked else "", BATCH_SIZE,
+                                                          ensemble_size)
+
+            @benchmark(name)
+            def _(exit_stack, ensemble_size=ensemble_size, stacked=stacked):
+                torch.manual_seed(0)
+                prob_ensemble = ensemble.Ensemble(output_size=2, stacked=stacked)
+                prob_ensemble.add_multiple(ensemble_size, lambda: simple_regressor.Model(
+                    layer_sizes=[1, 50, 50, 2], loss_function=custom_loss.gaussian_nll_1d))
+                inputs = torch.randn((BATCH_SIZE, 1), generator=_generator())
+
+                def get_logits():
+                    with torch.no_grad():
+                        return prob_ensemble.get_logits(inputs)
+                return get_logits
+
+    @benchmark("CifarResnetLogits.predict_logits/B{}_S100".format(BATCH_SIZE))
+    def _(exit_stack):
+        torch.manual_seed(0)
+        model = cifar_resnet_distilled.CifarResnetLogits(None, resnet_utils.BasicBlock, [3, 2, 2, 2])
+        model.eval_mode()
+        inputs = torch.rand((BATCH_SIZE, 3, 32, 32), generator=_generator())
+
+        def predict_logits():
+            with torch.no_grad():
+                return model.predict_logits(inputs)
+        return predict_logits
+
+
+def _fetch_items(data_set, batched=False):
+    """Fetch NUM_ITEMS items, one by one or as one batch"""
+    indices = np.random.RandomState(0).permutation(len(data_set))[:NUM_ITEMS]
+    if batched:
+        return lambda: data_set[indices]
+    return lambda: [data_set[index] for index in indices]
+
+
+def _images(num_samples):
+    return np.random.RandomState(0).randint(0, 256, (num_samples, 32, 32, 3)).astype(np.uint8)
+
+
+def _ensemble_predictions_arrays(num_samples, ensemble_size=10):
+    rng = np.random.RandomState(0)
+    logits = rng.randn(num_samples, ensemble_size, NUM_CLASSES).astype(np.float32)
+    predictions = np.exp(logits) / np.exp(logits).sum(axis=-1, keepdims=True)
+    return _images(num_samples), predictions, logits, rng.randint(0, NUM_CLASSES, num_samples)
+
+
+def _register_datasets():
+    num_samples = 5000
+
+    for batched in (False, True):
+        mode = "batch" if batched else "items"
+
+        for augment in (False, True):
+            @benchmark("cifar10_ensemble_pred.CustomSet/{}{}".format("augmented_" if augment else "", mode))
+            def _(exit_stack, batched=batched, augment=augment):
+                imgs, predictions, logits, targets = _ensemble_predictions_arrays(num_samples)
+                data_augmentation = augmentation.BatchAugmentation(seed=0) if augment else None
+                data_set = cifar10_ensemble_pred.CustomSet(imgs, predictions, logits, targets,
+                                                           cifar10_ensemble_pred.transforms.ToTensor(),
+                                                           data_augmentation)
+                return _fetch_items(data_set, batched)
+
+        @benchmark("cifar10_ensemble_pred.LazyCustomSet/" + mode)
+        def _(exit_stack, batched=batched):
+            tmp_dir = Path(exit_stack.enter_context(tempfile.TemporaryDirectory()))
+            imgs, predictions, logits, targets = _ensemble_predictions_arrays(num_samples)
+            with h5py.File(tmp_dir / "ensemble_predictions.h5", "w") as f:
+                grp = f.create_group("train")
+                for field, values in zip(("data", "predictions", "logits", "targets"),
+                                         (imgs, predictions, logits, targets)):
+                    grp.create_dataset(field, data=values)
+            data_set = cifar10_ensemble_pred.LazyCustomSet(tmp_dir / "ensemble_predictions.h5", "train",
+                                                           transform=cifar10_ensemble_pred.transforms.ToTensor())
+            exit_stack.callback(lambda: data_set._file and data_set._file.close())
+            return _fetch_items(data_set, batched)
+
+        @benchmark("cifar10_corrupted.CustomSet/" + mode)
+        def _(exit_stack, batched=batched):
+            labels = np.random.RandomState(0).randint(0, NUM_CLASSES, num_samples)
+            return _fetch_items(cifar10_corrupted.CustomSet(_images(num_samples), labels), batched)
+
+        @benchmark("cifar10_benchmark_model_predictions.CustomSet/" + mode)
+        def _(exit_stack, batched=batched):
+            _, predictions, _, targets = _ensemble_predictions_arrays(num_samples, ensemble_size=1)
+            data_set = cifar10_benchmark_model_predictions.CustomSet(predictions[:, 0, :], targets)
+            return _fetch_items(data_set, batched)
+
+    csv_data_sets = {
+        "gaussian.SyntheticGaussianData": lambda store_file: gaussian.SyntheticGaussianData(
+            mean_0=[0, 0], mean_1=[1, 0], cov_0=np.eye(2), cov_1=np.eye(2), store_file=store_file,
+            n_samples=num_samples),
+        "gaussian_sinus.GaussianSinus": lambda store_file: gaussian_sinus.GaussianSinus(
+            store_file=store_file, n_samples=num_samples),
+        "one_dim_regression.SyntheticRegressionData": lambda store_file: one_dim_regression.SyntheticRegressionData(
+            store_file=store_file, n_samples=num_samples),
+    }
+    for name, create in csv_data_sets.items():
+        @benchmark(name + "/items")
+        def _(exit_stack, create=create):
+            tmp_dir = Path(exit_stack.enter_context(tempfile.TemporaryDirectory()))
+            np.random.seed(0)
+            return _fetch_items(create(tmp_dir / "data"))
+
+
+def _register_imports():
+    @benchmark("import.core")
+    def _(exit_stack):
+        command = [sys.executable, "-c", "import " + ", ".join(CORE_MODULES)]
+        return lambda: subprocess.run(command, cwd=ROOT_DIR, check=True)
+
+
+_register_imports()
+_register_losses()
+_register_metrics()
+_register_models()
+_register_datasets()
+
+
+def setup(name, exit_stack):
+    """Create the function to time for benchmark 'name'"""
+    return BENCHMARKS[name](exit_stack)
+
+
+def names():
+    return list(BENCHMARKS)
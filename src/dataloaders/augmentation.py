@@ -0,0 +1,118 @@
+"""Batched data augmentation
+
+Tensor counterpart of
+    transforms.Compose([transforms.RandomCrop(32, padding=4),
+                        transforms.RandomHorizontalFlip()])
+for a whole batch of (B, H, W, C) images, without converting to PIL.
+The crop and the flip are done in a single gather from the zero padded batch.
+
+With a seed, the crop and flip of a sample only depend on
+(seed, epoch, sample index), which makes the augmentation reproducible
+regardless of batching and of the number of DataLoader workers.
+The training loops advance the epoch before every epoch (advance_epoch),
+so that every epoch gets new augmentations. Note that persistent DataLoader
+workers keep their own copy of the augmentation and do not see the new epoch.
+"""
+import numpy as np
+import torch
+
+_GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+class BatchAugmentation:
+    """Random crop (with zero padding) and horizontal flip of a batch
+
+    Args:
+        padding (int): padding on every side before cropping
+        flip (bool): randomly flip images horizontally (with probability 0.5)
+        seed (int): seed for reproducible augmentations (see module docstring),
+            if None torch's default generator is used.
+    """
+    def __init__(self, padding=4, flip=True, seed=None):
+        self.padding = padding
+        self.flip = flip
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def __call__(self, imgs, indices=None):
+        """
+        Args:
+            imgs (torch.tensor/np.ndarray): (B, H, W, C)
+            indices (array like(int)): dataset indices of the samples,
+                required if a seed is set.
+
+        Returns:
+            torch.tensor: (B, H, W, C) augmented images, same dtype and device as imgs
+        """
+        imgs = torch.as_tensor(imgs)
+        batch_size, height, width, _ = imgs.shape
+        offsets_y, offsets_x, flips = self._random_parameters(batch_size, indices)
+        offsets_y, offsets_x, flips = (values.to(imgs.device) for values in (offsets_y, offsets_x, flips))
+
+        padded = torch.nn.functional.pad(imgs, (0, 0, self.padding, self.padding, self.padding, self.padding))
+
+        rows = offsets_y[:, None] + torch.arange(height, device=imgs.device)
+        cols = torch.arange(width, device=imgs.device).expand(batch_size, width)
+        cols = torch.where(flips[:, None], width - 1 - cols, cols) + offsets_x[:, None]
+        batch = torch.arange(batch_size, device=imgs.device)
+
+        return padded[batch[:, None, None], rows[:, :, None], cols[:, None, :]]
+
+    def _random_parameters(self, batch_size, indices):
+        num_offsets = 2 * self.padding + 1
+        if self.seed is None:
+            offsets = torch.randint(num_offsets, (2, batch_size))
+            flips = torch.rand(batch_size) < 0.5
+            return offsets[0], offsets[1], flips & self.flip
+
+        if indices is None:
+            raise ValueError("Dataset indices are needed for seeded augmentation")
+
+        random_bits = _sample_hash(self.seed, self.epoch, np.asarray(indices).reshape(-1))
+        offsets_y = random_bits % np.uint64(num_offsets)
+        offsets_x = (random_bits >> np.uint64(16)) % np.uint64(num_offsets)
+        flips = (random_bits >> np.uint64(32)) & np.uint64(1)
+
+        return (torch.from_numpy(offsets_y.astype(np.int64)),
+                torch.from_numpy(offsets_x.astype(np.int64)),
+                torch.from_numpy(flips.astype(bool)) & self.flip)
+
+
+def advance_epoch(data_loader):
+    """Advance the epoch of the augmentation of the data set of data_loader, if any"""
+    augmentation = find_augmentation(getattr(data_loader, "dataset", None))
+    if augmentation is not None:
+        augmentation.set_epoch(augmentation.epoch + 1)
+
+
+def find_augmentation(data_set):
+    """BatchAugmentation of data_set, None if it does not augment
+
+    Sets which wrap another set in a 'dataset' attribute
+    (e.g. torch.utils.data.Subset, teacher_cache.IndexedDataset) are unwrapped.
+    """
+    while data_set is not None:
+        augmentation = getattr(data_set, "augmentation", None)
+        if isinstance(augmentation, BatchAugmentation):
+            return augmentation
+        data_set = getattr(data_set, "dataset", None)
+    return None
+
+
+def _sample_hash(seed, epoch, indices):
+    """Random 64 bit integers, one per index (splitmix64)"""
+    key = _splitmix64(_splitmix64(np.array([seed], dtype=np.uint64)) + np.uint64(epoch))
+    return _splitmix64(key + indices.astype(np.uint64))
+
+
+def _splitmix64(values):
+    with np.errstate(over="ignore"):
+        values = values + _GOLDEN_GAMMA
+        values = (values ^ (values >> np.uint64(30))) * _MIX_1
+        values = (values ^ (values >> np.uint64(27))) * _MIX_2
+        return values ^ (values >> np.uint64(31))
@@ -0,0 +1,71 @@
+"""Batch level data loading
+
+The in-memory CIFAR sets (CustomSet's) also accept a sequence of indices in
+__getitem__ and then return the whole batch, sliced from the underlying arrays
+and converted to tensors at once. batch_loader creates a DataLoader which hands
+whole batches of indices to the set (through a BatchSampler), instead of
+fetching and collating the samples one by one.
+
+Usage:
+    loader = batch_loader(data.set, batch_size=100, shuffle=True)
+"""
+import numpy as np
+import torch
+
+
+def batch_loader(data_set, batch_size, shuffle=False, drop_last=False, **kwargs):
+    """DataLoader which fetches whole batches from a set
+
+    Args:
+        data_set: set which accepts a sequence of indices in __getitem__
+        batch_size (int)
+        shuffle (bool)
+        drop_last (bool)
+        kwargs: passed on to the DataLoader, e.g. num_workers
+
+    Returns:
+        torch.utils.data.DataLoader
+    """
+    if shuffle:
+        sampler = torch.utils.data.RandomSampler(data_set)
+    else:
+        sampler = torch.utils.data.SequentialSampler(data_set)
+    batch_sampler = torch.utils.data.BatchSampler(sampler,
+                                                  batch_size=batch_size,
+                                                  drop_last=drop_last)
+
+    # batch_size=None disables the automatic collation, the set already returns batches
+    return torch.utils.data.DataLoader(data_set,
+                                       sampler=batch_sampler,
+                                       batch_size=None,
+                                       **kwargs)
+
+
+def is_batch_index(index):
+    """Check if index is a sequence of indices rather than a single one"""
+    return np.ndim(index) > 0
+
+
+def batch_selection(index):
+    """Selection for a batch of indices
+
+    Consecutive indices (e.g. from a sequential sampler) give a slice,
+    which selects a view rather than a copy of the underlying array.
+    """
+    index = np.asarray(index, dtype=np.int64)
+    if index.shape[0] > 0 and np.all(np.diff(index) == 1):
+        return slice(index[0], index[-1] + 1)
+    return index
+
+
+def images_to_tensor(imgs):
+    """Batched transforms.ToTensor
+
+    Args:
+        imgs (np.ndarray(uint8)): (B, H, W, C)
+
+    Returns:
+        torch.tensor: (B, C, H, W) with values in [0, 1]
+    """
+    imgs = torch.from_numpy(np.ascontiguousarray(imgs))
+    return imgs.permute(0, 3, 1, 2).float().div(255).contiguous()
@@ -2,10 +2,9 @@
 import logging
 import torch
 import torchvision
-import torchvision.transforms as transforms
 import numpy as np
-import matplotlib.pyplot as plt
-from PIL import Image
+import src.dataloaders.batched as batched
+from src.dataloaders.augmentation import BatchAugmentation
 
 
 class Cifar10Data:
@@ -22,25 +21,26 @@ class Cifar10Data:
                                              num_workers=2)
     """
 
-    def __init__(self, ind=None, train=True, augmentation=False, torch_data=True, root="./data"):
+    def __init__(self, ind=None, train=True, augmentation=False, torch_data=True, root="./data",
+                 augmentation_seed=None):
         self._log = logging.getLogger(self.__class__.__name__)
 
         self.torch_data = torch_data
         if augmentation:
-            self.transform = transforms.Compose([
-                transforms.RandomCrop(32, padding=4),
-                transforms.RandomHorizontalFlip()])
+            # Random crop (padding 4) and horizontal flip, see augmentation.BatchAugmentation
+            self.augmentation = BatchAugmentation(padding=4, seed=augmentation_seed)
 
         else:
-            self.transform = None
+            self.augmentation = None
 
         self.set = torchvision.datasets.CIFAR10(root=root,
                                                 train=train,
                                                 download=True)
 
+        self.set.targets = np.array(self.set.targets)
         if ind is not None:
             self.set.data = np.array(self.set.data)[ind, :, :]
-            self.set.targets = np.array(self.set.targets)[ind]
+            self.set.targets = self.set.targets[ind]
 
         self.input_size = self.set.data.shape[0]
         self.classes = ("plane", "car", "bird", "cat", "deer", "dog", "frog",
@@ -53,23 +53,35 @@ class Cifar10Data:
     def __getitem__(self, index):
         """
         Args:
-            index (int): Index
+            index (int): Index, or a sequence of indices for a whole batch (see batched.batch_loader)
 
         Returns:
             tuple: (image, ensemble_preds, ensemble_logits, target) where target is index of the target class.
         """
+        if batched.is_batch_index(index):
+            selection = batched.batch_selection(index)
+            imgs = self.set.data[selection]
+            targets = torch.as_tensor(self.set.targets[selection])
+            if self.augmentation is not None:
+                imgs = self.augmentation(imgs, index).numpy()
+
+            if self.torch_data:
+                imgs = batched.images_to_tensor(imgs)
+            else:
+                imgs = torch.from_numpy(imgs / 255)
+
+            return imgs, targets
+
         img, target = self.set.data[index], self.set.targets[index]
 
+        if self.augmentation is not None:
+            img = self.augmentation(img[np.newaxis], [index])[0].numpy()
+
         if self.torch_data:
-            img = Image.fromarray(img)
+            img = batched.images_to_tensor(img[np.newaxis])[0]
         else:
             img = img / 255
 
-        if self.transform is not None:
-            img = transforms.ToTensor()(self.transform(img))
-        elif self.torch_data:
-            img = (transforms.ToTensor()(img))
-
         target = torch.tensor(target)
 
         return img, target
@@ -77,6 +89,7 @@ class Cifar10Data:
 
 def main():
     """Entry point for debug visualisation"""
+    import matplotlib.pyplot as plt
     # get some random training images
     data = Cifar10Data()
 
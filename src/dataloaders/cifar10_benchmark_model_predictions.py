@@ -2,6 +2,7 @@ import logging
 import torch
 import h5py
 import numpy as np
+import src.dataloaders.batched as batched
 
 
 class Cifar10DataPredictions:
@@ -134,11 +135,18 @@ class CustomSet:
     def __getitem__(self, index):
         """
         Args:
-            index (int): Index
+            index (int): Index, or a sequence of indices for a whole batch (see batched.batch_loader)
 
         Returns:
             tuple: (prediction, label) where label is index of the target class.
         """
+        if batched.is_batch_index(index):
+            selection = batched.batch_selection(index)
+            preds = torch.from_numpy(np.ascontiguousarray(self.predictions[selection]))
+            targets = torch.as_tensor(self.targets[selection], dtype=torch.int64)
+
+            return preds, targets
+
         preds = torch.tensor(self.predictions[index, :])
         target = torch.tensor(self.targets[index], dtype=torch.int64)
 
@@ -1,16 +1,21 @@
+import os
 import logging
+from pathlib import Path
 import torch
 import torchvision
 import torchvision.transforms as transforms
 import numpy as np
-import matplotlib.pyplot as plt
 from PIL import Image
 import h5py
+import src.dataloaders.batched as batched
 
 
 class Cifar10DataCorrupted:
     """CIFAR data with corruptions, wrapper. To create an h5py file from .npy files, use the make_h5py_data_file()
         function below
+
+    Only the images of the requested intensity are read from the file, which is kept open (see open_h5_file)
+    so that a sweep over corruptions and intensities does not reopen it for every subset.
     """
 
     def __init__(self, corruption, intensity, data_dir="data/", torch_data=True, ind=None):
@@ -37,37 +42,30 @@ class Cifar10DataCorrupted:
             else:
 
                 filepath = data_dir + "dataloaders/data/CIFAR-10-C/corrupted_data.h5"
-                with h5py.File(filepath, 'r') as f:
-                    grp = f[corruption]
-                    data = grp["data"][()]
-                    grp = f["labels"]
-                    labels = grp["labels"][()]
+                f = open_h5_file(filepath)
 
+                # The five intensities are stored after each other, read only the requested one
                 set_size = 10000
-                data = data[((intensity - 1) * set_size):(intensity * set_size), :, :, :]
-                labels = labels[((intensity - 1) * set_size):(intensity * set_size)]
+                start, stop = (intensity - 1) * set_size, intensity * set_size
+                data = f[corruption]["data"][start:stop]
+                labels = f["labels"]["labels"][start:stop]
 
             if ind is not None:
                 data = data[ind, :, :, :]
-                labels = [ind]
+                labels = np.asarray(labels)[ind]
 
             self.set = CustomSet(data, labels, torch_data=torch_data)
 
             self.classes = ("plane", "car", "bird", "cat", "deer", "dog", "frog",
                             "horse", "ship", "truck")
             self.num_classes = len(self.classes)
-            self.set = CustomSet(data, labels, torch_data=torch_data)
-
-            self.classes = ("plane", "car", "bird", "cat", "deer", "dog", "frog",
-                            "horse", "ship", "truck")
-            self.num_classes = len(self.classes)
 
 
 class CustomSet:
 
     def __init__(self, data, labels, torch_data=True):
         self.data = data
-        self.labels = labels
+        self.labels = np.asarray(labels)
         self.input_size = self.data.shape[0]
         self.torch_data = torch_data
 
@@ -77,10 +75,20 @@ class CustomSet:
     def __getitem__(self, index):
         """
         Args:
-            index (int): Index
+            index (int): Index, or a sequence of indices for a whole batch (see batched.batch_loader)
         Returns:
             tuple: (image, target) where target is index of the target class.
         """
+        if batched.is_batch_index(index):
+            selection = batched.batch_selection(index)
+            imgs = self.data[selection]
+            if self.torch_data:
+                imgs = batched.images_to_tensor(imgs)
+            else:
+                imgs = torch.from_numpy(imgs / 255)
+
+            return imgs, torch.from_numpy(np.ascontiguousarray(self.labels[selection]))
+
         img = self.data[index]
         # doing this so that it is consistent with all other datasets
         # to return a PIL Image
@@ -95,14 +103,41 @@ class CustomSet:
         return img, target
 
 
-def make_h5py_data_file():
-    """Save all corrupted data sets into one h5 file"""
+_OPEN_FILES = dict()
+
+
+def open_h5_file(filepath):
+    """Open h5 file for reading, the file handle is reused for later calls (in the same process)"""
+    key = (str(Path(filepath).resolve()), os.getpid())
+    if key not in _OPEN_FILES or not _OPEN_FILES[key]:
+        _OPEN_FILES[key] = h5py.File(filepath, 'r')
+    return _OPEN_FILES[key]
+
+
+def close_h5_files():
+    """Close the files opened with open_h5_file"""
+    for key, f in list(_OPEN_FILES.items()):
+        if key[1] == os.getpid() and f:
+            f.close()
+        del _OPEN_FILES[key]
+
+
+def make_h5py_data_file(data_dir="data/CIFAR-10-C/", chunk_size=None, compression=None):
+    """Save all corrupted data sets into one h5 file
+
+    Args:
+        data_dir (str): directory with the CIFAR-10-C .npy files
+        chunk_size (int): store the images in chunks of chunk_size images,
+            None gives a contiguous layout (or h5py's default chunks, if compressed)
+        compression (str): h5py compression filter, e.g. "gzip" or "lzf"
+    """
 
     corruption_list = ["brightness", "contrast", "defocus_blur", "elastic_transform", "fog", "frost", "gaussian_blur",
                        "gaussian_noise", "glass_blur", "impulse_noise", "motion_blur", "pixelate", "saturate",
                        "shot_noise", "snow", "spatter", "speckle_noise", "zoom_blur"]
 
-    data_dir = "data/CIFAR-10-C/"
+    # An open read handle would block overwriting the file
+    close_h5_files()
     hf = h5py.File(data_dir + "corrupted_data.h5", 'w')
     grp = hf.create_group("labels")
     labels = np.load(data_dir + "labels.npy")
@@ -113,12 +148,14 @@ def make_h5py_data_file():
         grp = hf.create_group(corruption)
 
         data = np.load(data_dir + corruption + ".npy")
-        grp.create_dataset("data", data=data)
+        chunks = (chunk_size, ) + data.shape[1:] if chunk_size is not None else None
+        grp.create_dataset("data", data=data, chunks=chunks, compression=compression)
     hf.close()
 
 
 def main():
     """Entry point for debug visualisation"""
+    import matplotlib.pyplot as plt
     # get some random training images
     data = Cifar10DataCorrupted(corruption="brightness")
     loader = torch.utils.data.DataLoader(data.set,
@@ -1,33 +1,50 @@
+import os
 import logging
 import h5py
 import torch
 import torchvision
 import torchvision.transforms as transforms
 import numpy as np
-import matplotlib.pyplot as plt
 from PIL import Image
+import src.dataloaders.batched as batched
+from src.dataloaders.augmentation import BatchAugmentation
 
 
 class Cifar10Data:
     """CIFAR data wrapper with ensemble predictions,
     data is organised as ((img, ensemble preds, ensemble logits), labels) (To create an h5 file with ensemble
     predictions you can use ensemble_predictions() ensemble_predictions.py from src.experiments.cifar10)
+
+    With lazy=True nothing is read up front, the samples are instead read from the h5 file when requested
+    (see LazyCustomSet), optionally through a cache in shared memory (shared_cache=True).
     """
 
     def __init__(self, ind=None, train=True, augmentation=False, corrupted=False,
-                 data_dir="src/dataloaders/data/ensemble_predictions/"):
+                 data_dir="src/dataloaders/data/ensemble_predictions/", lazy=False, shared_cache=False,
+                 augmentation_seed=None):
         self._log = logging.getLogger(self.__class__.__name__)
 
+        self.transform = transforms.ToTensor()
         if augmentation:
-            self.transform = transforms.Compose([
-                transforms.RandomCrop(32, padding=4),
-                transforms.RandomHorizontalFlip(),
-                transforms.ToTensor()])
+            # Random crop (padding 4) and horizontal flip, see augmentation.BatchAugmentation
+            self.augmentation = BatchAugmentation(padding=4, seed=augmentation_seed)
         else:
-            self.transform = transforms.ToTensor()
+            self.augmentation = None
 
         filepath = data_dir + "ensemble_predictions.h5"
 
+        self.classes = ("plane", "car", "bird", "cat", "deer", "dog", "frog",
+                        "horse", "ship", "truck")
+        self.num_classes = len(self.classes)
+
+        if lazy:
+            if corrupted:
+                self._log.warning("Corrupted data is not supported in lazy mode, loading all data")
+            else:
+                self.set = LazyCustomSet(filepath, "train" if train else "test", ind=ind, transform=self.transform,
+                                         augmentation=self.augmentation, shared_cache=shared_cache)
+                return
+
         with h5py.File(filepath, 'r') as f:
             if train:
                 data_grp = f["train"]
@@ -75,23 +92,20 @@ class Cifar10Data:
             data[2] = np.concatenate((data[2], np.concatenate(corrupted_logits, axis=0)), axis=0)
             targets = np.concatenate((np.concatenate(corrupted_targets, axis=0)), axis=0)
 
-        self.set = CustomSet(data[0], data[1], data[2], targets, self.transform)
+        self.set = CustomSet(data[0], data[1], data[2], targets, self.transform, self.augmentation)
 
         ensemble_predictions = np.argmax(np.mean(self.set.data[1], axis=1), axis=-1)
         acc = np.mean(ensemble_predictions == np.squeeze(self.set.targets))
         print("Ensemble accuracy: {}".format(acc))
 
-        self.classes = ("plane", "car", "bird", "cat", "deer", "dog", "frog",
-                        "horse", "ship", "truck")
-        self.num_classes = len(self.classes)
-
 
 class CustomSet():
 
-    def __init__(self, img, predictions, logits, targets, transform):
+    def __init__(self, img, predictions, logits, targets, transform, augmentation=None):
         self.data = (img, predictions, logits)
         self.targets = targets
         self.transform = transform
+        self.augmentation = augmentation
 
         self.input_size = self.data[0].shape[0]
 
@@ -101,28 +115,152 @@ class CustomSet():
     def __getitem__(self, index):
         """
         Args:
-            index (int): Index
+            index (int): Index, or a sequence of indices for a whole batch (see batched.batch_loader)
+
+        Returns:
+            tuple: (image, ensemble_preds, ensemble_logits, target) where target is index of the target class.
+        """
+        if batched.is_batch_index(index):
+            selection = batched.batch_selection(index)
+            return _to_batch(self.data[0][selection], self.data[1][selection], self.data[2][selection],
+                             self.targets[selection], index, self.transform, self.augmentation)
+
+        (img, preds, logits), target = _to_batch(self.data[0][[index]], self.data[1][[index]], self.data[2][[index]],
+                                                 self.targets[[index]], [index], self.transform, self.augmentation)
+
+        return (img[0], preds[0], logits[0]), target[0]
+
+
+class LazyCustomSet:
+    """Lazily loaded counterpart of CustomSet
+
+    The h5 file is opened once per (DataLoader worker) process and samples are read by index,
+    so nothing is loaded at construction and memory does not grow with the number of ensemble members.
+    Several samples can be read at once, in contiguous chunks where possible, with read().
+
+    With shared_cache=True, samples that have been read are stored in tensors in shared memory, which
+    are visible to all DataLoader workers (forked after construction). Note that the cache is allocated for
+    the full data set, but only filled as samples are read.
+
+    Args:
+        filepath (str): ensemble predictions h5 file
+        group (str): "train" or "test"
+        ind (np.array): indices of the samples to use, defaults to all samples
+        transform (torchvision.transforms)
+        augmentation (augmentation.BatchAugmentation)
+        shared_cache (bool)
+    """
+
+    fields = ("data", "predictions", "logits", "targets")
+
+    def __init__(self, filepath, group, ind=None, transform=None, augmentation=None, shared_cache=False):
+        self.filepath = filepath
+        self.group = group
+        self.transform = transform
+        self.augmentation = augmentation
+
+        with h5py.File(filepath, 'r') as f:
+            grp = f[group]
+            num_samples = grp["targets"].shape[0]
+            formats = {field: (grp[field].shape[1:], grp[field].dtype) for field in self.fields}
+
+        self.ind = np.arange(num_samples) if ind is None else np.asarray(ind)
+        self.input_size = self.ind.shape[0]
+
+        self._file = None
+        self._pid = None
+
+        self._cache = None
+        self._cached = None
+        if shared_cache:
+            self._cache = {
+                field: torch.from_numpy(np.zeros((self.input_size,) + shape, dtype=dtype)).share_memory_()
+                for field, (shape, dtype) in formats.items()}
+            self._cached = torch.zeros(self.input_size, dtype=torch.bool).share_memory_()
+
+    def __len__(self):
+        return self.input_size
+
+    def __getstate__(self):
+        # h5py file handles can not be pickled (e.g. for spawned workers), they are reopened when needed
+        state = self.__dict__.copy()
+        state["_file"] = None
+        state["_pid"] = None
+        return state
+
+    def __getitem__(self, index):
+        """
+        Args:
+            index (int): Index, or a sequence of indices for a whole batch (see batched.batch_loader)
 
         Returns:
             tuple: (image, ensemble_preds, ensemble_logits, target) where target is index of the target class.
         """
-        img, preds, logits = self.data[0], self.data[1], self.data[2]
-        img, preds, logits, target = img[index], preds[index], logits[index], self.targets[index]
+        if batched.is_batch_index(index):
+            return _to_batch(*self.read(index), index, self.transform, self.augmentation)
+
+        (img, preds, logits), target = _to_batch(*self.read([index]), [index], self.transform, self.augmentation)
+
+        return (img[0], preds[0], logits[0]), target[0]
+
+    def read(self, indices):
+        """Read several samples
+
+        Args:
+            indices (array like(int)): positions in this set
+
+        Returns:
+            tuple: (images, ensemble_preds, ensemble_logits, targets) as np.ndarray's
+        """
+        indices = np.asarray(indices)
+
+        if self._cached is not None:
+            cached = self._cached[torch.from_numpy(indices)]
+            if cached.all():
+                return tuple(self._cache[field][indices].numpy() for field in self.fields)
+
+        values = self._read_file(self.ind[indices])
+
+        if self._cached is not None:
+            for field, value in zip(self.fields, values):
+                self._cache[field][indices] = torch.from_numpy(value)
+            self._cached[indices] = True
+
+        return values
+
+    def _read_file(self, file_indices):
+        """h5py needs increasing indices, read a sorted (contiguous if possible) block and reorder"""
+        unique_inds, inverse = np.unique(file_indices, return_inverse=True)
+        grp = self._h5_group()
+
+        if unique_inds[-1] - unique_inds[0] + 1 == unique_inds.shape[0]:
+            selection = slice(unique_inds[0], unique_inds[-1] + 1)
+        else:
+            selection = unique_inds
 
-        # doing this so that it is consistent with all other datasets
-        # to return a PIL Image
+        return tuple(grp[field][selection][inverse] for field in self.fields)
 
-        img = Image.fromarray(img)
+    def _h5_group(self):
+        if self._file is None or self._pid != os.getpid():
+            self._file = h5py.File(self.filepath, 'r')
+            self._pid = os.getpid()
+        return self._file[self.group]
 
-        if self.transform is not None:
-            img = self.transform(img)
 
-        preds = torch.tensor(preds)
-        logits = torch.tensor(logits)
-        target = torch.tensor(target)
+def _to_batch(imgs, preds, logits, targets, indices, transform, augmentation):
+    """Augment and convert a batch, as sliced from the arrays, to tensors"""
+    if augmentation is not None:
+        imgs = augmentation(imgs, indices).numpy()
 
-        return (img, preds, logits), target
+    if isinstance(transform, transforms.ToTensor):
+        imgs = batched.images_to_tensor(imgs)
+    elif transform is not None:
+        imgs = torch.stack([transform(Image.fromarray(img)) for img in imgs])
+    else:
+        imgs = torch.from_numpy(np.ascontiguousarray(imgs))
 
+    return (imgs, torch.from_numpy(np.ascontiguousarray(preds)), torch.from_numpy(np.ascontiguousarray(logits))), \
+        torch.from_numpy(np.ascontiguousarray(targets))
 
 
 def main():
@@ -152,6 +290,7 @@ def main():
 def imshow(img):
     """Imshow helper
     """
+    import matplotlib.pyplot as plt
     npimg = img.numpy()
     plt.imshow(np.transpose(npimg, (1, 2, 0)))
     plt.show()
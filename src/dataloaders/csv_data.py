@@ -0,0 +1,54 @@
+"""Array backing for the synthetic CSV data sets
+
+The CSV file is parsed once into a contiguous float32 array. Large files are
+instead converted to a binary .npy sidecar file (next to the CSV), which is
+memory-mapped. The sidecar is regenerated if the CSV file has changed since.
+"""
+import os
+import logging
+from pathlib import Path
+import numpy as np
+
+LOGGER = logging.getLogger(__name__)
+
+# CSV file size in bytes above which the data is memory-mapped
+MEMMAP_THRESHOLD = 64 * 2**20
+
+
+def load_csv(csv_file, memmap_threshold=MEMMAP_THRESHOLD):
+    """Load CSV data as a float32 array
+
+    Args:
+        csv_file (str/Path)
+        memmap_threshold (int): memory-map files larger than this (in bytes)
+
+    Returns:
+        np.ndarray/np.memmap: (num_rows, num_columns)
+    """
+    csv_file = Path(csv_file)
+    if csv_file.stat().st_size <= memmap_threshold:
+        return _parse(csv_file)
+
+    npy_file = sidecar_file(csv_file)
+    if not _is_up_to_date(npy_file, csv_file):
+        LOGGER.info("Converting {} to {}".format(csv_file, npy_file))
+        # Write to a temporary file first, so that other processes never see a partial file
+        tmp_file = npy_file.with_name("{}.{}.tmp".format(npy_file.name, os.getpid()))
+        with tmp_file.open("wb") as npy:
+            np.save(npy, _parse(csv_file))
+        os.replace(tmp_file, npy_file)
+
+    return np.load(npy_file, mmap_mode="r")
+
+
+def sidecar_file(csv_file):
+    csv_file = Path(csv_file)
+    return csv_file.with_name(csv_file.name + ".npy")
+
+
+def _parse(csv_file):
+    return np.loadtxt(csv_file, delimiter=",", dtype=np.float32, ndmin=2)
+
+
+def _is_up_to_date(npy_file, csv_file):
+    return npy_file.exists() and npy_file.stat().st_mtime_ns >= csv_file.stat().st_mtime_ns
@@ -2,7 +2,7 @@ from pathlib import Path
 import csv
 import numpy as np
 import torch.utils.data
-import matplotlib.pyplot as plt
+import src.dataloaders.csv_data as csv_data
 import logging
 
 
@@ -28,43 +28,37 @@ class SyntheticGaussianData(torch.utils.data.Dataset):
         self.ratio_0_to_1 = ratio_0_to_1
         self.file = Path(store_file)
         if self.file.exists() and reuse_data:
+            self.data = csv_data.load_csv(self.file)
             self.validate_dataset()
         else:
             self._log.info("Sampling new data")
             self.sample_new_data()
+            self.data = csv_data.load_csv(self.file)
+
+        if not self.sample:
+            # The grid has a fixed number of points
+            self.n_samples = self.data.shape[0]
 
     def __len__(self):
         return self.n_samples
 
     def __getitem__(self, index):
-        sample = None
-        with self.file.open(newline="") as csv_file:
-            csv_reader = csv.reader(csv_file, delimiter=",", quotechar="|")
-            for count, row in enumerate(csv_reader):
-                if count == index:
-                    sample = row
-                    break
+        sample = self.data[index]
         inputs = sample[:-1]
-        labels = int(float(sample[-1]))
+        labels = int(sample[-1])
         return (np.array(inputs,
-                         dtype=np.float32), np.array(labels, dtype=np.long))
+                         dtype=np.float32), np.array(labels, dtype=np.int64))
 
     def get_instance_of_label(self, label_requested):
-        sample = None
-        with self.file.open(newline="") as csv_file:
-            csv_reader = csv.reader(csv_file, delimiter=",", quotechar="|")
-            for row in csv_reader:
-                sample = row
-                label_found = int(float(sample[-1]))
-                if label_found == label_requested:
-                    break
-            if not sample:
-                self._log.error("No data points with label {} found".format(
-                    label_requested))
-        inputs = sample[:-1]
-        return (np.array(inputs,
-                         dtype=np.float32), np.array(label_found,
-                                                     dtype=np.long))
+        labels = self.data[:, -1].astype(np.int64)
+        matches = np.flatnonzero(labels == label_requested)
+        if matches.size == 0:
+            self._log.error("No data points with label {} found".format(
+                label_requested))
+            index = labels.shape[0] - 1
+        else:
+            index = matches[0]
+        return self[index]
 
     def sample_new_data(self):
         self.file.parent.mkdir(parents=True, exist_ok=True)
@@ -101,10 +95,9 @@ class SyntheticGaussianData(torch.utils.data.Dataset):
         np.savetxt(self.file, combined_data, delimiter=",")
 
     def validate_dataset(self):
-        with self.file.open(newline="") as csv_file:
-            csv_reader = csv.reader(csv_file, delimiter=",", quotechar="|")
-            assert len(self.mean_0) == len(next(csv_reader)) - 1
-            assert self.n_samples - 1 == sum(1 for row in csv_reader)
+        assert len(self.mean_0) == self.data.shape[1] - 1
+        if self.sample:
+            assert self.n_samples == self.data.shape[0]
 
     def get_full_data(self):
         tmp_raw_data = list()
@@ -115,6 +108,7 @@ class SyntheticGaussianData(torch.utils.data.Dataset):
 
 
 def plot_2d_data(data, ax):
+    import matplotlib.pyplot as plt
     inputs = data[:, :-1]
     print(inputs)
     labels = data[:, -1]
@@ -126,6 +120,7 @@ def plot_2d_data(data, ax):
 
 
 def main():
+    import matplotlib.pyplot as plt
     _, ax = plt.subplots()
     dataset = SyntheticGaussianData(mean_0=[0, 0],
                                     mean_1=[10, 0],
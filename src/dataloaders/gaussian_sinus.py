@@ -8,7 +8,7 @@ from pathlib import Path
 import csv
 import numpy as np
 import torch.utils.data
-import matplotlib.pyplot as plt
+import src.dataloaders.csv_data as csv_data
 
 
 class GaussianSinus(torch.utils.data.Dataset):
@@ -28,27 +28,23 @@ class GaussianSinus(torch.utils.data.Dataset):
 
         self.file = Path(store_file)
         if self.file.exists() and reuse_data:
+            self.data = csv_data.load_csv(self.file)
             self.validate_dataset()
         else:
             self._log.info("Sampling new data")
             self.sample_new_data()
+            self.data = csv_data.load_csv(self.file)
 
     def __len__(self):
         return self.n_samples
 
     def __getitem__(self, index):
-        sample = None
-        with self.file.open(newline="") as csv_file:
-            csv_reader = csv.reader(csv_file, delimiter=",", quotechar="|")
-            for count, row in enumerate(csv_reader):
-                if count == index:
-                    sample = row
-                    break
+        sample = self.data[index]
         inputs = sample[:-1]
-        targets = sample[-1]
+        targets = sample[-1:]
 
         return (np.array(inputs, dtype=np.float32),
-                np.array([targets], dtype=np.float32))
+                np.array(targets, dtype=np.float32))
 
     @staticmethod
     def x_to_y_mapping(x):
@@ -73,9 +69,7 @@ class GaussianSinus(torch.utils.data.Dataset):
         np.savetxt(self.file, combined_data, delimiter=",")
 
     def validate_dataset(self):
-        with self.file.open(newline="") as csv_file:
-            csv_reader = csv.reader(csv_file, delimiter=",", quotechar="|")
-            assert self.n_samples - 1 == sum(1 for row in csv_reader)
+        assert self.n_samples == self.data.shape[0]
 
     def get_full_data(self, sorted_=False):
         """Get full dataset as numpy array"""
@@ -90,6 +84,7 @@ class GaussianSinus(torch.utils.data.Dataset):
 
 
 def plot_reg_data(data, ax):
+    import matplotlib.pyplot as plt
     inputs = data[:, :-1]
     targets = data[:, -1]
     ax.scatter(inputs, targets)
@@ -97,6 +92,7 @@ def plot_reg_data(data, ax):
 
 
 def plot_uncert(ax, data, x):
+    import matplotlib.pyplot as plt
     inputs = data[:, :-1]
     targets = data[:, -1]
     mu = np.sin(x)
@@ -115,6 +111,7 @@ def plot_uncert(ax, data, x):
 
 
 def main():
+    import matplotlib.pyplot as plt
     _, ax = plt.subplots()
     dataset = GaussianSinus(store_file=Path("data/1d_gauss_sinus_1000"))
     start = -3
@@ -2,7 +2,7 @@ from pathlib import Path
 import csv
 import numpy as np
 import torch.utils.data
-import matplotlib.pyplot as plt
+import src.dataloaders.csv_data as csv_data
 import logging
 
 
@@ -20,27 +20,23 @@ class SyntheticRegressionData(torch.utils.data.Dataset):
 
         self.file = Path(store_file)
         if self.file.exists() and reuse_data:
+            self.data = csv_data.load_csv(self.file)
             self.validate_dataset()
         else:
             self._log.info("Sampling new data")
             self.sample_new_data()
+            self.data = csv_data.load_csv(self.file)
 
     def __len__(self):
         return self.n_samples
 
     def __getitem__(self, index):
-        sample = None
-        with self.file.open(newline="") as csv_file:
-            csv_reader = csv.reader(csv_file, delimiter=",", quotechar="|")
-            for count, row in enumerate(csv_reader):
-                if count == index:
-                    sample = row
-                    break
+        sample = self.data[index]
         inputs = sample[:-1]
-        targets = sample[-1]
+        targets = sample[-1:]
 
         return (np.array(inputs, dtype=np.float32),
-                np.array([targets], dtype=np.float32))
+                np.array(targets, dtype=np.float32))
 
     def sample_new_data(self):
         self.file.parent.mkdir(parents=True, exist_ok=True)
@@ -66,9 +62,7 @@ class SyntheticRegressionData(torch.utils.data.Dataset):
         np.savetxt(self.file, combined_data, delimiter=",")
 
     def validate_dataset(self):
-        with self.file.open(newline="") as csv_file:
-            csv_reader = csv.reader(csv_file, delimiter=",", quotechar="|")
-            assert self.n_samples - 1 == sum(1 for row in csv_reader)
+        assert self.n_samples == self.data.shape[0]
 
     def get_full_data(self):
         tmp_raw_data = list()
@@ -79,6 +73,7 @@ class SyntheticRegressionData(torch.utils.data.Dataset):
 
 
 def plot_reg_data(data, ax):
+    import matplotlib.pyplot as plt
     inputs = data[:, :-1]
     targets = data[:, -1]
     ax.scatter(inputs, targets)
@@ -86,6 +81,7 @@ def plot_reg_data(data, ax):
 
 
 def main():
+    import matplotlib.pyplot as plt
     _, ax = plt.subplots()
     dataset = SyntheticRegressionData(store_file=Path("data/1d_reg_1000"))
     plot_reg_data(dataset.get_full_data(), ax)
@@ -4,6 +4,7 @@ import torch.optim as torch_optim
 import torch.nn.functional as F
 
 import src.loss as custom_loss
+from src import metrics
 from src.distilled import distilled_network
 
 
@@ -98,13 +99,9 @@ class CifarResnetDirichlet(distilled_network.DistilledNet):
 
         alphas = self.forward(input_)
 
-        samples = torch.zeros(
-            [input_.size(0), num_samples, self.output_size])
-
-        for i in range(input_.size(0)):
-
-            rv = torch.distributions.dirichlet.Dirichlet(concentration=alphas[i, :])
-            samples[i, :, :] = rv.rsample([num_samples])
+        # One batched distribution, samples are drawn as (num_samples, B, K)
+        rv = torch.distributions.dirichlet.Dirichlet(concentration=alphas)
+        samples = rv.rsample([num_samples]).transpose(0, 1)
 
         if return_params:
             return alphas, samples
@@ -112,6 +109,26 @@ class CifarResnetDirichlet(distilled_network.DistilledNet):
         else:
             return samples
 
+    def predict_closed_form(self, input_, return_params=False):
+        """Predict mean and uncertainty decomposition without sampling
+
+        Returns:
+            (alphas if return_params), mean prediction, total, epistemic and aleatoric uncertainty,
+            see metrics.uncertainty_separation_dirichlet
+        """
+
+        if isinstance(input_, list) or isinstance(input_, tuple):
+            input_ = input_[0]
+
+        alphas = self.forward(input_)
+        mean = alphas / torch.sum(alphas, dim=-1, keepdim=True)
+        output = [mean, *metrics.uncertainty_separation_dirichlet(alphas)]
+
+        if return_params:
+            output.insert(0, alphas)
+
+        return output
+
     def _learning_rate_condition(self, epoch):
         if epoch%20 == 0:
             return True
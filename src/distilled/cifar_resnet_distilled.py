@@ -2,6 +2,7 @@ import torch
 import torch.nn as nn
 import torch.optim as torch_optim
 import src.loss as custom_loss
+from src import metrics
 import src.distilled.distilled_network as distilled_network
 import torch.nn.functional as F
 
@@ -179,16 +180,13 @@ class CifarResnetLogits(distilled_network.DistilledNet):
             else:
                 mean, var = self.forward(input_, comp_fix=comp_fix)
 
-            samples = torch.zeros(
-                [input_.size(0), num_samples,
-                 int(self.output_size / 3)])
+            # Reparameterised samples from the diagonal Gaussians, for the full batch at once
+            eps = torch.randn([input_.size(0), num_samples, int(self.output_size / 3)],
+                              dtype=mean.dtype, device=mean.device)
+            samples = mean.unsqueeze(1) + torch.sqrt(var).unsqueeze(1) * eps
 
-            for i in range(input_.size(0)):
-                rv = torch.distributions.multivariate_normal.MultivariateNormal(
-                    loc=mean[i, :], covariance_matrix=torch.diag(var[i, :]))
-                samples[i, :, :] = rv.rsample([num_samples])
-
-            samples = torch.cat((samples, torch.zeros(samples.size(0), num_samples, 1)), dim=-1)
+            samples = torch.cat((samples, torch.zeros(samples.size(0), num_samples, 1, dtype=samples.dtype,
+                                                      device=samples.device)), dim=-1)
 
             output = [samples]
             if return_raw_data:
@@ -198,6 +196,26 @@ class CifarResnetLogits(distilled_network.DistilledNet):
 
             return output
 
+    def predict_sigma_points(self, input_, num_points=3, comp_fix=False):
+        """Predict mean and uncertainty decomposition without sampling
+
+        Deterministic approximation of the sample based
+        metrics.uncertainty_separation_entropy(logits, logits=True),
+        see metrics.uncertainty_separation_gaussian_logits.
+
+        Returns:
+            mean prediction, total, epistemic and aleatoric uncertainty
+        """
+
+        if isinstance(input_, list) or isinstance(input_, tuple):
+            input_ = input_[0]
+
+        mean, var = self.forward(input_, comp_fix=comp_fix)
+        total, epistemic, aleatoric, mean_prediction = metrics.uncertainty_separation_gaussian_logits(
+            mean, var, num_points=num_points, return_mean_prediction=True)
+
+        return mean_prediction, total, epistemic, aleatoric
+
     def _learning_rate_condition(self, epoch):
         if epoch%20 == 0:
             return True
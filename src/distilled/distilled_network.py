@@ -6,10 +6,16 @@ import torch.nn as nn
 import torch.optim as torch_optim
 import math
 import src.utils as utils
+from src.distilled import teacher_cache
+from src.utils_dir import timing
+from src.dataloaders import augmentation
 
 
 class DistilledNet(nn.Module, ABC):
     """Parent class for distilled net logic in one place"""
+    # Class level default, also for models unpickled from before timing existed
+    _timer = timing.NULL_TIMER
+
     def __init__(self, teacher, loss_function, device=torch.device("cpu")):
         super().__init__()
         self._log = logging.getLogger(self.__class__.__name__)
@@ -46,6 +52,7 @@ class DistilledNet(nn.Module, ABC):
             self.calculate_metric_dataloader(validation_loader)
 
         for epoch_number in range(1, num_epochs + 1):
+            augmentation.advance_epoch(train_loader)
 
             loss = self._train_epoch(train_loader,
                                      validation_loader=validation_loader)
@@ -69,42 +76,59 @@ class DistilledNet(nn.Module, ABC):
         running_loss = 0
 
         self._reset_metrics()
-
-        for batch_ind, batch in enumerate(train_loader):
-            self.optimizer.zero_grad()
-            inputs, labels = batch
-
-            # Need this for a special case
-            if isinstance(inputs, list):
-                for i in range(len(inputs)):
-                    inputs[i] = inputs[i].to(self.device)
-
-                labels = labels.to(self.device)
-
-            else:
-                inputs, labels = inputs.to(self.device), labels.to(self.device)
-
-            teacher_predictions = self._generate_teacher_predictions(inputs)
-
-            outputs = self.forward(inputs)
-
-            loss = self.calculate_loss(outputs, teacher_predictions, None)
-
-            loss.backward()
-            self.optimizer.step()
-            running_loss += loss.item()
-            self._log.debug("Batch: {}, running_loss: {}".format(
-                batch_ind, running_loss))
-
-            if math.isnan(running_loss) or math.isinf(running_loss):
-                self._log.error("Loss is NaN")
-                break
-
-            if validation_loader is None:
-                #self._reset_metrics()
-                self._update_metrics(
-                    outputs, teacher_predictions
-                )
+        self._use_teacher_cache(train_loader)
+        timer = self._timer
+        timer.start_epoch()
+
+        try:
+            for batch_ind, batch in enumerate(train_loader):
+                timer.lap("data")
+                self.optimizer.zero_grad()
+                inputs, labels = self._split_batch(batch)
+
+                # Need this for a special case
+                if isinstance(inputs, list):
+                    for i in range(len(inputs)):
+                        inputs[i] = inputs[i].to(self.device)
+
+                    labels = labels.to(self.device)
+
+                else:
+                    inputs, labels = inputs.to(self.device), labels.to(self.device)
+                timer.lap("to_device")
+
+                teacher_predictions = self._generate_teacher_predictions(inputs)
+                timer.lap("teacher")
+
+                outputs = self.forward(inputs)
+                timer.lap("forward")
+
+                loss = self.calculate_loss(outputs, teacher_predictions, None)
+                timer.lap("loss")
+
+                loss.backward()
+                timer.lap("backward")
+                self.optimizer.step()
+                running_loss += loss.item()
+                timer.lap("step")
+                self._log.debug("Batch: {}, running_loss: {}".format(
+                    batch_ind, running_loss))
+
+                if math.isnan(running_loss) or math.isinf(running_loss):
+                    self._log.error("Loss is NaN")
+                    break
+
+                if validation_loader is None:
+                    #self._reset_metrics()
+                    self._update_metrics(
+                        outputs, teacher_predictions
+                    )
+                timer.lap("metrics")
+                timer.end_batch(timing.batch_size(inputs))
+        finally:
+            self._release_teacher_cache()
+
+        timer.end_epoch(loss=running_loss)
 
         if validation_loader is not None:
             with torch.no_grad():
@@ -114,23 +138,27 @@ class DistilledNet(nn.Module, ABC):
 
     def calculate_metric_dataloader(self, data_loader):
         # model.eval_mode(), important if your model has batch norm layers
-        for batch in data_loader:
-            # self._reset_metrics()
-            inputs, labels = batch
+        self._use_teacher_cache(data_loader)
+        try:
+            for batch in data_loader:
+                # self._reset_metrics()
+                inputs, labels = self._split_batch(batch)
 
-            if isinstance(inputs, list):
-                for i in range(len(inputs)):
-                    inputs[i] = inputs[i].to(self.device)
+                if isinstance(inputs, list):
+                    for i in range(len(inputs)):
+                        inputs[i] = inputs[i].to(self.device)
 
-                labels = labels.to(self.device)
+                    labels = labels.to(self.device)
 
-            else:
-                inputs, labels = inputs.to(self.device), labels.to(self.device)
+                else:
+                    inputs, labels = inputs.to(self.device), labels.to(self.device)
 
-            outputs = self.forward(inputs)
-            teacher_predictions = self._generate_teacher_predictions(inputs)
-            teacher_predictions = teacher_predictions
-            self._update_metrics(outputs, teacher_predictions)
+                outputs = self.forward(inputs)
+                teacher_predictions = self._generate_teacher_predictions(inputs)
+                teacher_predictions = teacher_predictions
+                self._update_metrics(outputs, teacher_predictions)
+        finally:
+            self._release_teacher_cache()
 
     def _generate_teacher_predictions(self, inputs):
         """Generate teacher predictions
@@ -145,16 +173,88 @@ class DistilledNet(nn.Module, ABC):
         logits = self.teacher.get_logits(inputs)
         return self.teacher.transform_logits(logits)
 
+    def enable_timing(self, output_file=None):
+        """Time the phases of every training batch, see timing.EpochTimer
+
+        Args:
+            output_file (str/Path): JSONL file for the epoch summaries,
+                defaults to a file next to the log file.
+        """
+        self._timer = timing.EpochTimer(output_file, device=self.device)
+        return self._timer
+
+    def disable_timing(self):
+        self._timer = timing.NULL_TIMER
+
+    def enable_teacher_cache(self, cache_dir=None):
+        """Cache the teacher outputs by dataset index
+
+        Only batches from a teacher_cache.IndexedDataset are cached,
+        see teacher_cache.TeacherCache.
+
+        Args:
+            cache_dir (str/Path): store outputs in memory-mapped files
+                instead of in memory
+        """
+        if not isinstance(self.teacher, teacher_cache.TeacherCache):
+            self.teacher = teacher_cache.TeacherCache(self.teacher,
+                                                      cache_dir=cache_dir)
+
+    def fill_teacher_cache(self, data_loader):
+        """Precompute the teacher outputs for all data in data_loader"""
+        if not isinstance(self.teacher, teacher_cache.TeacherCache):
+            self._log.warning("Teacher cache not enabled")
+            return
+
+        self._log.info("Filling teacher cache")
+        self._use_teacher_cache(data_loader)
+        try:
+            with torch.no_grad():
+                for batch in data_loader:
+                    inputs, _ = self._split_batch(batch)
+                    if isinstance(inputs, list):
+                        inputs = [input_.to(self.device) for input_ in inputs]
+                    else:
+                        inputs = inputs.to(self.device)
+                    self._generate_teacher_predictions(inputs)
+        finally:
+            self._release_teacher_cache()
+
+    def _use_teacher_cache(self, data_loader):
+        if isinstance(self.teacher, teacher_cache.TeacherCache):
+            self.teacher.use_dataset(data_loader.dataset)
+
+    def _release_teacher_cache(self):
+        """Stop serving cached outputs, e.g. to calls on new inputs after a loop"""
+        if isinstance(self.teacher, teacher_cache.TeacherCache):
+            self.teacher.use_dataset(None)
+
+    def _split_batch(self, batch):
+        """Split batch into inputs and labels
+
+        Batches from a teacher_cache.IndexedDataset are IndexedSample's
+        (inputs, labels, indices), the indices are passed on to the
+        teacher cache. Other batches are not cached.
+        """
+        if isinstance(self.teacher, teacher_cache.TeacherCache):
+            indexed = isinstance(batch, teacher_cache.IndexedSample)
+            self.teacher.set_indices(batch.index if indexed else None)
+        return batch[0], batch[1]
+
     def calc_metrics(
         self, data_loader
     ):  #TODO: How does this differ from calc_metric_dataloader except for the reset_metrics call?
         self._reset_metrics()
-
-        for batch in data_loader:
-            inputs, targets = batch
-            outputs = self.forward(inputs)
-            teacher_predictions = self._generate_teacher_predictions(inputs)
-            self._update_metrics(outputs, teacher_predictions)
+        self._use_teacher_cache(data_loader)
+
+        try:
+            for batch in data_loader:
+                inputs, targets = self._split_batch(batch)
+                outputs = self.forward(inputs)
+                teacher_predictions = self._generate_teacher_predictions(inputs)
+                self._update_metrics(outputs, teacher_predictions)
+        finally:
+            self._release_teacher_cache()
 
         metric_string = ""
         for metric in self.metrics.values():
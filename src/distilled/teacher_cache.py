@@ -0,0 +1,155 @@
+"""Teacher output cache
+
+The teacher of a distilled network is frozen, so its output for a given
+data point is the same in every epoch. The TeacherCache wraps the teacher
+and stores the outputs of get_logits/predict by dataset index, in memory or
+in memory-mapped files, so that the teacher only has to be evaluated once.
+
+Usage:
+    train_loader = torch.utils.data.DataLoader(IndexedDataset(train_set), ...)
+    distilled_model.enable_teacher_cache()
+    distilled_model.fill_teacher_cache(train_loader)  # Optional
+    distilled_model.train(train_loader, num_epochs)
+
+Note: The cache assumes that the inputs are deterministic given the index,
+datasets with data augmentation (see augmentation.find_augmentation)
+are therefore not cached.
+Only the plain teacher outputs are cached, calls with additional arguments
+(e.g. an annealed temperature, predict(inputs, t)) are passed on to the teacher.
+"""
+import logging
+import collections
+from pathlib import Path
+import numpy as np
+import torch
+from src.dataloaders import augmentation
+
+
+# Sample (and, as the DataLoader collates namedtuples, batch) with dataset indices
+IndexedSample = collections.namedtuple("IndexedSample", ["inputs", "labels", "index"])
+
+
+class IndexedDataset(torch.utils.data.Dataset):
+    """Dataset wrapper which adds the index to every sample
+
+    The samples are IndexedSample's (inputs, labels, index), the distilled
+    network hands the indices of such batches to the teacher cache.
+    """
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, index):
+        inputs, labels = self.dataset[index]
+        return IndexedSample(inputs, labels, index)
+
+
+class TeacherCache:
+    """Cache for the outputs of a (frozen) teacher
+
+    Outputs are stored per dataset (set with use_dataset) and per teacher
+    method and are only used for batches with known dataset indices
+    (set with set_indices) of the same size, other calls are passed on to
+    the teacher. use_dataset(None) clears both, the training and evaluation
+    loops of the distilled network do so when they are done.
+    All other attributes, e.g. transform_logits, are taken from the teacher.
+
+    Args:
+        teacher (Ensemble): the teacher to cache
+        cache_dir (str/Path): store the outputs in memory-mapped files
+            in this directory instead of in memory.
+    """
+    def __init__(self, teacher, cache_dir=None):
+        self.teacher = teacher
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self._log = logging.getLogger(self.__class__.__name__)
+        self._datasets = dict()
+        self._active = None
+        self._indices = None
+
+    def __getattr__(self, name):
+        # Only called if the attribute is not found on the cache itself.
+        return getattr(self.__dict__["teacher"], name)
+
+    def use_dataset(self, dataset):
+        """Set dataset of the coming batches, None disables the cache (and clears the indices)"""
+        if dataset is None:
+            self._active = None
+            self._indices = None
+            return
+
+        key = id(dataset)
+        if key not in self._datasets:
+            # The inputs of an augmented set differ between epochs
+            storage = dict()
+            if augmentation.find_augmentation(dataset) is not None:
+                self._log.warning(
+                    "Dataset {} is augmented, its teacher outputs are not cached"
+                    .format(type(dataset).__name__))
+                storage = None
+            # Keep a reference to the dataset so that the id is not reused
+            self._datasets[key] = (dataset, storage, len(self._datasets))
+        _, storage, _ = self._datasets[key]
+        self._active = self._datasets[key] if storage is not None else None
+
+    def set_indices(self, indices):
+        """Set dataset indices of the coming batch, None disables the cache"""
+        if indices is not None:
+            indices = torch.as_tensor(indices).cpu().numpy()
+        self._indices = indices
+
+    def get_logits(self, inputs):
+        return self._cached_call("get_logits", inputs)
+
+    def predict(self, inputs, *args):
+        return self._cached_call("predict", inputs, *args)
+
+    def _cached_call(self, method, inputs, *args):
+        if (self._active is None or self._indices is None or args
+                or _num_samples(inputs) != len(self._indices)):
+            return getattr(self.teacher, method)(inputs, *args)
+
+        dataset, storage, dataset_number = self._active
+        key = method
+        if key in storage:
+            outputs, filled, device = storage[key]
+            if filled[self._indices].all():
+                return torch.from_numpy(np.array(
+                    outputs[self._indices])).to(device)
+
+        new_outputs = getattr(self.teacher, method)(inputs, *args)
+        if key not in storage:
+            storage[key] = self._allocate(len(dataset), new_outputs,
+                                          dataset_number, key)
+        outputs, filled, _ = storage[key]
+        outputs[self._indices] = new_outputs.detach().cpu().numpy()
+        filled[self._indices] = True
+
+        return new_outputs
+
+    def _allocate(self, num_samples, new_outputs, dataset_number, key):
+        shape = (num_samples, ) + tuple(new_outputs.shape[1:])
+        dtype = new_outputs.detach().cpu().numpy().dtype
+        if self.cache_dir is None:
+            outputs = np.zeros(shape, dtype=dtype)
+        else:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            filepath = self.cache_dir / "teacher_{}_{}.npy".format(
+                dataset_number, key)
+            self._log.info("Caching teacher outputs in {}".format(filepath))
+            outputs = np.lib.format.open_memmap(filepath,
+                                                mode="w+",
+                                                dtype=dtype,
+                                                shape=shape)
+
+        filled = np.zeros(num_samples, dtype=bool)
+        return outputs, filled, new_outputs.device
+
+
+def _num_samples(inputs):
+    """Number of samples in inputs (tensor or list of tensors)"""
+    if isinstance(inputs, (list, tuple)):
+        inputs = inputs[0]
+    return inputs.shape[0]
@@ -21,6 +21,8 @@ class ResNet(ensemble.EnsembleMember):
     def __init__(self, block, num_blocks, device=torch.device('cpu'), learning_rate=0.001, num_classes=10):
         super().__init__(output_size=num_classes, loss_function=nn.CrossEntropyLoss(), device=device)
         self.learning_rate = learning_rate
+        self.block = block
+        self.num_blocks = list(num_blocks)
 
         self.in_planes = 64
 
@@ -55,6 +57,10 @@ class ResNet(ensemble.EnsembleMember):
         return out
 
     # Added functions
+    def constructor_args(self):
+        return {"block": self.block, "num_blocks": self.num_blocks, "learning_rate": self.learning_rate,
+                "num_classes": self.output_size}
+
     def transform_logits(self, logits):
         return logits
 
@@ -1,11 +1,22 @@
 """Ensemble"""
+import os
+import copy
+import json
 import logging
+import tempfile
+import importlib
+from pathlib import Path
 from abc import ABC, abstractmethod
+import numpy as np
 import torch
 import torch.nn as nn
 import torch.optim as torch_optim
+import torch.func as torch_func
+import torch.multiprocessing as torch_mp
 import src.metrics as metrics
 import src.utils as utils
+from src.utils_dir import timing
+from src.dataloaders import augmentation
 
 
 class Ensemble():
@@ -20,13 +31,20 @@ class Ensemble():
             i.e. the number of predicted parameters.
             e.g. if we model D-dimensional target with a Gaussian
             with mean and diagonal covariance, the output size would be 2D.
+        stacked (bool): Evaluate the members in a single vectorised call
+            (see get_logits and predict) instead of one forward pass each.
+            Requires structurally identical members and is only intended
+            for inference, e.g. when the ensemble is used as a teacher.
     """
-    def __init__(self, output_size, device=torch.device("cpu")):
+    def __init__(self, output_size, device=torch.device("cpu"),
+                 stacked=False):
         self.members = list()
         self._log = logging.getLogger(self.__class__.__name__)
         self.output_size = output_size
         self.device = device
         self.size = 0
+        self.stacked = stacked
+        self._stacked_state = None
 
     def __len__(self):
         return self.size
@@ -37,6 +55,7 @@ class Ensemble():
             self._log.info("Adding {} to ensemble".format(type(new_member)))
             self.members.append(new_member)
             self.size += 1
+            self._stacked_state = None
         else:
             err_str = "Ensemble member must be an EnsembleMember subclass"
             self._log.error(err_str)
@@ -46,23 +65,198 @@ class Ensemble():
         for _ in range(number_of):
             self.add_member(constructor())
 
-    def train(self, train_loader, num_epochs, validation_loader=None):
-        """Multithreaded?"""
+    def train(self,
+              train_loader,
+              num_epochs,
+              validation_loader=None,
+              num_processes=1,
+              seed=1,
+              lockstep=False,
+              shuffle_members=False,
+              shuffle_batches=10,
+              reshape_targets=True):
+        """Train all ensemble members
+
+        With num_processes > 1 the members are trained in parallel,
+        see _train_parallel. With lockstep=True every batch is loaded once
+        and used by all members, see _train_lockstep.
+        The two modes can not be combined.
+
+        Args:
+            num_processes (int): Number of worker processes
+            seed (int): Member i is trained with seed + i (parallel mode only)
+            lockstep (bool): Share a single pass over train_loader
+            shuffle_members (bool): Give every member its own sample order
+                (lockstep mode only)
+            shuffle_batches (int): Number of loaded batches that the members
+                shuffle over, see _train_lockstep (shuffle_members only)
+            reshape_targets (bool): Passed on to EnsembleMember.train
+        """
+        if num_processes > 1 and lockstep:
+            err_str = "Lockstep training is not supported with num_processes > 1"
+            self._log.error(err_str)
+            raise ValueError(err_str)
+        if shuffle_members and not lockstep:
+            err_str = "shuffle_members is only supported with lockstep=True"
+            self._log.error(err_str)
+            raise ValueError(err_str)
+
         self._log.info("Training ensemble")
+        if num_processes > 1:
+            self._train_parallel(train_loader, num_epochs, validation_loader,
+                                 num_processes, seed, reshape_targets)
+        elif lockstep:
+            self._train_lockstep(train_loader, num_epochs, validation_loader,
+                                 shuffle_members, shuffle_batches,
+                                 reshape_targets)
+        else:
+            self._train_sequential(train_loader, num_epochs,
+                                   validation_loader, reshape_targets)
+        self._stacked_state = None
+
+    def _train_sequential(self, train_loader, num_epochs, validation_loader,
+                          reshape_targets):
+        """Train the members one after another"""
         for ind, member in enumerate(self.members):
             self._log.info("Training member {}/{}".format(ind + 1, self.size))
-            member.train(train_loader, num_epochs, validation_loader)
+            member.train(train_loader,
+                         num_epochs,
+                         validation_loader,
+                         reshape_targets=reshape_targets)
+
+    def _train_lockstep(self, train_loader, num_epochs, validation_loader,
+                        shuffle_members, shuffle_batches, reshape_targets):
+        """Train all members on a single pass over the data per epoch
+
+        Every batch from train_loader is loaded (decoded, augmented etc.)
+        once and then stepped through all members' optimizers.
+
+        With shuffle_members=True, shuffle_batches batches at a time are
+        collected in memory and every member iterates over them in batches
+        of the loader's batch size, in its own random order. Every member
+        still sees every sample once per epoch, while the memory is bounded
+        by shuffle_batches batches.
+
+        The members' timers (see EnsembleMember.enable_timing) record the
+        time spent on loading data and on the other members as phase "wait".
+        """
+        schedulers = [member._get_scheduler() for member in self.members]
+        for epoch_number in range(1, num_epochs + 1):
+            augmentation.advance_epoch(train_loader)
+            for member in self.members:
+                member._reset_metrics()
+                member._timer.start_epoch()
+            running_loss = np.zeros(self.size)
+
+            if shuffle_members:
+                batch_count = 0
+                for inputs, targets, batch_size in _batch_windows(
+                        train_loader, shuffle_batches):
+                    orders = [
+                        torch.randperm(inputs.size(0)) for _ in self.members
+                    ]
+                    for start in range(0, inputs.size(0), batch_size):
+                        for ind, (member, order) in enumerate(
+                                zip(self.members, orders)):
+                            batch_inds = order[start:start + batch_size]
+                            member._timer.lap("wait")
+                            running_loss[ind] += member._train_step(
+                                inputs[batch_inds], targets[batch_inds],
+                                reshape_targets)
+                            member._timer.end_batch(batch_inds.size(0))
+                        batch_count += 1
+            else:
+                batch_count = 0
+                for inputs, targets in train_loader:
+                    for ind, member in enumerate(self.members):
+                        member._timer.lap("wait")
+                        running_loss[ind] += member._train_step(
+                            inputs, targets, reshape_targets)
+                        member._timer.end_batch(inputs.size(0))
+                    batch_count += 1
+
+            for ind, (member, scheduler) in enumerate(
+                    zip(self.members, schedulers)):
+                member._timer.end_epoch(loss=running_loss[ind] / batch_count)
+                self._log.info("Member {}/{}".format(ind + 1, self.size))
+                member._end_epoch(epoch_number,
+                                  running_loss[ind] / batch_count, scheduler,
+                                  validation_loader, reshape_targets)
+
+    def _train_parallel(self, train_loader, num_epochs, validation_loader,
+                        num_processes, seed, reshape_targets):
+        """Train the members in forked worker processes
+
+        The members are split evenly over the workers, every worker
+        limits torch to its share of the cores and trains its members one
+        after another. The trained weights are passed back through
+        per-member checkpoint files (state_dict's) in a temporary directory.
+        Note that the optimizer state of the members is not transferred back.
+        Only CPU training is supported, CUDA does not survive a fork.
+        """
+        if any(member.device.type != "cpu" for member in self.members):
+            self._log.warning(
+                "Parallel training is only supported on cpu, "
+                "training members sequentially")
+            self._train_sequential(train_loader, num_epochs,
+                                   validation_loader, reshape_targets)
+            return
+
+        num_processes = min(num_processes, self.size)
+        num_threads = max(1, (os.cpu_count() or 1) // num_processes)
+        self._log.info("Training {} members in {} processes ({} threads each)".
+                       format(self.size, num_processes, num_threads))
+
+        context = torch_mp.get_context("fork")
+        with tempfile.TemporaryDirectory() as checkpoint_dir:
+            processes = list()
+            for worker in range(num_processes):
+                member_inds = list(range(worker, self.size, num_processes))
+                process = context.Process(
+                    target=_train_members_worker,
+                    args=(self.members, member_inds, train_loader, num_epochs,
+                          validation_loader, seed, num_threads,
+                          checkpoint_dir, reshape_targets))
+                process.start()
+                processes.append(process)
+
+            for process in processes:
+                process.join()
+
+            if any(process.exitcode != 0 for process in processes):
+                err_str = "Parallel training of ensemble members failed"
+                self._log.error(err_str)
+                raise RuntimeError(err_str)
+
+            for ind, member in enumerate(self.members):
+                member.load_state_dict(
+                    torch.load(_member_checkpoint(checkpoint_dir, ind),
+                               weights_only=True))
 
     def add_metrics(self, metrics_list):
+        """Add the metrics to every member
+
+        Every member gets its own copy, so that the members' metrics do not
+        mix when they are trained in lockstep. The given metrics are not
+        updated, the copies are available as member.metrics[metric.name].
+
+        Returns:
+            dict: metric name -> list of the members' copies of the metric
+        """
+        member_metrics = dict()
         for metric in metrics_list:
             if isinstance(metric, metrics.Metric):
+                self._log.info("Adding metric: {}".format(metric.name))
+                member_metrics[metric.name] = list()
                 for member in self.members:
-                    member.metrics[metric.name] = metric
-                    self._log.info("Adding metric: {}".format(metric.name))
+                    member.metrics[metric.name] = copy.deepcopy(metric)
+                    member_metrics[metric.name].append(
+                        member.metrics[metric.name])
             else:
                 self._log.error(
                     "Metric {} does not inherit from metric.Metric.".format(
                         metric.name))
+        return member_metrics
 
     def calc_metrics(self, data_loader):
         for member in self.members:
@@ -80,6 +274,9 @@ class Ensemble():
             logits (torch.tensor((B, N, K)))
         """
 
+        if self.stacked and self._can_stack():
+            return self._stacked_call("forward", inputs).to(self.device)
+
         batch_size = inputs.size(0)
         logits = torch.zeros((batch_size, self.size, self.output_size),
                              device=self.device)
@@ -130,6 +327,10 @@ class Ensemble():
         Returns:
             predictions (torch.tensor((B, N, K)))
         """
+        if self.stacked and self._can_stack():
+            args = () if t is None else (t, )
+            return self._stacked_call("predict", inputs, *args).cpu()
+
         batch_size = inputs.size(0)
         predictions = torch.zeros((batch_size, self.size, self.output_size))
         for member_ind, member in enumerate(self.members):
@@ -140,6 +341,71 @@ class Ensemble():
 
         return predictions
 
+    def stack_members(self):
+        """Stack the parameters and buffers of all members
+
+        The stacked copy is what the stacked mode evaluates,
+        it is created lazily and dropped whenever members are added or
+        trained through the ensemble. Call this explicitly to refresh it if
+        the members' weights are modified in some other way.
+        """
+        params, buffers = torch_func.stack_module_state(self.members)
+        params = {
+            "member." + name: param.detach()
+            for name, param in params.items()
+        }
+        buffers = {"member." + name: buf for name, buf in buffers.items()}
+        self._stacked_state = (params, buffers)
+
+    def _can_stack(self):
+        """Check that the members can be evaluated as one stacked model
+
+        Falls back to (and warns about) the member-by-member loop otherwise.
+        """
+        if self._stacked_state is not None:
+            return True
+
+        if self.size == 0:
+            return False
+
+        first = self.members[0]
+        shapes = [(name, param.shape)
+                  for name, param in first.state_dict().items()]
+        for member in self.members[1:]:
+            if type(member) is not type(first) or shapes != [
+                (name, param.shape)
+                    for name, param in member.state_dict().items()
+            ]:
+                self._log.warning(
+                    "Members are not structurally identical, "
+                    "falling back to non-stacked evaluation")
+                self.stacked = False
+                return False
+
+        self.stack_members()
+        return True
+
+    def _stacked_call(self, method, inputs, *args):
+        """Vectorised call of 'method' over all members
+
+        The first member is used as a template module and is evaluated
+        with the stacked parameters of each member through vmap.
+
+        Returns:
+            outputs (torch.tensor((B, N, K)))
+        """
+        params, buffers = self._stacked_state
+        template = _MemberCall(self.members[0], method)
+
+        def call_member(params, buffers, inputs):
+            return torch_func.functional_call(template, (params, buffers),
+                                              (inputs, ) + args)
+
+        outputs = torch_func.vmap(call_member,
+                                  in_dims=(0, 0, None))(params, buffers,
+                                                        inputs)
+        return outputs.transpose(0, 1)
+
     def save_ensemble(self, filepath):
 
         members_dict = {}
@@ -151,8 +417,63 @@ class Ensemble():
 
         torch.save(members_dict, filepath)
 
+    def save_ensemble_state(self, directory):
+        """Save ensemble as one state_dict file per member
+
+        The directory also gets a small manifest (manifest.json) with the
+        output size and, for every member, its class and constructor
+        arguments (see EnsembleMember.constructor_args), so that
+        load_ensemble_state can rebuild the members one by one.
+
+        Args:
+            directory (str/Path): created if it does not exist
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        manifest = {
+            "format_version": STATE_FORMAT_VERSION,
+            "output_size": self.output_size,
+            "members": list()
+        }
+        for i, member in enumerate(self.members):
+            member_file = "ensemble_member_{}.pt".format(i)
+            torch.save(member.state_dict(), directory / member_file)
+            manifest["members"].append({
+                "file": member_file,
+                "class": _class_path(type(member)),
+                "args": _encode_args(member.constructor_args())
+            })
+
+        with (directory / MANIFEST_FILE).open("w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+
+    def load_ensemble_state(self,
+                            directory,
+                            num_members=None,
+                            constructor=None):
+        """Load ensemble saved with save_ensemble_state
+
+        Only the num_members first member files are read.
+
+        Args:
+            directory (str/Path)
+            num_members (int): defaults to all members
+            constructor (function): creates an (untrained) member,
+                needed if the members were saved without constructor args.
+        """
+        for member in iter_ensemble_state(directory,
+                                          num_members=num_members,
+                                          constructor=constructor,
+                                          device=self.device):
+            self.add_member(member)
+
     def load_ensemble(self, filepath, num_members=None):
 
+        if Path(filepath).is_dir():
+            self.load_ensemble_state(filepath, num_members=num_members)
+            return
+
         check_point = torch.load(filepath)
 
         for i, key in enumerate(check_point):
@@ -167,12 +488,159 @@ class Ensemble():
             self.add_member(member)
 
 
+MANIFEST_FILE = "manifest.json"
+STATE_FORMAT_VERSION = 1
+
+
+def iter_ensemble_state(directory,
+                        num_members=None,
+                        constructor=None,
+                        device=torch.device("cpu")):
+    """Lazily load the members of an ensemble saved with save_ensemble_state
+
+    The members are constructed and loaded one at a time, when requested.
+    The weights are loaded memory mapped and with weights_only=True,
+    so no pickled code is executed and only the pages actually used are
+    read from disk.
+    E.g. for streaming predictions without holding the full ensemble:
+
+        for member in iter_ensemble_state(directory):
+            predictions.append(member.predict(inputs))
+
+    Args:
+        directory (str/Path)
+        num_members (int): defaults to all members
+        constructor (function): creates an (untrained) member, overrides
+            the class and constructor arguments in the manifest.
+        device (torch.device)
+
+    Yields:
+        member (EnsembleMember)
+    """
+    directory = Path(directory)
+    with (directory / MANIFEST_FILE).open() as manifest_file:
+        manifest = json.load(manifest_file)
+
+    if manifest["format_version"] != STATE_FORMAT_VERSION:
+        raise ValueError("Unknown ensemble format version: {}".format(
+            manifest["format_version"]))
+
+    for member_info in manifest["members"][:num_members]:
+        if constructor is not None:
+            member = constructor()
+        elif member_info["args"] is None:
+            raise ValueError(
+                "Member {} was saved without constructor args, "
+                "a constructor must be provided".format(member_info["file"]))
+        else:
+            member_class = _load_class(member_info["class"])
+            member = member_class(device=device,
+                                  **_decode_args(member_info["args"]))
+
+        state_dict = torch.load(directory / member_info["file"],
+                                map_location=device,
+                                mmap=True,
+                                weights_only=True)
+        member.load_state_dict(state_dict)
+        yield member
+
+
+def _class_path(class_):
+    return "{}:{}".format(class_.__module__, class_.__qualname__)
+
+
+def _load_class(class_path):
+    module_name, class_name = class_path.split(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def _encode_args(args):
+    """Make constructor args JSON serialisable, classes are stored by path"""
+    if args is None:
+        return None
+    return {
+        key: {
+            "__class__": _class_path(value)
+        } if isinstance(value, type) else value
+        for key, value in args.items()
+    }
+
+
+def _decode_args(args):
+    return {
+        key: _load_class(value["__class__"])
+        if isinstance(value, dict) and "__class__" in value else value
+        for key, value in args.items()
+    }
+
+
+def _member_checkpoint(checkpoint_dir, member_ind):
+    return Path(checkpoint_dir) / "ensemble_member_{}.pt".format(member_ind)
+
+
+def _batch_windows(train_loader, num_batches):
+    """Concatenate every num_batches batches of train_loader
+
+    Yields:
+        inputs, targets: the concatenated batches
+        batch_size (int): size of the first batch of the window
+    """
+    window = list()
+    for batch in train_loader:
+        window.append(batch)
+        if len(window) == num_batches:
+            yield _concat_window(window)
+            window = list()
+    if window:
+        yield _concat_window(window)
+
+
+def _concat_window(window):
+    inputs = torch.cat([batch[0] for batch in window])
+    targets = torch.cat([batch[1] for batch in window])
+    return inputs, targets, window[0][0].size(0)
+
+
+def _train_members_worker(members, member_inds, train_loader, num_epochs,
+                          validation_loader, seed, num_threads,
+                          checkpoint_dir, reshape_targets):
+    """Worker process for Ensemble._train_parallel"""
+    torch.set_num_threads(num_threads)
+    log = logging.getLogger(Ensemble.__name__)
+    for ind in member_inds:
+        log.info("Training member {}/{} (pid {})".format(
+            ind + 1, len(members), os.getpid()))
+        torch.manual_seed(seed + ind)
+        np.random.seed(seed + ind)
+        member = members[ind]
+        member.train(train_loader,
+                     num_epochs,
+                     validation_loader,
+                     reshape_targets=reshape_targets)
+        torch.save(member.state_dict(),
+                   _member_checkpoint(checkpoint_dir, ind))
+
+
+class _MemberCall(nn.Module):
+    """Expose a member method as forward, for torch.func.functional_call"""
+    def __init__(self, member, method):
+        super().__init__()
+        self.member = member
+        self.method = method
+
+    def forward(self, inputs, *args):
+        return getattr(self.member, self.method)(inputs, *args)
+
+
 class EnsembleMember(nn.Module, ABC):
     """Parent class for keeping common logic in one place
     Instance variables:
         output_size (int): Represents the actual output size
             i.e number of dimensions D, or number of classes K
     """
+    # Class level default, also for members unpickled from before timing existed
+    _timer = timing.NULL_TIMER
+
     def __init__(self,
                  output_size,
                  loss_function,
@@ -212,26 +680,49 @@ class EnsembleMember(nn.Module, ABC):
         """
         store_loss = {"Train": list(), "Validation": list()}
 
-        scheduler = torch_optim.lr_scheduler.StepLR(self.optimizer,
-                                                    step_size=1,
-                                                    gamma=0.1)
+        scheduler = self._get_scheduler()
 
         # clr = utils.adapted_lr(c=0.7)
         # scheduler = torch.optim.lr_scheduler.LambdaLR(
         #    self.optimizer, [clr])
 
         for epoch_number in range(1, num_epochs + 1):
+            augmentation.advance_epoch(train_loader)
             loss = self._train_epoch(train_loader, validation_loader, reshape_targets=reshape_targets)
-            self._print_epoch(epoch_number, loss, "Train")
             store_loss["Train"].append(loss)
-            if validation_loader is not None:
-                loss = self._validate_epoch(validation_loader, reshape_targets=reshape_targets)
-                self._print_epoch(epoch_number, loss, "Validation")
-                store_loss["Validation"].append(loss)
-            if self._learning_rate_condition(epoch_number):
-                scheduler.step()
+            validation_loss = self._end_epoch(epoch_number, loss, scheduler,
+                                              validation_loader,
+                                              reshape_targets)
+            if validation_loss is not None:
+                store_loss["Validation"].append(validation_loss)
         return store_loss
 
+    def _get_scheduler(self):
+        return torch_optim.lr_scheduler.StepLR(self.optimizer,
+                                               step_size=1,
+                                               gamma=0.1)
+
+    def _end_epoch(self,
+                   epoch_number,
+                   loss,
+                   scheduler,
+                   validation_loader=None,
+                   reshape_targets=True):
+        """Common end of epoch logic: logging, validation and lr schedule
+
+        Returns:
+            validation_loss: None if no validation_loader is given
+        """
+        self._print_epoch(epoch_number, loss, "Train")
+        validation_loss = None
+        if validation_loader is not None:
+            validation_loss = self._validate_epoch(
+                validation_loader, reshape_targets=reshape_targets)
+            self._print_epoch(epoch_number, validation_loss, "Validation")
+        if self._learning_rate_condition(epoch_number):
+            scheduler.step()
+        return validation_loss
+
     def _train_epoch(self,
                      train_loader,
                      validation_loader=None,
@@ -245,37 +736,61 @@ class EnsembleMember(nn.Module, ABC):
 
         self._reset_metrics()
         running_loss = 0.0
+        self._timer.start_epoch()
         for (batch_count, batch) in enumerate(train_loader):
-            self.optimizer.zero_grad()
+            self._timer.lap("data")
             inputs, targets = batch
+            running_loss += self._train_step(inputs, targets,
+                                             reshape_targets)
+            self._timer.end_batch(inputs.size(0))
 
-            inputs, targets = inputs.float().to(
-                self.device), targets.float().to(self.device)
-
-            logits = self.forward(inputs)
-            outputs = self.transform_logits(logits)
+        self._timer.end_epoch(loss=running_loss / (batch_count + 1))
 
-            if reshape_targets:
-                # num_samples is different from batch size,
-                # the loss expects a target with shape
-                # (B, N, D), so that it can handle a full ensemble pred.
-                # Here, we use a single sample N = 1.
-                num_samples = 1
-                batch_size = targets.size(0)
-                targets = targets.reshape(
-                    (batch_size, num_samples, self.output_size))
-
-            loss = self.calculate_loss(outputs, targets)
-            loss.backward()
-            if self.grad_norm_bound is not None:
-                nn.utils.clip_grad_norm(self.parameters(),
-                                        self.grad_norm_bound)
-            self.optimizer.step()
-            running_loss += loss.item()
+        return running_loss / (batch_count + 1)
 
-            self._update_metrics(outputs, targets)
+    def _train_step(self, inputs, targets, reshape_targets=True):
+        """Common optimisation step on a single batch
+        Should NOT be overridden!
 
-        return running_loss / (batch_count + 1)
+        Returns:
+            loss (float): batch loss
+        """
+        timer = self._timer
+        self.optimizer.zero_grad()
+
+        inputs, targets = inputs.float().to(
+            self.device), targets.float().to(self.device)
+        timer.lap("to_device")
+
+        logits = self.forward(inputs)
+        outputs = self.transform_logits(logits)
+        timer.lap("forward")
+
+        if reshape_targets:
+            # num_samples is different from batch size,
+            # the loss expects a target with shape
+            # (B, N, D), so that it can handle a full ensemble pred.
+            # Here, we use a single sample N = 1.
+            num_samples = 1
+            batch_size = targets.size(0)
+            targets = targets.reshape(
+                (batch_size, num_samples, self.output_size))
+
+        loss = self.calculate_loss(outputs, targets)
+        timer.lap("loss")
+        loss.backward()
+        if self.grad_norm_bound is not None:
+            nn.utils.clip_grad_norm(self.parameters(),
+                                    self.grad_norm_bound)
+        timer.lap("backward")
+        self.optimizer.step()
+        timer.lap("step")
+
+        self._update_metrics(outputs, targets)
+        loss = loss.item()
+        timer.lap("metrics")
+
+        return loss
 
     def _validate_epoch(self, validation_loader, reshape_targets=True):
         """Common validate epoch method for all ensemble member classes
@@ -357,6 +872,28 @@ class EnsembleMember(nn.Module, ABC):
     def _add_metric(self, metric):
         self.metrics[metric.name] = metric
 
+    def enable_timing(self, output_file=None):
+        """Time the phases of every training batch, see timing.EpochTimer
+
+        Args:
+            output_file (str/Path): JSONL file for the epoch summaries,
+                defaults to a file next to the log file.
+        """
+        self._timer = timing.EpochTimer(output_file, device=self.device)
+        return self._timer
+
+    def disable_timing(self):
+        self._timer = timing.NULL_TIMER
+
+    def constructor_args(self):
+        """Constructor arguments, except device, for recreating the member
+
+        Used by Ensemble.save_ensemble_state. Override in subclasses,
+        values must be JSON serialisable or classes.
+        Defaults to None, i.e. not recreatable from the saved manifest.
+        """
+        return None
+
     def _output_to_metric_domain(self, metric, outputs):
         """Transform output for metric calculation
         Output distribution parameters are not necessarily
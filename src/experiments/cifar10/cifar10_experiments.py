@@ -2,7 +2,6 @@ import logging
 from pathlib import Path
 from datetime import datetime
 import numpy as np
-import torch
 import matplotlib.lines as matplot_lines
 from matplotlib import pyplot as plt
 import tikzplotlib
@@ -106,9 +105,11 @@ def ood_data_experiment():
                     if model in ["distilled", "ensemble_new", "dirichlet_distill"]:
                         data.set.predictions = np.mean(data.set.predictions, axis=1)
 
-                    acc[i, k-1, j] = metrics.accuracy(torch.tensor(data.set.predictions),
-                                                      torch.tensor(data.set.targets, dtype=torch.long))
-                    ece[i, k-1, j] = metrics.ece(data.set.predictions, data.set.targets)
+                    evaluator = metrics.ClassificationEvaluator(ece_binnings=(("equal_mass", 4), ))
+                    evaluator.update(data.set.targets, data.set.predictions)
+                    results = evaluator.compute()
+                    acc[i, k-1, j] = results["accuracy"]
+                    ece[i, k-1, j] = results["ece_equal_mass_4"]
 
         acc_list.append(acc.reshape(-1, acc.shape[-1]))
         ece_list.append(ece.reshape(-1, ece.shape[-1]))
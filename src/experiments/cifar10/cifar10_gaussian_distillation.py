@@ -13,7 +13,7 @@ from src.dataloaders import cifar10_corrupted
 from src.dataloaders import cifar10_ensemble_pred
 from src.ensemble import ensemble_wrapper
 from src.distilled import cifar_resnet_distilled
-from src.experiments.cifar10 import resnet_utils
+from src.experiments.cifar10 import resnet_utils, corruption_grid
 
 LOGGER = logging.getLogger(__name__)
 
@@ -173,8 +173,13 @@ def predictions_gaussian(model_dir="models/distilled_model_cifar10",
 
 
 def predictions_corrupted_data_gaussian(model_dir="models/distilled_model_cifar10",
-                                        file_dir="../../dataloaders/data/distilled_model_predictions.h5"):
-    """Make predictions on corrupted data with distilled model at model_dir"""
+                                        file_dir="../../dataloaders/data/distilled_model_predictions.h5",
+                                        resume=False, num_processes=1, num_threads=None):
+    """Make predictions on corrupted data with distilled model at model_dir
+
+    The corruptions and intensities are evaluated by num_processes processes with num_threads threads each
+    (see corruption_grid.evaluate_grid), resume=True continues in an existing file_dir.
+    """
 
     args = utils.parse_args()
 
@@ -190,76 +195,43 @@ def predictions_corrupted_data_gaussian(model_dir="models/distilled_model_cifar1
 
     distilled_model.eval_mode()
 
-    corruption_list = ["test", "brightness", "contrast", "defocus_blur", "elastic_transform", "fog", "frost",
-                       "gaussian_blur", "gaussian_noise", "glass_blur", "impulse_noise", "motion_blur", "pixelate",
-                       "saturate", "shot_noise", "snow", "spatter", "speckle_noise", "zoom_blur"]
-
-    hf = h5py.File(file_dir, 'w')
-
-    for i, corruption in enumerate(corruption_list):
-        corr_grp = hf.create_group(corruption)
-
-        if corruption == "test":
-            intensity_list = [0]
-        else:
-            intensity_list = [1, 2, 3, 4, 5]
-
-        for intensity in intensity_list:
-            # Load the data
-            data_set = cifar10_corrupted.Cifar10DataCorrupted(corruption=corruption, intensity=intensity,
-                                                              data_dir="../../")
-            dataloader = torch.utils.data.DataLoader(data_set.set,
-                                                     batch_size=100,
-                                                     shuffle=False,
-                                                     num_workers=0)
-            # data = []
-            predictions, targets, logits, mean, var, raw_output = [], [], [], [], [], []
-
-            for j, batch in enumerate(dataloader):
-                inputs, labels = batch
-                targets.append(labels.data.numpy())
-                # data.append(inputs.data.numpy())
-
-                inputs, labels = inputs.to(distilled_model.device), labels.to(distilled_model.device)
-
-                m, v, raw, logs, preds = distilled_model.predict(inputs, return_raw_data=True, return_logits=True,
-                                                                 comp_fix=True)
-                logits.append(logs.data.numpy())
-                mean.append(m.data.numpy())
-                var.append(v.data.numpy())
-                raw_output.append(raw.data.numpy())
-
-                predictions.append(preds.to(torch.device("cpu")).data.numpy())
-
-            sub_grp = corr_grp.create_group("intensity_" + str(intensity))
-
-            # data = np.concatenate(data, axis=0)
-            # sub_grp.create_dataset("data", data=data)
-
-            predictions = np.concatenate(predictions, axis=0)
-            sub_grp.create_dataset("predictions", data=predictions)
-
-            targets = np.concatenate(targets, axis=0)
-            sub_grp.create_dataset("targets", data=targets)
-
-            preds = np.argmax(np.mean(predictions, axis=1), axis=-1)
-
-            acc = np.mean(preds == targets)
-            LOGGER.info("Accuracy on {} data set with intensity {} is {}".format(corruption, intensity, acc))
-
-            logits = np.concatenate(logits, axis=0)
-            sub_grp.create_dataset("logits", data=logits)
-
-            mean = np.concatenate(mean, axis=0)
-            sub_grp.create_dataset("mean", data=mean)
-
-            var = np.concatenate(var, axis=0)
-            sub_grp.create_dataset("var", data=var)
-
-            raw_output = np.concatenate(raw_output, axis=0)
-            sub_grp.create_dataset("raw_output", data=raw_output)
-
-    hf.close()
+    def batches(corruption, intensity, dataloader):
+        num_correct, num_predicted = 0, 0
+        for inputs, labels in dataloader:
+            targets = labels.data.numpy()
+            inputs = inputs.to(distilled_model.device)
+
+            m, v, raw, logs, preds = distilled_model.predict(inputs, return_raw_data=True, return_logits=True,
+                                                             comp_fix=True)
+            predictions = preds.to(torch.device("cpu")).data.numpy()
+
+            num_correct += np.sum(np.argmax(np.mean(predictions, axis=1), axis=-1) == targets)
+            num_predicted += targets.shape[0]
+
+            yield dict(predictions=predictions, targets=targets, logits=logs.data.numpy(), mean=m.data.numpy(),
+                       var=v.data.numpy(), raw_output=raw.data.numpy())
+
+        acc = num_correct / max(num_predicted, 1)
+        LOGGER.info("Accuracy on {} data set with intensity {} is {}".format(corruption, intensity, acc))
+
+    def evaluate(corruption, intensity, start):
+        # Load the data
+        data_set = cifar10_corrupted.Cifar10DataCorrupted(corruption=corruption, intensity=intensity,
+                                                          data_dir="../../")
+        dataloader = torch.utils.data.DataLoader(torch.utils.data.Subset(data_set.set,
+                                                                         range(start, len(data_set.set))),
+                                                 batch_size=100,
+                                                 shuffle=False,
+                                                 num_workers=0)
+
+        return len(data_set.set), batches(corruption, intensity, dataloader)
+
+    corruption_grid.evaluate_grid(evaluate,
+                                  corruption_grid.grid_jobs(include_test=True),
+                                  file_dir,
+                                  num_processes=num_processes,
+                                  num_threads=num_threads,
+                                  resume=resume)
 
 
 def main():
@@ -0,0 +1,142 @@
+"""Evaluation of a model on the corruption x intensity grid of CIFAR-10-C
+
+Every (corruption, intensity) pair is an independent job. The jobs are spread
+over a pool of (forked) processes, each limited to num_threads torch threads,
+while the current process is the single writer: the workers send every
+evaluated batch back and it is written to the output file with a
+prediction_writer.PredictionWriter. Completed subsets are skipped and partly
+written subsets are resumed if the output file already exists.
+
+The job is given as a function
+    evaluate(corruption, intensity, start) -> (num_samples, batches)
+where batches iterates over dicts of np.ndarrays (field -> batch values),
+starting at sample 'start' of the subset.
+
+Note: num_processes > 1 forks the current process and is meant for models on the CPU.
+"""
+import os
+import queue
+import logging
+import traceback
+import torch
+import torch.multiprocessing as torch_mp
+from src.experiments.cifar10 import prediction_writer
+
+LOGGER = logging.getLogger(__name__)
+
+CORRUPTIONS = ["brightness", "contrast", "defocus_blur", "elastic_transform", "fog", "frost", "gaussian_blur",
+               "gaussian_noise", "glass_blur", "impulse_noise", "motion_blur", "pixelate", "saturate", "shot_noise",
+               "snow", "spatter", "speckle_noise", "zoom_blur"]
+INTENSITIES = [1, 2, 3, 4, 5]
+
+
+def grid_jobs(corruptions=None, intensities=None, include_test=False):
+    """(corruption, intensity) pairs, the uncorrupted test set is ("test", 0)"""
+    corruptions = CORRUPTIONS if corruptions is None else corruptions
+    intensities = INTENSITIES if intensities is None else intensities
+    jobs = [("test", 0)] if include_test else []
+    return jobs + [(corruption, intensity) for corruption in corruptions for intensity in intensities]
+
+
+def subset_name(corruption, intensity):
+    return corruption + "/intensity_" + str(intensity)
+
+
+def evaluate_grid(evaluate, jobs, filepath, num_processes=1, num_threads=None, resume=True, dtypes=None):
+    """Run all jobs and write the results to filepath
+
+    Args:
+        evaluate (function): evaluate(corruption, intensity, start) -> (num_samples, batches)
+        jobs (list((str, int))): (corruption, intensity) pairs, see grid_jobs
+        filepath (str/Path): output h5 file
+        num_processes (int): number of worker processes, 1 runs the jobs in this process
+        num_threads (int): torch threads per worker, defaults to splitting the cpus between the workers
+        resume (bool): skip/resume subsets already written to filepath
+        dtypes (dict): storage dtypes, see prediction_writer.PredictionWriter
+    """
+    with prediction_writer.PredictionWriter(filepath, resume=resume, dtypes=dtypes) as writer:
+        remaining = []
+        for corruption, intensity in jobs:
+            name = subset_name(corruption, intensity)
+            if writer.is_complete(name):
+                LOGGER.info("Predictions on {} already done".format(name))
+            else:
+                remaining.append((corruption, intensity, writer.num_written(name)))
+
+        if num_processes == 1:
+            for corruption, intensity, start in remaining:
+                num_samples, batches = evaluate(corruption, intensity, start)
+                _write_batches(writer, subset_name(corruption, intensity), start, num_samples, batches)
+            return
+
+        _evaluate_parallel(evaluate, remaining, writer, num_processes, num_threads)
+
+
+def _write_batches(writer, name, start, num_samples, batches):
+    for fields in batches:
+        writer.write(name, start, num_samples, **fields)
+        start += len(next(iter(fields.values())))
+    writer.finish(name)
+
+
+def _evaluate_parallel(evaluate, jobs, writer, num_processes, num_threads):
+    if num_threads is None:
+        num_threads = max(1, (os.cpu_count() or 1) // num_processes)
+
+    # Fork, so that the model and the evaluate function do not have to be pickled
+    context = torch_mp.get_context("fork")
+    job_queue = context.Queue()
+    result_queue = context.Queue()
+    for job in jobs:
+        job_queue.put(job)
+
+    num_processes = min(num_processes, len(jobs))
+    workers = [
+        context.Process(target=_worker, args=(evaluate, job_queue, result_queue, num_threads))
+        for _ in range(num_processes)
+    ]
+    for _ in workers:
+        job_queue.put(None)
+    for worker in workers:
+        worker.start()
+
+    try:
+        num_done = 0
+        while num_done < len(jobs):
+            try:
+                message = result_queue.get(timeout=1)
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in workers):
+                    raise RuntimeError("Evaluation workers stopped before all jobs were done")
+                continue
+
+            kind, name, content = message
+            if kind == "write":
+                start, num_samples, fields = content
+                writer.write(name, start, num_samples, **fields)
+            elif kind == "finish":
+                writer.finish(name)
+                num_done += 1
+            else:
+                raise RuntimeError("Evaluation of {} failed:\n{}".format(name, content))
+    finally:
+        for worker in workers:
+            if worker.is_alive() and num_done < len(jobs):
+                worker.terminate()
+            worker.join()
+
+
+def _worker(evaluate, job_queue, result_queue, num_threads):
+    torch.set_num_threads(num_threads)
+    for job in iter(job_queue.get, None):
+        corruption, intensity, start = job
+        name = subset_name(corruption, intensity)
+        try:
+            num_samples, batches = evaluate(corruption, intensity, start)
+            for fields in batches:
+                result_queue.put(("write", name, (start, num_samples, fields)))
+                start += len(next(iter(fields.values())))
+            result_queue.put(("finish", name, None))
+        except Exception:
+            result_queue.put(("error", name, traceback.format_exc()))
+            return
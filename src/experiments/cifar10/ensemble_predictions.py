@@ -3,20 +3,24 @@ from pathlib import Path
 from datetime import datetime
 from src import utils
 import numpy as np
-import tensorflow as tf
 import torch
-import h5py
 
 from src.dataloaders import cifar10, cifar10_corrupted
-from src.experiments.cifar10 import resnet_utils
+from src.experiments.cifar10 import resnet_utils, prediction_writer, corruption_grid
 from src.ensemble import ensemble
 from src.ensemble import cifar_resnet
 
 LOGGER = logging.getLogger(__name__)
 
 
-def ensemble_predictions(ensemble_filepath="models/resnet_ensemble", torch_data=True):  # If torch_data is not true, ensemble is assumed to be Tensorflow
-    """ Make and save predictions from ensemble """
+def ensemble_predictions(ensemble_filepath="models/resnet_ensemble", torch_data=True, resume=False,
+                         logits_dtype=np.float32):  # If torch_data is not true, ensemble is assumed to be Tensorflow
+    """ Make and save predictions from ensemble
+
+    The predictions are written batch by batch, an existing file is overwritten unless resume=True,
+    which continues an interrupted run of the same ensemble (see prediction_writer.PredictionWriter).
+    logits_dtype=np.float16 halves the size of the stored logits.
+    """
     train_set = cifar10.Cifar10Data(torch_data=torch_data)
     test_set = cifar10.Cifar10Data(train=False, torch_data=torch_data)
 
@@ -27,121 +31,82 @@ def ensemble_predictions(ensemble_filepath="models/resnet_ensemble", torch_data=
     labels = ["test", "train"]
 
     data_dir = "../../dataloaders/data/ensemble_predictions/"
-    hf = h5py.File(data_dir + 'ensemble_predictions.h5', 'w')
-
-    for data_set, label in zip(data_list, labels):
-        data, logits, predictions, targets = [], [], [], []
-
-        data_loader = torch_data.utils.data.DataLoader(data_set,
-                                                       batch_size=100,
-                                                       shuffle=False,
-                                                       num_workers=0)
-
-        for batch in data_loader:
-            inputs, labels = batch
+    with prediction_writer.PredictionWriter(data_dir + 'ensemble_predictions.h5', resume=resume,
+                                            dtypes={"logits": logits_dtype}) as writer:
+        for data_set, label in zip(data_list, labels):
+            if writer.is_complete(label):
+                LOGGER.info("Predictions on {} already done".format(label))
+                continue
+            start = writer.num_written(label)
+            for fields in _ensemble_batches(label, data_set, resnet_ensemble, torch_data, start, num_workers=0):
+                writer.write(label, start, len(data_set), **fields)
+                start += fields["targets"].shape[0]
+            writer.finish(label)
+
+
+def ensemble_predictions_corrupted_data(ensemble_filepath="models/resnet_ensemble", torch_data=True, resume=False,
+                                        logits_dtype=np.float32, num_processes=1, num_threads=None):
+    """ Make and save predictions from ensemble on corrupted data sets
+
+    The predictions are written batch by batch, an existing file is overwritten unless resume=True,
+    which continues an interrupted run of the same ensemble (see prediction_writer.PredictionWriter).
+    logits_dtype=np.float16 halves the size of the stored logits.
+    The corruptions and intensities are evaluated by num_processes processes with num_threads threads each
+    (see corruption_grid.evaluate_grid).
+    """
 
-            if not torch_data:
-                inputs = tf.convert_to_tensor(inputs.data.numpy())
-                targets.append(tf.convert_to_tensor(labels.data.numpy()))
+    output_size=10
+    resnet_ensemble = load_ensemble(ensemble_filepath, output_size=output_size)
 
-            data.append(inputs)
-            logs, preds = resnet_ensemble.predict(inputs)
-            logits.append(logs)
-            predictions.append(preds)
+    def evaluate(corruption, intensity, start):
+        # Load the data
+        data_set = cifar10_corrupted.Cifar10DataCorrupted(corruption=corruption, intensity=intensity,
+                                                          torch_data=False)
+        num_workers = 2 if num_processes == 1 else 0
+        name = corruption_grid.subset_name(corruption, intensity)
+        return len(data_set.set), _ensemble_batches(name, data_set.set, resnet_ensemble, torch_data, start,
+                                                    num_workers=num_workers)
 
+    data_dir = "../../dataloaders/data/ensemble_predictions/"
+    corruption_grid.evaluate_grid(evaluate,
+                                  corruption_grid.grid_jobs(),
+                                  data_dir + 'ensemble_predictions_corrupted_data.h5',
+                                  num_processes=num_processes,
+                                  num_threads=num_threads,
+                                  resume=resume,
+                                  dtypes={"logits": logits_dtype})
+
+
+def _ensemble_batches(name, data_set, resnet_ensemble, torch_data, start=0, batch_size=100, num_workers=0):
+    """Data, ensemble logits and predictions and targets of a data set, batch by batch from sample start.
+    The ensemble accuracy is logged at the end.
+    """
+    if start > 0:
+        LOGGER.info("Resuming predictions on {} from sample {}".format(name, start))
+
+    dataloader = torch.utils.data.DataLoader(torch.utils.data.Subset(data_set, range(start, len(data_set))),
+                                             batch_size=batch_size,
+                                             shuffle=False,
+                                             num_workers=num_workers)
+    num_correct, num_predicted = 0, 0
+    for inputs, labels in dataloader:
         if torch_data:
-            data = np.concatenate(data.data.numpy(), axis=0)
-            logits = np.concatenate(logits.data.numpy(), axis=0)
-            predictions = np.concatenate(predictions.data.numpy(), axis=0)
-            targets = np.concatenate(targets.data.numpy(), axis=0)
-
+            with torch.no_grad():
+                logits = resnet_ensemble.get_logits(inputs)
+                predictions = resnet_ensemble.transform_logits(logits)
+            logits, predictions = logits.cpu().numpy(), predictions.cpu().numpy()
         else:
-            data = tf.concat(data, axis=0).numpy()
-            logits = tf.concat(logits, axis=0).numpy()
-            predictions = tf.concat(predictions, axis=0).numpy()
-            targets = tf.concat(targets, axis=0).numpy()
+            import tensorflow as tf  # Only needed for the (TF) benchmark ensembles
+            logits, predictions = resnet_ensemble.predict(tf.convert_to_tensor(inputs.data.numpy()))
+            logits, predictions = logits.numpy(), predictions.numpy()
 
-        # Check accuracy
-        preds = np.argmax(np.mean(predictions, axis=1), axis=-1)
-        acc = np.mean(preds == np.array(data_set.set.targets))
-        LOGGER.info("Accuracy on {} data set is: {}".format(label, acc))
+        targets = labels.data.numpy()
+        num_correct += np.sum(np.argmax(np.mean(predictions, axis=1), axis=-1) == targets)
+        num_predicted += targets.shape[0]
 
-        grp = hf.create_group(label)
-        grp.create_dataset("data", data=data)
-        grp.create_dataset("logits", data=logits)
-        grp.create_dataset("predictions", data=predictions)
-        grp.create_dataset("targets", data=targets)
+        yield dict(data=inputs.data.numpy(), logits=logits, predictions=predictions, targets=targets)
 
-
-def ensemble_predictions_corrupted_data(ensemble_filepath="models/resnet_ensemble", torch_data=True):
-    """ Make and save predictions from ensemble on corrupted data sets"""
-
-    corruption_list = ["brightness", "contrast", "defocus_blur", "elastic_transform", "fog", "frost", "gaussian_blur",
-                       "gaussian_noise", "glass_blur", "impulse_noise", "motion_blur", "pixelate", "saturate",
-                       "shot_noise", "snow", "spatter", "speckle_noise", "zoom_blur"]
-    intensity_list = [1, 2, 3, 4, 5]
-
-    output_size=10
-    resnet_ensemble = load_ensemble(ensemble_filepath, output_size=output_size)
-
-    data_dir = "../../dataloaders/data/ensemble_predictions/"
-    hf = h5py.File(data_dir + 'ensemble_predictions_corrupted_data.h5', 'w')
-
-    for i, corruption in enumerate(corruption_list):
-        corr_grp = hf.create_group(corruption)
-
-        data = []
-        predictions = []
-        logits = []
-        targets = []
-
-        for intensity in intensity_list:
-            # Load the data
-            data_set = cifar10_corrupted.Cifar10DataCorrupted(corruption=corruption, intensity=intensity, torch_data=False)
-            dataloader = torch.utils.data.DataLoader(data_set.set,
-                                                     batch_size=100,
-                                                     shuffle=False,
-                                                     num_workers=2)
-            for batch in enumerate(dataloader):
-                inputs, labels = batch
-
-                if not torch_data:
-                    targets.append(tf.convert_to_tensor(labels.data.numpy()))
-                    inputs = tf.convert_to_tensor(inputs.data.numpy())
-
-                data.append(inputs)
-                logs, preds = resnet_ensemble.predict(inputs)
-                predictions.append(preds)
-                logits.append(logs)
-
-                sub_grp = corr_grp.create_group("intensity_" + str(intensity))
-
-                if torch_data:
-                    data = np.concatenate(data.data.numpy(), axis=0)
-                    predictions = np.concatenate(predictions.data.numpy(), axis=0)
-                    logits = np.concatenate(logits.data.numpy(), axis=0)
-                    targets = np.concatenate(targets.data.numpy(), axis=0)
-                else:
-                    data = tf.concat(data, axis=0).numpy()
-                    predictions = tf.concat(predictions, axis=0).numpy()
-                    logits = tf.concat(logits, axis=0).numpy()
-                    targets = tf.concat(targets, axis=0).numpy()
-
-                sub_grp.create_dataset("data", data=data)
-                sub_grp.create_dataset("predictions", data=predictions)
-                sub_grp.create_dataset("logits", data=logits)
-                sub_grp.create_dataset("targets", data=targets)
-
-                preds = np.argmax(np.mean(predictions, axis=1), axis=-1)
-                acc = np.mean(preds == targets)
-                LOGGER.info("Accuracy on {} data set with intensity {} is {}".format(corruption, intensity, acc))
-
-                data = []
-                predictions = []
-                logits = []
-                targets = []
-
-    hf.close()
+    LOGGER.info("Accuracy on {} data set is: {}".format(name, num_correct / max(num_predicted, 1)))
 
 
 def train_ensemble(args, ensemble_filepath="models/resnet_ensemble"):
@@ -0,0 +1,104 @@
+"""Streaming, resumable writer for predictions on (subsets of) data sets
+
+Every subset (e.g. "test" or "brightness/intensity_1") is an h5 group with one
+chunked dataset per field (e.g. data, logits, predictions, targets). The datasets
+are allocated on the first write and every batch is written in place, so the
+predictions of a whole subset are never held in memory.
+
+The number of samples written is stored in the group attributes, so that an
+interrupted run can be resumed where it stopped:
+
+    writer = PredictionWriter(filepath)
+    for name, data_set in subsets:
+        if writer.is_complete(name):
+            continue
+        start = writer.num_written(name)
+        for batch in loader over data_set, from index start:
+            ...
+            writer.write(name, start, len(data_set), data=..., logits=..., ...)
+            start += batch_size
+        writer.finish(name)
+    writer.close()
+"""
+import logging
+from pathlib import Path
+import numpy as np
+import h5py
+
+LOGGER = logging.getLogger(__name__)
+
+NUM_WRITTEN = "num_written"
+COMPLETE = "complete"
+
+
+class PredictionWriter:
+    """Streaming h5 writer
+
+    Args:
+        filepath (str/Path)
+        resume (bool): continue in an existing file, otherwise it is overwritten
+        chunk_size (int): number of samples per h5 chunk
+        dtypes (dict): storage dtype per field, e.g. {"logits": np.float16},
+            other fields keep the dtype of the written arrays.
+    """
+    def __init__(self, filepath, resume=True, chunk_size=1000, dtypes=None):
+        self.filepath = Path(filepath)
+        self.chunk_size = chunk_size
+        self.dtypes = dtypes if dtypes is not None else dict()
+
+        self.filepath.parent.mkdir(parents=True, exist_ok=True)
+        self._file = h5py.File(self.filepath, "a" if resume else "w")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+
+    def is_complete(self, name):
+        return name in self._file and bool(self._file[name].attrs.get(COMPLETE, False))
+
+    def num_written(self, name):
+        """Number of samples of the subset that are already written"""
+        if name not in self._file:
+            return 0
+        return int(self._file[name].attrs.get(NUM_WRITTEN, 0))
+
+    def write(self, name, start, num_samples, **fields):
+        """Write a batch
+
+        Args:
+            name (str): subset, h5 group path
+            start (int): index of the first sample of the batch in the subset
+            num_samples (int): total number of samples in the subset
+            fields (np.ndarray): batch of every field, e.g. logits=(B, N, K)
+        """
+        grp = self._file.require_group(name)
+        batch_size = None
+        for field, values in fields.items():
+            values = np.asarray(values)
+            if field not in grp:
+                self._create_dataset(grp, field, num_samples, values)
+            grp[field][start:start + values.shape[0]] = values
+            batch_size = values.shape[0]
+
+        # Progress is only recorded after the whole batch is written
+        grp.attrs[NUM_WRITTEN] = start + batch_size
+        self._file.flush()
+
+    def finish(self, name):
+        grp = self._file.require_group(name)
+        grp.attrs[COMPLETE] = True
+        self._file.flush()
+
+    def _create_dataset(self, grp, field, num_samples, values):
+        shape = (num_samples, ) + values.shape[1:]
+        chunks = (min(self.chunk_size, num_samples), ) + values.shape[1:]
+        grp.create_dataset(field,
+                           shape=shape,
+                           dtype=self.dtypes.get(field, values.dtype),
+                           chunks=chunks)
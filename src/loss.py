@@ -1,7 +1,6 @@
 """Loss module"""
 import torch
 import numpy as np
-import torch.distributions.multivariate_normal as torch_mvn
 import torch.distributions.dirichlet as torch_dirichlet
 import math
 
@@ -63,16 +62,17 @@ def gaussian_neg_log_likelihood(parameters, target):
             distribution, if not an ensemble prediction N=1.
     """
     mean, var = parameters
+    D = target.size(-1)
 
-    loss = 0
-    for batch_index, (mean_b, cov_b) in enumerate(zip(mean, var)):
-        cov_mat_b = torch.diag(cov_b)
-        distr = torch_mvn.MultivariateNormal(mean_b, cov_mat_b)
+    # The covariance is diagonal, so the log determinant and
+    # the Mahalanobis distance are sums over the D dimensions.
+    mean, var = mean.unsqueeze(1), var.unsqueeze(1)
+    log_det = torch.sum(torch.log(var), dim=-1)
+    mahalanobis = torch.sum((target - mean)**2 / var, dim=-1)
 
-        log_prob = distr.log_prob(target[batch_index, :, :])
-        loss -= torch.mean(log_prob) / target.size(0)
-
-    return loss
+    # Mean over ensemble members and batch of -log N(target; mean, var)
+    nll = (D * math.log(2 * math.pi) + log_det + mahalanobis) / 2
+    return nll.mean()
 
 
 def gaussian_neg_log_likelihood_diag(parameters, target):
@@ -124,20 +124,26 @@ def norm_inv_wish_nll(parameters, target):
     B, N, D = target[0].size()
 
     mu_0 = parameters[0]
-    lambda_ = parameters[1]
+    lambda_ = parameters[1].reshape((B, 1, 1))
     psi = parameters[2]
     nu = parameters[3]
     mu = target[0]
     var = target[1]
 
-    nll_gaussian = 0.0
-    for sample in np.arange(N):
-        cov_mat = var[:, sample, :]
-        nll_gaussian += gaussian_neg_log_likelihood((mu_0, cov_mat / lambda_),
-                                                    mu)
+    # Mean over the N covariances (var_n / lambda_) and the N means mu_m
+    # of the Gaussian nll. With diagonal covariances the quadratic term
+    # factorises into the mean squared deviation times the mean precision.
+    cov = var / lambda_
+    log_det = torch.sum(torch.log(cov), dim=-1).mean(dim=1)
+    mean_sq_dev = torch.mean((mu - mu_0.unsqueeze(1))**2, dim=1)
+    mean_prec = torch.mean(1 / cov, dim=1)
+    mahalanobis = torch.sum(mean_sq_dev * mean_prec, dim=-1)
+    nll_gaussian = torch.mean(D * math.log(2 * math.pi) + log_det +
+                              mahalanobis) / 2
+
     nll_inverse_wishart = inv_wish_nll((psi, nu), var)
 
-    return nll_gaussian / N + nll_inverse_wishart
+    return nll_gaussian + nll_inverse_wishart
 
 
 def inv_wish_nll(parameters, target):
@@ -154,37 +160,20 @@ def inv_wish_nll(parameters, target):
             """
 
     psi = parameters[0]
-    nu = parameters[1]
-
-    normalizer = 0
-    ll = 0
-    for i in np.arange(target.size(1)):
-        cov_mat = [
-            torch.diag(target[b, i, :]) for b in np.arange(target.size(0))
-        ]
-        cov_mat_det = torch.unsqueeze(torch.stack(
-            [torch.det(cov_mat_i) for cov_mat_i in cov_mat], dim=0),
-                                      dim=1)
-
-        psi_mat = [torch.diag(psi[b, :]) for b in np.arange(target.size(0))]
-        psi_mat_det = torch.unsqueeze(torch.stack(
-            [torch.det(psi_mat_i) for psi_mat_i in psi_mat], dim=0),
-                                      dim=1)
-
-        normalizer += (-(nu / 2) * torch.log(psi_mat_det) +
-                       (nu * target.size(-1) / 2) *
-                       torch.log(torch.tensor(2, dtype=torch.float32)) +
-                       torch.lgamma(nu / 2) +
-                       ((nu - target.size(-1) - 1) / 2) *
-                       torch.log(cov_mat_det)) / target.size(
-                           1)  # Mean over ensemble
-        ll += torch.stack([
-            0.5 * torch.trace(torch.inverse(psi_mat_i) * cov_mat_i)
-            for psi_mat_i, cov_mat_i in zip(psi_mat, cov_mat)
-        ],
-                          dim=0) / target.size(1)
-
-    return torch.mean(normalizer + ll)  # Mean over batch
+    nu = parameters[1].reshape((target.size(0), 1))
+    D = target.size(-1)
+
+    # Diagonal matrices: the log determinants are sums of logs
+    # and trace(psi^-1 cov) = sum(cov / psi)
+    log_det_psi = torch.sum(torch.log(psi), dim=-1, keepdim=True)
+    log_det_cov = torch.sum(torch.log(target), dim=-1).mean(dim=1,
+                                                             keepdim=True)
+
+    normalizer = (-(nu / 2) * log_det_psi + (nu * D / 2) * math.log(2) +
+                  torch.lgamma(nu / 2) + ((nu - D - 1) / 2) * log_det_cov)
+    ll = 0.5 * torch.sum(target / psi.unsqueeze(1), dim=-1).mean(dim=1)
+
+    return torch.mean(normalizer) + torch.mean(ll)  # Mean over batch
 
 
 def kl_div_gauss_and_mixture_of_gauss(parameters, target):
@@ -50,6 +50,97 @@ class Metric:
         self.counter = 0
 
 
+class StreamingMetric(Metric):
+    """Metric with O(1) memory
+
+    Drop-in replacement for Metric, which instead of storing every
+    observation keeps a (weighted) running count, mean and sum of squared
+    deviations (Welford's algorithm). The running values stay on the device
+    of the observations, so no device sync is needed until mean() or std()
+    is called. Accumulators from different workers/processes can be
+    combined with merge().
+
+    The metric functions which return Python floats (accuracy, error and
+    squared_error) are replaced by their tensor variants (see TENSOR_METRICS).
+    Other functions which return floats still sync on every update and are
+    accumulated on the cpu.
+    """
+    def __init__(self, name, function):
+        super().__init__(name, TENSOR_METRICS.get(function, function))
+        self.reset()
+
+    def update(self, targets, outputs, weight=1.0):
+        """Update metric
+
+        Args:
+            weight (float): Weight of the new observation,
+                e.g. the batch size. Defaults to equal weights.
+        """
+        with torch.no_grad():
+            new_observation = self.function(outputs, targets)
+            new_observation = torch.as_tensor(new_observation,
+                                              dtype=torch.float64)
+            if self.weight_sum is None:
+                self._init_state(new_observation.device)
+
+            self.weight_sum += weight
+            delta = new_observation - self.running_mean
+            self.running_mean += (weight / self.weight_sum) * delta
+            self.sum_sq_dev += weight * delta * (new_observation -
+                                                 self.running_mean)
+        self.counter += 1
+
+    def merge(self, other):
+        """Merge another StreamingMetric into this one (Chan et al.)"""
+        if other.weight_sum is None:
+            return
+        if self.weight_sum is None:
+            self._init_state(other.running_mean.device)
+
+        weight_sum = self.weight_sum + other.weight_sum
+        delta = other.running_mean.to(self.running_mean.device) - \
+            self.running_mean
+        self.running_mean += delta * other.weight_sum / weight_sum
+        self.sum_sq_dev += other.sum_sq_dev.to(self.sum_sq_dev.device) + \
+            delta**2 * self.weight_sum * other.weight_sum / weight_sum
+        self.weight_sum = weight_sum
+        self.counter += other.counter
+
+    def mean(self):
+        """Calculate mean of metric
+
+        Returns: mean (float): NaN if no observations
+        """
+        if self.weight_sum is None:
+            LOGGER.warning("Trying to calculate mean on unpopulated metric.")
+            return float("nan")
+        return self.running_mean.item()
+
+    def std(self):
+        """Calculate (unbiased) std of metric
+
+        Returns: std (float): NaN if less than 2 observations
+        """
+        if self.weight_sum is None:
+            LOGGER.warning("Trying to calculate std on unpopulated metric.")
+            return float("nan")
+        if self.weight_sum <= 1:
+            return float("nan")
+        return torch.sqrt(self.sum_sq_dev / (self.weight_sum - 1)).item()
+
+    def reset(self):
+        self.memory = list()
+        self.counter = 0
+        self.weight_sum = None
+        self.running_mean = None
+        self.sum_sq_dev = None
+
+    def _init_state(self, device):
+        self.weight_sum = 0.0
+        self.running_mean = torch.zeros((), dtype=torch.float64, device=device)
+        self.sum_sq_dev = torch.zeros((), dtype=torch.float64, device=device)
+
+
 def entropy(predicted_distribution, true_labels=None, correct_nan=False):
     """Entropy
 
@@ -131,6 +222,131 @@ def uncertainty_separation_variance(predicted_distribution, true_labels):
     return total_uncertainty, epistemic_uncertainty, aleatoric_uncertainty
 
 
+def uncertainty_separation_gaussian_mixture(predicted_distribution,
+                                            chunk_size=None):
+    """Mixture moments, total, epistemic and aleatoric uncertainty of a Gaussian ensemble
+
+    Closed form moments of the uniform mixture of the N ensemble members
+    N(mean_n, var_n) (diagonal covariances), computed on the device of the input:
+        Mixture mean: E_n[mean_n]
+        Aleatoric uncertainty: E_n[var_n]
+        Epistemic uncertainty: var_n[mean_n] (biased, i.e. over the N members)
+        Total uncertainty: variance of the mixture, aleatoric + epistemic
+
+    B = batch size, N = num ensemble members, D = target dimension
+
+    Args:
+        predicted_distribution: torch.tensor((B, N, 2D)): means and variances
+            concatenated along the last dim. (as the ensemble predictions),
+            or an iterable of such tensors, e.g. batches over a large input grid.
+        chunk_size (int): max. number of samples processed at a time,
+            bounds the memory used for the (B, N, D) intermediates.
+
+    Returns:
+        Mixture mean: torch.tensor((B, D))
+        Total uncertainty: torch.tensor((B, D))
+        Epistemic uncertainty: torch.tensor((B, D))
+        Aleatoric uncertainty: torch.tensor((B, D))
+    """
+
+    if isinstance(predicted_distribution, torch.Tensor):
+        predicted_distribution = [predicted_distribution]
+    return _chunked(_gaussian_mixture_moments, predicted_distribution,
+                    chunk_size)
+
+
+def _gaussian_mixture_moments(predicted_distribution):
+    D = predicted_distribution.size(-1) // 2
+    mean, var = predicted_distribution[:, :, :D], predicted_distribution[:, :, D:]
+
+    mixture_mean = torch.mean(mean, dim=1)
+    epistemic_uncertainty = torch.mean((mean - mixture_mean.unsqueeze(1))**2,
+                                       dim=1)
+    aleatoric_uncertainty = torch.mean(var, dim=1)
+    total_uncertainty = aleatoric_uncertainty + epistemic_uncertainty
+
+    return (mixture_mean, total_uncertainty, epistemic_uncertainty,
+            aleatoric_uncertainty)
+
+
+def uncertainty_separation_norm_inv_wish(parameters, chunk_size=None):
+    """Mixture moments, total, epistemic and aleatoric uncertainty of a distilled Normal-Inverse-Wishart
+
+    Closed form counterpart of uncertainty_separation_gaussian_mixture
+    for ensemble members (mean, var) distributed as trained by loss.norm_inv_wish_nll:
+    mean | var ~ N(mu_0, var / lambda_) and the variance dependent terms of
+    loss.inv_wish_nll, ((nu - D - 1) / 2) log|var| + tr(psi^-1 var) / 2,
+    make every diagonal element var_d ~ Gamma((D + 3 - nu) / 2, scale=2 psi_d).
+    The model keeps nu > D - 1, i.e. a positive shape, but the distribution is
+    proper for nu < D + 3 only: the moments of samples with larger nu are NaN.
+        Mixture mean: mu_0
+        Aleatoric uncertainty: E[var] = (D + 3 - nu) psi
+        Epistemic uncertainty: var[mean] = E[var] / lambda_
+        Total uncertainty: aleatoric + epistemic
+
+    B = batch size, D = target dimension
+
+    Args:
+        parameters (mu_0, lambda_, psi, nu): as output by the norm_inv_wish model,
+            mu_0: torch.tensor((B, D)), lambda_: torch.tensor((B, 1)),
+            psi: torch.tensor((B, D)), nu: torch.tensor((B, 1)),
+            or an iterable of such tuples, e.g. batches over a large input grid.
+        chunk_size (int): max. number of samples processed at a time
+
+    Returns:
+        Mixture mean: torch.tensor((B, D))
+        Total uncertainty: torch.tensor((B, D))
+        Epistemic uncertainty: torch.tensor((B, D))
+        Aleatoric uncertainty: torch.tensor((B, D))
+    """
+
+    if isinstance(parameters[0], torch.Tensor):
+        parameters = [parameters]
+    return _chunked(_norm_inv_wish_moments, parameters, chunk_size)
+
+
+def _norm_inv_wish_moments(parameters):
+    mu_0, lambda_, psi, nu = parameters
+    B, D = psi.size()
+    nu = nu.reshape((B, 1))
+
+    improper = nu >= D + 3
+    if improper.any():
+        LOGGER.warning(
+            "{} samples with nu >= D + 3 have no finite moments, set to NaN".
+            format(improper.sum().item()))
+    aleatoric_uncertainty = torch.where(improper,
+                                        torch.full_like(psi, float("nan")),
+                                        (D + 3 - nu) * psi)
+    epistemic_uncertainty = aleatoric_uncertainty / lambda_.reshape((B, 1))
+    total_uncertainty = aleatoric_uncertainty + epistemic_uncertainty
+
+    return (mu_0, total_uncertainty, epistemic_uncertainty,
+            aleatoric_uncertainty)
+
+
+def _chunked(function, inputs, chunk_size):
+    """Apply function to chunks of at most chunk_size samples and concatenate the outputs
+
+    inputs is an iterable of tensors or of tuples of tensors (split along the first dim.)
+    """
+
+    outputs = list()
+    for chunk in inputs:
+        if chunk_size is None:
+            outputs.append(function(chunk))
+        elif isinstance(chunk, torch.Tensor):
+            outputs.extend(function(part) for part in chunk.split(chunk_size))
+        else:
+            outputs.extend(
+                function(part)
+                for part in zip(*(tensor.split(chunk_size) for tensor in chunk)))
+
+    if len(outputs) == 1:
+        return outputs[0]
+    return tuple(torch.cat(parts) for parts in zip(*outputs))
+
+
 def uncertainty_separation_entropy(predicted_distribution,
                                    true_labels=None,
                                    logits=False,
@@ -189,6 +405,121 @@ def uncertainty_separation_entropy(predicted_distribution,
     return total_uncertainty, epistemic_uncertainty, aleatoric_uncertainty
 
 
+def uncertainty_separation_dirichlet(alphas):
+    """Total, epistemic and aleatoric uncertainty of a Dirichlet distribution
+
+    Closed form counterpart of uncertainty_separation_entropy for
+    categorical distributions p ~ Dir(alphas), i.e. without sampling:
+        Total uncertainty: H(E[p])
+        Aleatoric uncertainty: E[H(p)]
+            = -sum_k alpha_k / alpha_0 (psi(alpha_k + 1) - psi(alpha_0 + 1))
+        Epistemic uncertainty (mutual information): total - aleatoric
+
+    B = batch size, C = num classes
+
+    Args:
+        alphas: torch.tensor((B, C)): concentration parameters
+
+    Returns:
+        Tuple of uncertainties (relative the maximum uncertainty):
+        Total uncertainty: torch.tensor(B,)
+        Epistemic uncertainty: torch.tensor(B,)
+        Aleatoric uncertainty: torch.tensor(B,)
+    """
+
+    max_entropy = torch.log(
+        torch.tensor(alphas.size(-1), dtype=torch.float))
+
+    alpha_0 = torch.sum(alphas, dim=-1, keepdim=True)
+    mean_predicted_distribution = alphas / alpha_0
+
+    total_uncertainty = entropy(mean_predicted_distribution,
+                                None) / max_entropy
+    aleatoric_uncertainty = -torch.sum(
+        mean_predicted_distribution *
+        (torch.digamma(alphas + 1) - torch.digamma(alpha_0 + 1)),
+        dim=-1) / max_entropy
+    epistemic_uncertainty = total_uncertainty - aleatoric_uncertainty
+
+    return total_uncertainty, epistemic_uncertainty, aleatoric_uncertainty
+
+
+def uncertainty_separation_gaussian_logits(mean,
+                                           var,
+                                           num_points=3,
+                                           return_mean_prediction=False):
+    """Total, epistemic and aleatoric uncertainty for Gaussian logits
+
+    Deterministic (sigma point) approximation of
+    uncertainty_separation_entropy(samples, logits=True) for logits
+    z = (z_1, ..., z_{C-1}, 0) with independent z_k ~ N(mean_k, var_k).
+    The expectations are approximated with a Gauss-Hermite rule with
+    num_points nodes along each logit dimension (cut/first order
+    quadrature with (C - 1) * num_points + 1 evaluations).
+    num_points=3 is the unscented transform with kappa = 3 - (C - 1).
+    Accurate for moderate variances, degrades for var >> 1.
+
+    B = batch size, C = num classes
+
+    Args:
+        mean: torch.tensor((B, C - 1))
+        var: torch.tensor((B, C - 1))
+        num_points (int): Quadrature nodes per logit dimension
+        return_mean_prediction (bool): Also return E[softmax(z)]
+
+    Returns:
+        Tuple of uncertainties (relative the maximum uncertainty):
+        Total uncertainty: torch.tensor(B,)
+        Epistemic uncertainty: torch.tensor(B,)
+        Aleatoric uncertainty: torch.tensor(B,)
+        (if return_mean_prediction) Mean prediction: torch.tensor((B, C))
+    """
+
+    B, D = mean.size()
+    max_entropy = torch.log(torch.tensor(D + 1, dtype=torch.float))
+
+    nodes, weights = np.polynomial.hermite_e.hermegauss(num_points)
+    nodes = torch.tensor(nodes, dtype=mean.dtype, device=mean.device)
+    weights = torch.tensor(weights / np.sum(weights),
+                           dtype=mean.dtype,
+                           device=mean.device).repeat(D)
+
+    # Nodes along one logit dimension at a time: (B, D, num_points, D)
+    offsets = torch.sqrt(var).unsqueeze(-1) * nodes
+    axes = torch.eye(D, dtype=mean.dtype, device=mean.device)
+    points = mean[:, None, None, :] + offsets[:, :, :, None] * axes[None, :,
+                                                                       None, :]
+    points = torch.cat((mean.unsqueeze(1), points.reshape(
+        (B, D * num_points, D))),
+                       dim=1)
+    weights = torch.cat((torch.tensor([1.0 - D],
+                                      dtype=mean.dtype,
+                                      device=mean.device), weights))
+
+    logits = torch.cat((points, torch.zeros_like(points[:, :, :1])), dim=-1)
+    log_p = torch.log_softmax(logits, dim=-1)
+    p = torch.exp(log_p)
+
+    mean_predicted_distribution = torch.sum(weights[None, :, None] * p, dim=1)
+    # The negative center weight can give (small) negative probabilities
+    mean_predicted_distribution = mean_predicted_distribution.clamp(
+        min=torch.finfo(mean.dtype).tiny)
+    mean_predicted_distribution = mean_predicted_distribution / torch.sum(
+        mean_predicted_distribution, dim=-1, keepdim=True)
+
+    aleatoric_uncertainty = -torch.sum(
+        weights * torch.sum(p * log_p, dim=-1), dim=1) / max_entropy
+    total_uncertainty = entropy(mean_predicted_distribution,
+                                None) / max_entropy
+    epistemic_uncertainty = total_uncertainty - aleatoric_uncertainty
+
+    if return_mean_prediction:
+        return (total_uncertainty, epistemic_uncertainty,
+                aleatoric_uncertainty, mean_predicted_distribution)
+
+    return total_uncertainty, epistemic_uncertainty, aleatoric_uncertainty
+
+
 def accuracy(predicted_distribution, true_labels):
     """ Accuracy
     B = batch size
@@ -201,12 +532,14 @@ def accuracy(predicted_distribution, true_labels):
     Returns:
         Accuracy: float
     """
-    predicted_labels, _ = utils.tensor_argmax(predicted_distribution)
-    number_of_elements = np.prod(true_labels.size())
+    return accuracy_tensor(predicted_distribution, true_labels).item()
 
-    if number_of_elements == 0:
-        number_of_elements = 1
-    return (true_labels == predicted_labels).sum().item() / number_of_elements
+
+def accuracy_tensor(predicted_distribution, true_labels):
+    """Accuracy as a 0-dim tensor on the device of the predictions, see accuracy"""
+    predicted_labels, _ = utils.tensor_argmax(predicted_distribution)
+    number_of_elements = max(true_labels.numel(), 1)
+    return (true_labels == predicted_labels).sum() / number_of_elements
 
 
 def error(predicted_distribution, true_labels):
@@ -220,12 +553,14 @@ def error(predicted_distribution, true_labels):
     Returns:
         Error: float
     """
-    predicted_labels = utils.tensor_argmax(predicted_distribution)
-    number_of_elements = np.prod(true_labels.size())
-    if number_of_elements == 0:
-        number_of_elements = 1
+    return error_tensor(predicted_distribution, true_labels).item()
+
 
-    return (true_labels != predicted_labels).sum().item() / number_of_elements
+def error_tensor(predicted_distribution, true_labels):
+    """Error as a 0-dim tensor on the device of the predictions, see error"""
+    predicted_labels, _ = utils.tensor_argmax(predicted_distribution)
+    number_of_elements = max(true_labels.numel(), 1)
+    return (true_labels != predicted_labels).sum() / number_of_elements
 
 
 def root_mean_squared_error(predictions, targets):
@@ -289,62 +624,196 @@ def squared_error(predictions, targets):
         Error: float
     """
 
-    number_of_elements = targets.size(0)
-    if number_of_elements == 0:
-        number_of_elements = 1
+    return squared_error_tensor(predictions, targets).item()
+
 
+def squared_error_tensor(predictions, targets):
+    """Squared error as a 0-dim tensor on the device of the predictions, see squared_error"""
+    number_of_elements = max(targets.size(0), 1)
     return ((targets - predictions[:, :targets.size(-1)])**
-            2).sum().item() / number_of_elements
+            2).sum() / number_of_elements
 
 
-def ece(predicted_distribution, labels):
+# Tensor variants of the float valued metric functions, used by StreamingMetric
+TENSOR_METRICS = {
+    accuracy: accuracy_tensor,
+    error: error_tensor,
+    squared_error: squared_error_tensor,
+}
+
+
+def ece(predicted_distribution,
+        labels,
+        num_bins=4,
+        binning="equal_mass",
+        return_bins=False):
     """"" Expected Calibration Error
     B = batch size
     D = output dimension
+    M = number of bins
+
+    The predictions are binned by confidence (max. probability), bin m
+    holds the confidences c with edge_{m-1} < c <= edge_m.
 
     Args:
         labels: np.ndarray(B,)
         predictions: np.ndarray(B, D)
+        num_bins (int): Number of bins, defaults to quartiles
+        binning (str): "equal_mass" (quantile edges) or
+            "equal_width" (edges m / M)
+        return_bins (bool): Also return the per-bin statistics,
+            e.g. for reliability diagrams
 
     Returns:
         Expected Calibration Error: float
+        (if return_bins) tuple:
+            accuracy: np.ndarray(M,), NaN for empty bins
+            confidence: np.ndarray(M,), NaN for empty bins
+            count: np.ndarray(M,)
     """
 
-    num_samples = labels.shape[0]
+    predicted_distribution = np.asarray(predicted_distribution)
+    labels = np.asarray(labels)
 
     confidence = np.max(predicted_distribution, axis=-1)
-    predicted_labels = np.argmax(predicted_distribution, axis=-1)
+    correct = np.argmax(predicted_distribution, axis=-1) == labels
+
+    return _calibration_error(confidence, correct, num_bins, binning,
+                              return_bins)
 
-    # Sort the data
-    ind = np.argsort(confidence)
 
-    confidence = confidence[ind]
-    predicted_labels = predicted_labels[ind]
-    labels = labels[ind]
+def _calibration_error(confidence, correct, num_bins, binning, return_bins):
+    """ECE from the confidence and correctness of every prediction, see ece"""
 
-    # Will go for quartiles
-    split_values = np.array(
-        np.quantile(confidence, q=[0.25, 0.50, 0.75, 1.0], axis=0).tolist())
+    num_samples = confidence.shape[0]
+    upper_edges = np.arange(1, num_bins + 1) / num_bins
+    if binning == "equal_mass":
+        upper_edges = np.quantile(confidence, q=upper_edges)
+    elif binning != "equal_width":
+        raise ValueError("Unknown binning: {}".format(binning))
 
-    num_buckets = split_values.shape[0]
-    acc = np.zeros((num_buckets, 1))
-    conf = np.zeros((num_buckets, 1))
-    bucket_count = np.zeros((num_buckets, 1))
+    bin_inds = np.minimum(
+        np.searchsorted(upper_edges, confidence, side="left"), num_bins - 1)
 
-    j = 0
-    for i in range(num_buckets):
-        while confidence[j] <= split_values[i]:
-            acc[i] += predicted_labels[j] == labels[j]
-            conf[i] += confidence[j]
-            bucket_count[i] += 1
-            j += 1
+    bucket_count = np.bincount(bin_inds, minlength=num_bins)
+    acc_sum = np.bincount(bin_inds, weights=correct, minlength=num_bins)
+    conf_sum = np.bincount(bin_inds, weights=confidence, minlength=num_bins)
 
-            if j >= confidence.shape[0]:
-                break
+    non_empty = bucket_count > 0
+    acc = np.full(num_bins, np.nan)
+    conf = np.full(num_bins, np.nan)
+    acc[non_empty] = acc_sum[non_empty] / bucket_count[non_empty]
+    conf[non_empty] = conf_sum[non_empty] / bucket_count[non_empty]
 
-    acc = acc / bucket_count
-    conf = conf / bucket_count
+    ece = np.sum((bucket_count[non_empty] / num_samples) *
+                 np.abs(acc[non_empty] - conf[non_empty]))
 
-    ece = np.sum((bucket_count / num_samples) * np.abs(acc - conf))
+    if return_bins:
+        return ece, (acc, conf, bucket_count)
 
     return ece
+
+
+class ClassificationEvaluator:
+    """Single pass evaluation of classification metrics
+
+    The argmax, max and per sample statistics of every batch are computed
+    once and accumulated on the device of the predictions, so that a data set
+    can be evaluated in batches with update() and all metrics are read out
+    with compute():
+        accuracy, error, ece_<binning>_<num_bins> (for every ECE binning),
+        nll (mean -log p(label)), brier (mean sum_k (p_k - 1{k = label})^2)
+        and entropy (mean entropy of the (mean) predicted distribution).
+    For ensemble predictions (B, N, K) the metrics are computed on the mean
+    prediction, and the mean total, epistemic and aleatoric uncertainty
+    (see uncertainty_separation_entropy) are included as well.
+
+    The ECE bins depend on all confidences (equal mass binning), so the
+    confidence and correctness of every sample (2 values) are kept until compute().
+
+    B = batch size, N = num ensemble members, K = num classes
+
+    Args:
+        ece_binnings (iterable((str, int))): (binning, num_bins) pairs, see ece
+    """
+    def __init__(self, ece_binnings=(("equal_mass", 4), ("equal_width", 10))):
+        self.ece_binnings = tuple(ece_binnings)
+        self.reset()
+
+    def update(self, targets, outputs):
+        """Update with a batch
+
+        Args:
+            targets: torch.tensor(B) / np.ndarray(B): labels
+            outputs: torch.tensor((B(, N), K)) / np.ndarray: predicted distribution(s)
+        """
+        with torch.no_grad():
+            outputs = torch.as_tensor(outputs)
+            targets = torch.as_tensor(targets, device=outputs.device).long()
+
+            if outputs.dim() == 3:
+                self._update_uncertainty(outputs)
+                outputs = torch.mean(outputs, dim=1)
+
+            confidence, predicted_labels = torch.max(outputs, dim=-1)
+            correct = predicted_labels == targets
+            label_prob = outputs.gather(-1, targets.unsqueeze(-1)).squeeze(-1)
+
+            self._confidence.append(confidence)
+            self._correct.append(correct)
+            self._add("nll", -torch.log(
+                label_prob.clamp(min=torch.finfo(outputs.dtype).tiny)))
+            self._add("brier", torch.sum(outputs**2, dim=-1) - 2 * label_prob + 1)
+            self._add("entropy", -torch.sum(torch.special.xlogy(outputs, outputs),
+                                            dim=-1))
+            self.counter += targets.size(0)
+
+    def compute(self):
+        """All metrics
+
+        Returns:
+            metrics (dict): name -> float, NaN if no observations
+        """
+        if self.counter == 0:
+            LOGGER.warning("Trying to compute unpopulated metrics.")
+
+        results = {"accuracy": float("nan"), "error": float("nan")}
+        for binning, num_bins in self.ece_binnings:
+            results["ece_{}_{}".format(binning, num_bins)] = float("nan")
+        if self.counter == 0:
+            return results
+
+        # Single host transfer for the binning
+        confidence = torch.cat(self._confidence).cpu().numpy()
+        correct = torch.cat(self._correct).cpu().numpy()
+
+        results["accuracy"] = correct.sum() / self.counter
+        results["error"] = 1 - results["accuracy"]
+        for binning, num_bins in self.ece_binnings:
+            results["ece_{}_{}".format(binning, num_bins)] = _calibration_error(
+                confidence, correct, num_bins, binning, False)
+        for name, value in self._sums.items():
+            results[name] = value.item() / self.counter
+
+        return results
+
+    def reset(self):
+        self.counter = 0
+        self._confidence = list()
+        self._correct = list()
+        self._sums = dict()
+
+    def _add(self, name, values):
+        value = torch.sum(values, dtype=torch.float64)
+        self._sums[name] = self._sums[name] + value if name in self._sums else value
+
+    def _update_uncertainty(self, outputs):
+        max_entropy = np.log(outputs.size(-1))
+        mean_outputs = torch.mean(outputs, dim=1)
+        total_uncertainty = -torch.sum(torch.special.xlogy(mean_outputs, mean_outputs),
+                                       dim=-1) / max_entropy
+        aleatoric_uncertainty = -torch.sum(torch.special.xlogy(outputs, outputs),
+                                           dim=-1).mean(dim=1) / max_entropy
+        self._add("total_uncertainty", total_uncertainty)
+        self._add("epistemic_uncertainty", total_uncertainty - aleatoric_uncertainty)
+        self._add("aleatoric_uncertainty", aleatoric_uncertainty)
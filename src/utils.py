@@ -11,8 +11,6 @@ import torch
 import torch.nn as nn
 import math
 import numpy as np
-import matplotlib
-import matplotlib.pyplot as plt
 
 
 def to_one_hot(labels, number_of_classes):
@@ -269,55 +267,101 @@ def plot_sparsification_error(ax, y_true, y_pred, uncert_meas, label,
 
 
 def sparsification_error(y_true, y_pred, uncert_meas, num_partitions):
-    """Plot errors sorted according to uncertainty measure"""
+    """Sparsification error curves
+
+    The error (MSE) of the remaining points when removing the fraction
+    rel_part_size of the points, ordered by decreasing uncertainty
+    and by decreasing true error (oracle) respectively.
+    The data is sorted once and the errors of all partitions are given by
+    reversed cumulative sums of the sorted squared errors.
+
+    B = number of points, P = num_partitions, M = number of uncertainty
+    measures
+
+    Args:
+        y_true (torch.tensor((B, D)))
+        y_pred (torch.tensor((B, D)))
+        uncert_meas (torch.tensor(B) or torch.tensor((B, M))): (B, 1)
+            is a single measure, as torch.tensor(B)
+        num_partitions (int)
+
+    Returns:
+        rel_part_sizes (torch.tensor(P))
+        sparse_err (torch.tensor(P) or torch.tensor((P, M)) if M > 1):
+            normalised with the error of the full data.
+        sparse_err_oracle (torch.tensor(P)): normalised
+            with the error of the full data.
+    """
+
+    y_true, y_pred = torch.as_tensor(y_true), torch.as_tensor(y_pred)
+    uncert_meas = torch.as_tensor(uncert_meas)
+    num_points = len(y_true)
+    squared_error = ((y_true - y_pred)**2).reshape(
+        (num_points, -1)).mean(dim=1).double()
+
+    uncert_meas = uncert_meas.reshape((num_points, -1))
+    if uncert_meas.size(1) == 1:
+        uncert_meas = uncert_meas[:, 0]
+
+    if uncert_meas.dim() > 1:
+        uncert_order = torch.argsort(uncert_meas, dim=0, descending=True)
+    else:
+        uncert_order = generate_order(uncert_meas)
+    true_order = generate_order(squared_error)
 
-    uncert_order = generate_order(uncert_meas)
-    true_order = generate_order((y_true - y_pred)**2)
-
-    rel_part_sizes = list()
-    sparse_err = list()
-    sparse_err_oracle = list()
-
-    for ind in np.linspace(0, len(y_true), num_partitions, dtype=np.int):
-        if ind == len(y_true):
-            error_part, error_part_oracle = 0.0, 0.0
-            rel_part_size = 1.0
-        else:
-
-            y_true_part, y_pred_part = y_true[uncert_order[ind:]], y_pred[
-                uncert_order[ind:]]
-            error_part = torch.mean((y_true_part - y_pred_part)**2)
-
-            y_true_part_oracle, y_pred_part_oracle = y_true[
-                true_order[ind:]], y_pred[true_order[ind:]]
-            error_part_oracle = torch.mean(
-                (y_true_part_oracle - y_pred_part_oracle)**2)
-            rel_part_size = 1 - len(y_true_part) / len(y_true)
-
-        rel_part_sizes.append(rel_part_size)
-        sparse_err.append(error_part)
-        sparse_err_oracle.append(error_part_oracle)
-
-    rel_part_sizes, sparse_err, sparse_err_oracle = torch.tensor(
-        rel_part_sizes), torch.tensor(sparse_err), torch.tensor(
-            sparse_err_oracle)
-    sparse_err /= sparse_err[0].item()
-    sparse_err_oracle /= sparse_err_oracle[0].item()
+    inds = torch.as_tensor(
+        np.linspace(0, num_points, num_partitions, dtype=int))
+    rel_part_sizes = inds.to(torch.get_default_dtype()) / num_points
+
+    sparse_err = _mean_error_after_removal(squared_error[uncert_order], inds)
+    sparse_err_oracle = _mean_error_after_removal(squared_error[true_order],
+                                                  inds)
+
+    sparse_err = (sparse_err / sparse_err[0]).to(torch.get_default_dtype())
+    sparse_err_oracle = (sparse_err_oracle / sparse_err_oracle[0]).to(
+        torch.get_default_dtype())
     return rel_part_sizes, sparse_err, sparse_err_oracle
 
 
+def _mean_error_after_removal(sorted_error, inds):
+    """Mean of sorted_error[ind:] for every ind in inds (0 if empty)
+
+    Args:
+        sorted_error (torch.tensor(B) or torch.tensor((B, M)))
+        inds (torch.tensor(P))
+    """
+    num_points = sorted_error.size(0)
+    # Reversed cumulative sum, with an extra zero for ind = B
+    tail_sums = torch.flip(torch.cumsum(torch.flip(sorted_error, [0]), dim=0),
+                           [0])
+    tail_sums = torch.cat((tail_sums, torch.zeros_like(tail_sums[:1])))
+    num_remaining = (num_points - inds).clamp(min=1).double()
+    if sorted_error.dim() > 1:
+        num_remaining = num_remaining.unsqueeze(1)
+    return tail_sums[inds] / num_remaining
+
+
 def ause(y_true, y_pred, uncert_meas, num_partitions):
+    """Area under the sparsification error curve
+
+    Args:
+        uncert_meas (torch.tensor(B) or torch.tensor((B, M))): one AUSE
+            is computed per uncertainty measure if M > 1, otherwise a
+            single (0-dim) AUSE.
+    """
     y_true = y_true.reshape((y_true.shape[0], 1))
     y_pred = y_pred.reshape((y_pred.shape[0], 1))
     x, y, oracle = sparsification_error(y_true, y_pred, uncert_meas,
                                         num_partitions)
+    if y.dim() > 1:
+        oracle = oracle.unsqueeze(1)
     sparse_err_diff = y - oracle
-    return area_under_curve(x=x, y=sparse_err_diff)
+    return area_under_curve(x=x, y=sparse_err_diff, dim=0)
 
 
-def area_under_curve(x, y):
+def area_under_curve(x, y, dim=-1):
     """Calculate area under curve"""
-    return torch.trapz(x=x, y=y)
+    return torch.trapz(y, x, dim=dim)
 
 
 def plot_uncert(ax,
@@ -3,12 +3,12 @@ import sys
 import re
 from datetime import datetime
 import numpy as np
-import git
 
 ACTIVE_BRANCH_REGEX = re.compile(r"(.+)/(.+)/(.+)")
 
 
 def experiment_info(model, args, misc=None):
+    import git  # GitPython is only needed for the experiment metadata
     repo = git.Repo(search_parent_directories=True)
     git_info = {
         "branch": repo.active_branch.name,
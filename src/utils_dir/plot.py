@@ -1,5 +1,6 @@
 import numpy as np
 import torch
+import src.utils as utils
 
 
 def generate_order(arr, descending=True):
@@ -44,48 +45,14 @@ def plot_sparsification_error(ax, y_true, y_pred, uncert_meas, label,
 
 
 def sparsification_error(y_true, y_pred, uncert_meas, num_partitions):
-    """Plot errors sorted according to uncertainty measure"""
-
-    uncert_order = generate_order(uncert_meas)
-    true_order = generate_order((y_true - y_pred)**2)
-
-    rel_part_sizes = list()
-    sparse_err = list()
-    sparse_err_oracle = list()
-
-    for ind in np.linspace(0, len(y_true), num_partitions, dtype=np.int):
-        if ind == len(y_true):
-            error_part, error_part_oracle = 0.0, 0.0
-            rel_part_size = 1.0
-        else:
-
-            y_true_part, y_pred_part = y_true[uncert_order[ind:]], y_pred[
-                uncert_order[ind:]]
-            error_part = torch.mean((y_true_part - y_pred_part)**2)
-
-            y_true_part_oracle, y_pred_part_oracle = y_true[
-                true_order[ind:]], y_pred[true_order[ind:]]
-            error_part_oracle = torch.mean(
-                (y_true_part_oracle - y_pred_part_oracle)**2)
-            rel_part_size = 1 - len(y_true_part) / len(y_true)
-
-        rel_part_sizes.append(rel_part_size)
-        sparse_err.append(error_part)
-        sparse_err_oracle.append(error_part_oracle)
-
-    rel_part_sizes, sparse_err, sparse_err_oracle = torch.tensor(
-        rel_part_sizes), torch.tensor(sparse_err), torch.tensor(
-            sparse_err_oracle)
-    sparse_err /= sparse_err[0].item()
-    sparse_err_oracle /= sparse_err_oracle[0].item()
-    return rel_part_sizes, sparse_err, sparse_err_oracle
+    """Plot errors sorted according to uncertainty measure, see src.utils.sparsification_error"""
+    return utils.sparsification_error(y_true, y_pred, uncert_meas,
+                                      num_partitions)
 
 
 def ause(y_true, y_pred, uncert_meas, num_partitions):
-    x, y, oracle = sparsification_error(y_true, y_pred, uncert_meas,
-                                        num_partitions)
-    sparse_err_diff = y - oracle
-    return area_under_curve(x=x, y=sparse_err_diff)
+    """Area under the sparsification error curve, see src.utils.ause"""
+    return utils.ause(y_true, y_pred, uncert_meas, num_partitions)
 
 
 def area_under_curve(x, y):
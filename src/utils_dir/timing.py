@@ -0,0 +1,148 @@
+"""Per phase timing of training epochs
+
+An EpochTimer splits the wall time of every batch into phases (data loading,
+host to device transfer, teacher prediction, forward, loss, backward and
+optimiser step) by calling lap(phase) at the end of every phase.
+The summary of every epoch, including throughput and peak memory (RSS),
+is appended as a JSON line to a file, by default next to the log file
+set up by utils.setup_logger.
+
+Usage:
+    model.enable_timing()
+    model.train(train_loader, num_epochs)
+"""
+import sys
+import json
+import time
+import logging
+from pathlib import Path
+import torch
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+LOGGER = logging.getLogger(__name__)
+
+
+class EpochTimer:
+    """Per phase wall time, accumulated over the batches of an epoch
+
+    Args:
+        output_file (str/Path): JSONL file for the epoch summaries,
+            defaults to the log file (see timing_file) or no file.
+        device (torch.device): CUDA devices are synchronised before every lap,
+            so that asynchronous kernels are attributed to the right phase.
+    """
+    def __init__(self, output_file=None, device=torch.device("cpu")):
+        if output_file is None:
+            output_file = timing_file()
+        self.output_file = Path(output_file) if output_file is not None else None
+        self.device = torch.device(device)
+        self.epoch = 0
+        self.history = list()
+        self._reset()
+
+    def start_epoch(self):
+        self.epoch += 1
+        self._reset()
+        self._epoch_start = self._last = self._now()
+
+    def lap(self, phase):
+        """Attribute the time since the previous lap to phase"""
+        now = self._now()
+        self._phases[phase] = self._phases.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def end_batch(self, batch_size):
+        self._num_batches += 1
+        self._num_samples += batch_size
+
+    def end_epoch(self, **extra):
+        """Summarise the epoch and write it to the output file
+
+        Args:
+            extra: additional (JSON serialisable) values to record, e.g. the loss
+
+        Returns:
+            record (dict)
+        """
+        total_time = self._now() - self._epoch_start
+        num_batches = max(self._num_batches, 1)
+        record = {
+            "epoch": self.epoch,
+            "num_batches": self._num_batches,
+            "num_samples": self._num_samples,
+            "time": total_time,
+            "samples_per_s": self._num_samples / total_time if total_time > 0 else None,
+            "phases": {phase: {"total": value, "per_batch": value / num_batches}
+                       for phase, value in self._phases.items()},
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        if self.device.type == "cuda":
+            record["peak_cuda_memory_mb"] = torch.cuda.max_memory_allocated(self.device) / 2**20
+        record.update(extra)
+
+        self.history.append(record)
+        if self.output_file is not None:
+            with self.output_file.open("a") as jsonl_file:
+                jsonl_file.write(json.dumps(record) + "\n")
+
+        return record
+
+    def _reset(self):
+        self._phases = dict()
+        self._num_batches = 0
+        self._num_samples = 0
+        self._epoch_start = self._last = self._now()
+
+    def _now(self):
+        if self.device.type == "cuda":
+            torch.cuda.synchronize(self.device)
+        return time.perf_counter()
+
+
+class NullTimer:
+    """Timer which does nothing, used when timing is disabled"""
+    def start_epoch(self):
+        pass
+
+    def lap(self, phase):
+        pass
+
+    def end_batch(self, batch_size):
+        pass
+
+    def end_epoch(self, **extra):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+def timing_file(logger=None):
+    """Timing file next to the log file of logger (root logger if None), None if there is no log file"""
+    logger = logger if logger else logging.getLogger()
+    for handler in logger.handlers:
+        if isinstance(handler, logging.FileHandler):
+            return Path(handler.baseFilename).with_suffix(".timing.jsonl")
+    return None
+
+
+def peak_rss_mb():
+    """Peak resident set size of the process in MB, None if unavailable"""
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux
+    if sys.platform == "darwin":
+        return peak_rss / 2**20
+    return peak_rss / 2**10
+
+
+def batch_size(inputs):
+    """Number of samples in a batch of inputs (tensor or list of tensors)"""
+    if isinstance(inputs, (list, tuple)):
+        inputs = inputs[0]
+    return inputs.size(0)
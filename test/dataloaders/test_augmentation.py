@@ -0,0 +1,121 @@
+"""Test: batched data augmentation"""
+import unittest
+import numpy as np
+import torch
+import src.dataloaders.augmentation as augmentation
+import src.dataloaders.batched as batched
+import src.dataloaders.cifar10_ensemble_pred as cifar10_ensemble_pred
+import src.loss as custom_loss
+from src.ensemble import simple_regressor
+
+NUM_SAMPLES = 16
+
+
+def _reference_augmentation(imgs, offsets_y, offsets_x, flips, padding):
+    padded = np.pad(imgs, ((0, 0), (padding, padding), (padding, padding), (0, 0)))
+    height, width = imgs.shape[1:3]
+    augmented = []
+    for img, offset_y, offset_x, flip in zip(padded, offsets_y, offsets_x, flips):
+        img = img[offset_y:offset_y + height, offset_x:offset_x + width]
+        augmented.append(img[:, ::-1] if flip else img)
+    return np.stack(augmented)
+
+
+class AugmentedSet(torch.utils.data.Dataset):
+    def __init__(self, imgs, augmentation):
+        self.imgs = imgs
+        self.augmentation = augmentation
+
+    def __len__(self):
+        return len(self.imgs)
+
+    def __getitem__(self, index):
+        img = self.augmentation(self.imgs[[index]], [index])[0]
+        return img.reshape(-1).float(), torch.zeros(1)
+
+
+class RecordingRegressor(simple_regressor.Model):
+    """Records the training inputs"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.inputs = list()
+
+    def forward(self, x):
+        self.inputs.append(x.clone())
+        return super().forward(x)
+
+
+class TestBatchAugmentation(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.imgs = rng.randint(0, 256, (NUM_SAMPLES, 32, 32, 3)).astype(np.uint8)
+        self.indices = np.arange(NUM_SAMPLES)
+
+    def test_crop_and_flip(self):
+        augment = augmentation.BatchAugmentation(padding=4, seed=3)
+        offsets_y, offsets_x, flips = augment._random_parameters(NUM_SAMPLES, self.indices)
+        true_imgs = _reference_augmentation(self.imgs, offsets_y.numpy(), offsets_x.numpy(), flips.numpy(), 4)
+        imgs = augment(self.imgs, self.indices)
+        self.assertEqual(imgs.dtype, torch.uint8)
+        np.testing.assert_array_equal(imgs.numpy(), true_imgs)
+
+    def test_identity(self):
+        augment = augmentation.BatchAugmentation(padding=0, flip=False, seed=3)
+        np.testing.assert_array_equal(augment(self.imgs, self.indices).numpy(), self.imgs)
+
+    def test_random_parameters(self):
+        augment = augmentation.BatchAugmentation(padding=4, seed=3)
+        offsets_y, offsets_x, flips = augment._random_parameters(10000, np.arange(10000))
+        for offsets in (offsets_y, offsets_x):
+            self.assertEqual(offsets.min().item(), 0)
+            self.assertEqual(offsets.max().item(), 8)
+        self.assertAlmostEqual(flips.float().mean().item(), 0.5, delta=0.03)
+
+    def test_reproducible(self):
+        augment = augmentation.BatchAugmentation(seed=3)
+        imgs = augment(self.imgs, self.indices)
+        for index in (0, 7, 15):
+            self.assertTrue(torch.equal(augment(self.imgs[[index]], [index])[0], imgs[index]))
+
+        augment.set_epoch(1)
+        self.assertFalse(torch.equal(augment(self.imgs, self.indices), imgs))
+
+    def test_epochs_differ_in_training(self):
+        imgs = self.imgs[:, :8, :8, :1]
+        augment = augmentation.BatchAugmentation(padding=2, seed=3)
+        loader = torch.utils.data.DataLoader(AugmentedSet(imgs, augment), batch_size=NUM_SAMPLES)
+        model = RecordingRegressor(layer_sizes=[64, 2], loss_function=custom_loss.gaussian_nll_1d)
+        model.optimizer = torch.optim.SGD(model.parameters(), lr=0.0)
+        model.train(loader, num_epochs=2)
+
+        self.assertEqual(augment.epoch, 2)
+        self.assertEqual(len(model.inputs), 2)
+        self.assertFalse(torch.equal(model.inputs[0], model.inputs[1]))
+
+    def test_advance_epoch_unwraps_sets(self):
+        augment = augmentation.BatchAugmentation(seed=3)
+        data_set = torch.utils.data.Subset(AugmentedSet(self.imgs, augment), range(4))
+        augmentation.advance_epoch(torch.utils.data.DataLoader(data_set))
+        self.assertEqual(augment.epoch, 1)
+
+    def test_seed_requires_indices(self):
+        augment = augmentation.BatchAugmentation(seed=3)
+        with self.assertRaises(ValueError):
+            augment(self.imgs)
+
+    def test_ensemble_predictions_set(self):
+        rng = np.random.RandomState(1)
+        predictions = rng.rand(NUM_SAMPLES, 2, 10).astype(np.float32)
+        targets = rng.randint(0, 10, NUM_SAMPLES)
+        data = cifar10_ensemble_pred.CustomSet(self.imgs, predictions, predictions, targets,
+                                               cifar10_ensemble_pred.transforms.ToTensor(),
+                                               augmentation.BatchAugmentation(seed=3))
+        batch_imgs = torch.cat([imgs for (imgs, _, _), _ in batched.batch_loader(data, batch_size=5)])
+        for num_workers in (0, 2):
+            loader = torch.utils.data.DataLoader(data, batch_size=4, num_workers=num_workers)
+            imgs = torch.cat([imgs for (imgs, _, _), _ in loader])
+            self.assertTrue(torch.equal(imgs, batch_imgs))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+"""Test: batch level data loading"""
+import unittest
+import numpy as np
+import torch
+import torchvision.transforms as transforms
+import src.dataloaders.batched as batched
+import src.dataloaders.cifar10_ensemble_pred as cifar10_ensemble_pred
+import src.dataloaders.cifar10_corrupted as cifar10_corrupted
+import src.dataloaders.cifar10_benchmark_model_predictions as cifar10_benchmark_model_predictions
+
+NUM_SAMPLES = 25
+BATCH_SIZE = 4
+
+
+def _assert_equal_batches(test_case, batch, true_batch):
+    if isinstance(true_batch, (tuple, list)):
+        test_case.assertEqual(len(batch), len(true_batch))
+        for values, true_values in zip(batch, true_batch):
+            _assert_equal_batches(test_case, values, true_values)
+    else:
+        test_case.assertEqual(batch.dtype, true_batch.dtype)
+        test_case.assertTrue(torch.equal(batch, true_batch))
+
+
+class TestBatchLoading(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.imgs = rng.randint(0, 256, (NUM_SAMPLES, 32, 32, 3)).astype(np.uint8)
+        self.predictions = rng.rand(NUM_SAMPLES, 3, 10).astype(np.float32)
+        self.logits = rng.randn(NUM_SAMPLES, 3, 10).astype(np.float32)
+        self.targets = rng.randint(0, 10, NUM_SAMPLES)
+
+    def _assert_same_as_per_sample(self, data_set):
+        true_loader = torch.utils.data.DataLoader(data_set, batch_size=BATCH_SIZE, shuffle=False)
+        loader = batched.batch_loader(data_set, batch_size=BATCH_SIZE, shuffle=False)
+        self.assertEqual(len(loader), len(true_loader))
+        for batch, true_batch in zip(loader, true_loader):
+            _assert_equal_batches(self, batch, true_batch)
+
+        unordered = [7, 2, 2, 11]
+        true_batch = torch.utils.data.default_collate([data_set[index] for index in unordered])
+        _assert_equal_batches(self, data_set[unordered], true_batch)
+
+    def test_ensemble_predictions_set(self):
+        data_set = cifar10_ensemble_pred.CustomSet(self.imgs, self.predictions, self.logits, self.targets,
+                                                   transforms.ToTensor())
+        self._assert_same_as_per_sample(data_set)
+
+    def test_corrupted_set(self):
+        self._assert_same_as_per_sample(cifar10_corrupted.CustomSet(self.imgs, list(self.targets)))
+        self._assert_same_as_per_sample(cifar10_corrupted.CustomSet(self.imgs, self.targets, torch_data=False))
+
+    def test_benchmark_predictions_set(self):
+        data_set = cifar10_benchmark_model_predictions.CustomSet(self.predictions[:, 0, :], self.targets)
+        self._assert_same_as_per_sample(data_set)
+
+    def test_shuffled_batches(self):
+        data_set = cifar10_benchmark_model_predictions.CustomSet(self.predictions[:, 0, :], self.targets)
+        loader = batched.batch_loader(data_set, batch_size=BATCH_SIZE, shuffle=True, drop_last=True)
+        targets = torch.cat([targets for _, targets in loader])
+        self.assertEqual(targets.shape[0], (NUM_SAMPLES // BATCH_SIZE) * BATCH_SIZE)
+
+
+if __name__ == '__main__':
+    unittest.main()
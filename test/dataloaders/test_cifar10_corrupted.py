@@ -0,0 +1,67 @@
+"""Test: CIFAR-10-C dataloader"""
+import tempfile
+import unittest
+from pathlib import Path
+import numpy as np
+import src.dataloaders.cifar10_corrupted as cifar10_corrupted
+
+SET_SIZE = 10000
+CORRUPTIONS = ["brightness", "contrast", "defocus_blur", "elastic_transform", "fog", "frost", "gaussian_blur",
+               "gaussian_noise", "glass_blur", "impulse_noise", "motion_blur", "pixelate", "saturate",
+               "shot_noise", "snow", "spatter", "speckle_noise", "zoom_blur"]
+
+
+class TestCifar10DataCorrupted(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.data_dir = self._tmp_dir.name + "/"
+        self.npy_dir = Path(self.data_dir) / "dataloaders/data/CIFAR-10-C"
+        self.npy_dir.mkdir(parents=True)
+
+        rng = np.random.RandomState(0)
+        # Small images keep the test fast, only the number of images per intensity matters
+        self.labels = rng.randint(0, 10, 5 * SET_SIZE)
+        np.save(self.npy_dir / "labels.npy", self.labels)
+        self.data = dict()
+        for corruption in CORRUPTIONS[:2]:
+            self.data[corruption] = rng.randint(0, 256, (5 * SET_SIZE, 2, 2, 3)).astype(np.uint8)
+        for corruption in CORRUPTIONS:
+            np.save(self.npy_dir / (corruption + ".npy"), self.data.get(corruption, self.data["brightness"]))
+
+    def tearDown(self):
+        cifar10_corrupted.close_h5_files()
+        self._tmp_dir.cleanup()
+
+    def _assert_intensities(self):
+        for corruption in ("brightness", "contrast"):
+            for intensity in (1, 3, 5):
+                data = cifar10_corrupted.Cifar10DataCorrupted(corruption, intensity, data_dir=self.data_dir)
+                start, stop = (intensity - 1) * SET_SIZE, intensity * SET_SIZE
+                np.testing.assert_array_equal(data.set.data, self.data[corruption][start:stop])
+                np.testing.assert_array_equal(data.set.labels, self.labels[start:stop])
+
+    def test_contiguous_layout(self):
+        cifar10_corrupted.make_h5py_data_file(str(self.npy_dir) + "/")
+        self._assert_intensities()
+
+    def test_chunked_layout(self):
+        cifar10_corrupted.make_h5py_data_file(str(self.npy_dir) + "/", chunk_size=1000, compression="gzip")
+        f = cifar10_corrupted.open_h5_file(self.npy_dir / "corrupted_data.h5")
+        self.assertEqual(f["brightness"]["data"].chunks, (1000, 2, 2, 3))
+        self._assert_intensities()
+
+    def test_indices(self):
+        cifar10_corrupted.make_h5py_data_file(str(self.npy_dir) + "/")
+        ind = np.array([4, 0, 9999])
+        data = cifar10_corrupted.Cifar10DataCorrupted("contrast", 2, data_dir=self.data_dir, ind=ind)
+        np.testing.assert_array_equal(data.set.data, self.data["contrast"][SET_SIZE + ind])
+        np.testing.assert_array_equal(data.set.labels, self.labels[SET_SIZE + ind])
+
+    def test_file_handle_reuse(self):
+        cifar10_corrupted.make_h5py_data_file(str(self.npy_dir) + "/")
+        filepath = self.npy_dir / "corrupted_data.h5"
+        self.assertIs(cifar10_corrupted.open_h5_file(filepath), cifar10_corrupted.open_h5_file(str(filepath)))
+
+
+if __name__ == '__main__':
+    unittest.main()
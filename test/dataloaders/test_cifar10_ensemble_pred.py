@@ -0,0 +1,88 @@
+"""Test: CIFAR-10 ensemble predictions dataloader"""
+import tempfile
+import unittest
+from pathlib import Path
+import h5py
+import numpy as np
+import torch
+import src.dataloaders.cifar10_ensemble_pred as cifar10_ensemble_pred
+
+NUM_SAMPLES = 20
+ENSEMBLE_SIZE = 3
+NUM_CLASSES = 10
+
+
+def _write_predictions_file(data_dir):
+    rng = np.random.RandomState(0)
+    with h5py.File(Path(data_dir) / "ensemble_predictions.h5", "w") as f:
+        for name in ("train", "test"):
+            grp = f.create_group(name)
+            grp.create_dataset("data",
+                               data=rng.randint(0, 256, (NUM_SAMPLES, 32, 32, 3)).astype(np.uint8))
+            logits = rng.randn(NUM_SAMPLES, ENSEMBLE_SIZE, NUM_CLASSES).astype(np.float32)
+            predictions = np.exp(logits) / np.exp(logits).sum(axis=-1, keepdims=True)
+            grp.create_dataset("logits", data=logits)
+            grp.create_dataset("predictions", data=predictions)
+            grp.create_dataset("targets", data=rng.randint(0, NUM_CLASSES, NUM_SAMPLES))
+
+
+class TestLazyCifar10Data(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.data_dir = self._tmp_dir.name + "/"
+        _write_predictions_file(self.data_dir)
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def _assert_same_samples(self, lazy_set, eager_set):
+        self.assertEqual(len(lazy_set), len(eager_set))
+        for index in range(len(eager_set)):
+            (img, preds, logits), target = lazy_set[index]
+            (true_img, true_preds, true_logits), true_target = eager_set[index]
+            self.assertTrue(torch.equal(img, true_img))
+            self.assertTrue(torch.equal(preds, true_preds))
+            self.assertTrue(torch.equal(logits, true_logits))
+            self.assertTrue(torch.equal(target, true_target))
+
+    def test_lazy_equals_eager(self):
+        ind = np.array([3, 1, 7, 8, 9, 15])
+        for shared_cache in (False, True):
+            lazy_data = cifar10_ensemble_pred.Cifar10Data(ind=ind, data_dir=self.data_dir, lazy=True,
+                                                          shared_cache=shared_cache)
+            eager_data = cifar10_ensemble_pred.Cifar10Data(ind=ind, data_dir=self.data_dir)
+            self._assert_same_samples(lazy_data.set, eager_data.set)
+            # Second pass is served from the cache, if enabled
+            self._assert_same_samples(lazy_data.set, eager_data.set)
+
+    def test_read_unordered_chunk(self):
+        lazy_set = cifar10_ensemble_pred.Cifar10Data(train=False, data_dir=self.data_dir, lazy=True).set
+        eager_set = cifar10_ensemble_pred.Cifar10Data(train=False, data_dir=self.data_dir).set
+        for indices in ([4, 5, 6, 7], [12, 2, 2, 19, 0]):
+            imgs, preds, logits, targets = lazy_set.read(indices)
+            np.testing.assert_array_equal(imgs, eager_set.data[0][indices])
+            np.testing.assert_array_equal(preds, eager_set.data[1][indices])
+            np.testing.assert_array_equal(logits, eager_set.data[2][indices])
+            np.testing.assert_array_equal(targets, eager_set.targets[indices])
+
+    def test_batch_equals_samples(self):
+        lazy_set = cifar10_ensemble_pred.Cifar10Data(data_dir=self.data_dir, lazy=True).set
+        (imgs, preds, logits), targets = lazy_set[[5, 0, 9]]
+        for batch_index, index in enumerate([5, 0, 9]):
+            (true_img, true_preds, true_logits), true_target = lazy_set[index]
+            self.assertTrue(torch.equal(imgs[batch_index], true_img))
+            self.assertTrue(torch.equal(preds[batch_index], true_preds))
+            self.assertTrue(torch.equal(logits[batch_index], true_logits))
+            self.assertTrue(torch.equal(targets[batch_index], true_target))
+
+    def test_data_loader_workers(self):
+        lazy_set = cifar10_ensemble_pred.Cifar10Data(data_dir=self.data_dir, lazy=True, shared_cache=True).set
+        eager_set = cifar10_ensemble_pred.Cifar10Data(data_dir=self.data_dir).set
+        loader = torch.utils.data.DataLoader(lazy_set, batch_size=4, num_workers=2)
+        (imgs, _, _), targets = next(iter(loader))
+        self.assertTrue(torch.equal(targets, torch.tensor(eager_set.targets[:4])))
+        self.assertEqual(imgs.shape, (4, 3, 32, 32))
+
+
+if __name__ == '__main__':
+    unittest.main()
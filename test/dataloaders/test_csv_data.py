@@ -0,0 +1,90 @@
+"""Test: array backing for the synthetic CSV data sets"""
+import os
+import tempfile
+import unittest
+from pathlib import Path
+import numpy as np
+import src.dataloaders.csv_data as csv_data
+import src.dataloaders.gaussian as gaussian
+import src.dataloaders.gaussian_sinus as gaussian_sinus
+import src.dataloaders.one_dim_regression as one_dim_regression
+
+
+class TestLoadCsv(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.file = Path(self._tmp_dir.name) / "data"
+        self.values = np.random.randn(50, 3)
+        np.savetxt(self.file, self.values, delimiter=",")
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_in_memory(self):
+        data = csv_data.load_csv(self.file)
+        self.assertNotIsInstance(data, np.memmap)
+        self.assertEqual(data.dtype, np.float32)
+        np.testing.assert_allclose(data, self.values, rtol=1e-6)
+        self.assertFalse(csv_data.sidecar_file(self.file).exists())
+
+    def test_memmap(self):
+        data = csv_data.load_csv(self.file, memmap_threshold=0)
+        self.assertIsInstance(data, np.memmap)
+        self.assertEqual(data.dtype, np.float32)
+        np.testing.assert_allclose(data, self.values, rtol=1e-6)
+        self.assertTrue(csv_data.sidecar_file(self.file).exists())
+
+    def test_regenerate_sidecar(self):
+        csv_data.load_csv(self.file, memmap_threshold=0)
+        new_values = np.random.randn(20, 3)
+        np.savetxt(self.file, new_values, delimiter=",")
+        # Make sure that the CSV file is newer than the sidecar, regardless of the timestamp resolution
+        npy_time = csv_data.sidecar_file(self.file).stat().st_mtime_ns
+        os.utime(self.file, ns=(npy_time + 10**9, npy_time + 10**9))
+        data = csv_data.load_csv(self.file, memmap_threshold=0)
+        np.testing.assert_allclose(data, new_values, rtol=1e-6)
+
+
+class TestCsvDatasets(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tmp_dir.name)
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def _assert_matches_csv(self, dataset):
+        full_data = dataset.get_full_data()
+        self.assertEqual(len(dataset), full_data.shape[0])
+        for index in (0, 7, len(dataset) - 1):
+            inputs, targets = dataset[index]
+            self.assertEqual(inputs.dtype, np.float32)
+            np.testing.assert_allclose(inputs, full_data[index, :-1], rtol=1e-6)
+            np.testing.assert_allclose(targets, full_data[index, -1:].astype(targets.dtype).reshape(targets.shape),
+                                       rtol=1e-6)
+
+    def test_regression_data(self):
+        store_file = self.dir / "1d_reg"
+        self._assert_matches_csv(one_dim_regression.SyntheticRegressionData(store_file, n_samples=30))
+        self._assert_matches_csv(one_dim_regression.SyntheticRegressionData(store_file, n_samples=30,
+                                                                            reuse_data=True))
+
+    def test_gaussian_sinus(self):
+        store_file = self.dir / "gauss_sinus"
+        self._assert_matches_csv(gaussian_sinus.GaussianSinus(store_file, n_samples=30))
+        self._assert_matches_csv(gaussian_sinus.GaussianSinus(store_file, n_samples=30, reuse_data=True))
+
+    def test_gaussian_data(self):
+        store_file = self.dir / "2d_gaussian"
+        dataset = gaussian.SyntheticGaussianData(mean_0=[0, 0], mean_1=[10, 0], cov_0=np.eye(2), cov_1=np.eye(2),
+                                                 store_file=store_file, n_samples=30)
+        self._assert_matches_csv(dataset)
+        _, label = dataset.get_instance_of_label(1)
+        self.assertEqual(label, 1)
+        dataset = gaussian.SyntheticGaussianData(mean_0=[0, 0], mean_1=[10, 0], cov_0=np.eye(2), cov_1=np.eye(2),
+                                                 store_file=store_file, n_samples=30, reuse_data=True)
+        self._assert_matches_csv(dataset)
+
+
+if __name__ == '__main__':
+    unittest.main()
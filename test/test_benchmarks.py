@@ -0,0 +1,42 @@
+import json
+import unittest
+from pathlib import Path
+from benchmarks import run
+from benchmarks import suite
+
+
+def _report(times):
+    return {"results": {name: {"median": median} for name, median in times.items()}}
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_compare(self):
+        baseline = _report({"a": 1.0, "b": 1.0, "c": 1.0})
+        report = _report({"a": 1.1, "b": 1.5, "d": 1.0})
+        comparison = {row["name"]: row for row in run.compare(report, baseline, threshold=0.2)}
+        self.assertEqual(set(comparison), {"a", "b"})
+        self.assertAlmostEqual(comparison["b"]["ratio"], 1.5)
+        self.assertFalse(comparison["a"]["regression"])
+        self.assertTrue(comparison["b"]["regression"])
+
+    def test_run(self):
+        names = [name for name in suite.names() if name.startswith("loss.gaussian_neg_log_likelihood")]
+        self.assertEqual(len(names), 4)
+        report = run.run(names[:1], repeat=2, min_time=0.001)
+        timing = report["results"][names[0]]
+        self.assertGreater(timing["median"], 0)
+        self.assertEqual(timing["repeat"], 2)
+        self.assertIn("torch", report["environment"])
+
+
+    def test_reference_baseline(self):
+        with (Path(run.__file__).parent / "baseline.json").open() as json_file:
+            baseline = json.load(json_file)
+        self.assertIn("environment", baseline)
+        self.assertEqual(set(baseline["results"]), set(suite.names()))
+
+    def test_compare_missing_baseline(self):
+        self.assertEqual(run.main(["--filter", "^$", "--compare", "no_such_baseline.json"]), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from unittest import mock
+import torch
+import torch_testing as tt
+from src.distilled import cifar_resnet_distilled
+from src.experiments.cifar10 import resnet_utils
+
+NUM_DECIMALS = 4
+
+
+def _model(device=torch.device("cpu")):
+    torch.manual_seed(1)
+    model = cifar_resnet_distilled.CifarResnetLogits(None,
+                                                     resnet_utils.BasicBlock,
+                                                     [1, 1, 1, 1],
+                                                     device=device)
+    model.eval_mode()
+    return model
+
+
+def _per_sample_logits(model, inputs, eps):
+    """Previous implementation, one MultivariateNormal per input, with given standard normal noise eps"""
+    mean, var = model.forward(inputs)
+    num_samples = eps.size(1)
+    samples = torch.zeros([inputs.size(0), num_samples, int(model.output_size / 3)])
+    for i in range(inputs.size(0)):
+        rv = torch.distributions.multivariate_normal.MultivariateNormal(
+            loc=mean[i, :], covariance_matrix=torch.diag(var[i, :]))
+        # rv.rsample: loc + scale_tril @ eps
+        samples[i, :, :] = rv.loc + eps[i] @ rv.scale_tril.T
+    return torch.cat((samples, torch.zeros(samples.size(0), num_samples, 1)), dim=-1)
+
+
+class TestCifarResnetLogits(unittest.TestCase):
+    def test_predict_logits(self):
+        B, num_samples, K = 4, 20, 10
+        model = _model()
+        inputs = torch.rand((B, 3, 32, 32))
+        eps = torch.randn((B, num_samples, K - 1))
+        with torch.no_grad():
+            expected = _per_sample_logits(model, inputs, eps)
+            with mock.patch("torch.randn", return_value=eps):
+                samples, = model.predict_logits(inputs, num_samples)
+
+        self.assertEqual(samples.size(), (B, num_samples, K))
+        tt.assert_equal(samples[:, :, -1], torch.zeros((B, num_samples)))
+        tt.assert_almost_equal(samples, expected, decimal=NUM_DECIMALS)
+
+    def test_predict_logits_raw_data(self):
+        B, num_samples, K = 3, 5, 10
+        model = _model()
+        inputs = torch.rand((B, 3, 32, 32))
+        with torch.no_grad():
+            samples, mean, var, raw_output = model.predict_logits(
+                inputs, num_samples, return_raw_data=True)
+            expected_mean, expected_var, expected_raw_output = model.forward(
+                inputs, return_raw=True)
+
+        self.assertEqual(samples.size(), (B, num_samples, K))
+        tt.assert_equal(mean, expected_mean)
+        tt.assert_equal(var, expected_var)
+        tt.assert_equal(raw_output, expected_raw_output)
+        self.assertEqual(raw_output.size(), (B, 3 * (K - 1)))
+
+    @unittest.skipUnless(torch.cuda.is_available(), "Requires CUDA")
+    def test_predict_logits_device(self):
+        device = torch.device("cuda")
+        model = _model(device)
+        with torch.no_grad():
+            samples, mean, _, _ = model.predict_logits(
+                torch.rand((2, 3, 32, 32), device=device), 5, return_raw_data=True)
+        self.assertEqual(samples.device.type, device.type)
+        self.assertEqual(mean.device.type, device.type)
+
+    def test_predict_logits_model_device(self):
+        model = _model()
+        with torch.no_grad():
+            samples, = model.predict_logits(torch.rand((2, 3, 32, 32)), 5)
+        self.assertEqual(samples.device.type, model.device.type)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+"""Test: parallel evaluation of the corruption x intensity grid"""
+import tempfile
+import unittest
+from pathlib import Path
+import h5py
+import numpy as np
+from src.experiments.cifar10 import corruption_grid
+
+NUM_SAMPLES = 25
+BATCH_SIZE = 10
+
+
+def _evaluate(corruption, intensity, start):
+    seed = corruption_grid.CORRUPTIONS.index(corruption) * 10 + intensity
+    values = np.random.RandomState(seed).randn(NUM_SAMPLES, 3)
+
+    def batches():
+        for batch_start in range(start, NUM_SAMPLES, BATCH_SIZE):
+            batch = values[batch_start:batch_start + BATCH_SIZE]
+            yield dict(predictions=batch, targets=np.argmax(batch, axis=-1))
+
+    return NUM_SAMPLES, batches()
+
+
+def _failing_evaluate(corruption, intensity, start):
+    raise ValueError("Evaluation failed")
+
+
+class TestCorruptionGrid(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tmp_dir.name)
+        self.jobs = corruption_grid.grid_jobs(corruptions=["brightness", "fog"], intensities=[1, 2, 3])
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def _assert_results(self, filepath):
+        with h5py.File(filepath, "r") as f:
+            for corruption, intensity in self.jobs:
+                _, batches = _evaluate(corruption, intensity, 0)
+                true_predictions = np.concatenate([batch["predictions"] for batch in batches])
+                grp = f[corruption_grid.subset_name(corruption, intensity)]
+                np.testing.assert_array_equal(grp["predictions"][()], true_predictions)
+                np.testing.assert_array_equal(grp["targets"][()], np.argmax(true_predictions, axis=-1))
+
+    def test_grid_jobs(self):
+        self.assertEqual(len(corruption_grid.grid_jobs()), 90)
+        self.assertEqual(corruption_grid.grid_jobs(include_test=True)[0], ("test", 0))
+
+    def test_serial(self):
+        filepath = self.dir / "serial.h5"
+        corruption_grid.evaluate_grid(_evaluate, self.jobs, filepath)
+        self._assert_results(filepath)
+
+    def test_parallel(self):
+        filepath = self.dir / "parallel.h5"
+        corruption_grid.evaluate_grid(_evaluate, self.jobs, filepath, num_processes=3, num_threads=1)
+        self._assert_results(filepath)
+
+    def test_resume(self):
+        filepath = self.dir / "resume.h5"
+        corruption_grid.evaluate_grid(_evaluate, self.jobs[:2], filepath)
+        evaluated = []
+
+        def evaluate(corruption, intensity, start):
+            evaluated.append((corruption, intensity))
+            return _evaluate(corruption, intensity, start)
+
+        corruption_grid.evaluate_grid(evaluate, self.jobs, filepath)
+        self.assertEqual(evaluated, self.jobs[2:])
+        self._assert_results(filepath)
+
+    def test_worker_error(self):
+        with self.assertRaises(RuntimeError):
+            corruption_grid.evaluate_grid(_failing_evaluate, self.jobs, self.dir / "error.h5", num_processes=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,222 @@
+import unittest
+from unittest import mock
+import tempfile
+import torch
+import torch_testing as tt
+import src.loss as custom_loss
+import src.metrics as metrics
+from src.ensemble import ensemble
+from src.ensemble import simple_regressor
+from src.dataloaders import batched
+from src.ensemble import cifar_resnet
+from src.experiments.cifar10 import resnet_utils
+
+NUM_DECIMALS = 5
+
+
+def _regressor(learning_rate=0.01):
+    model = simple_regressor.Model(layer_sizes=[1, 10, 2],
+                                   loss_function=custom_loss.gaussian_nll_1d)
+    model.optimizer = torch.optim.SGD(model.parameters(), lr=learning_rate)
+    return model
+
+
+class RecordingRegressor(simple_regressor.Model):
+    """Records the training inputs"""
+    def __init__(self):
+        super().__init__(layer_sizes=[1, 10, 2],
+                         loss_function=custom_loss.gaussian_nll_1d)
+        self.optimizer = torch.optim.SGD(self.parameters(), lr=0.01)
+        self.inputs = list()
+
+    def forward(self, x):
+        self.inputs.append(x[:, 0].clone())
+        return super().forward(x)
+
+
+def _regressor_ensemble(ensemble_size, stacked=False):
+    torch.manual_seed(1)
+    prob_ensemble = ensemble.Ensemble(output_size=2, stacked=stacked)
+    prob_ensemble.add_multiple(ensemble_size, _regressor)
+    return prob_ensemble
+
+
+def _regression_loader(shuffle=True):
+    generator = torch.Generator().manual_seed(2)
+    inputs = torch.randn((20, 1), generator=generator)
+    targets = inputs + 0.1 * torch.randn((20, 1), generator=generator)
+    return torch.utils.data.DataLoader(torch.utils.data.TensorDataset(
+        inputs, targets),
+                                       batch_size=5,
+                                       shuffle=shuffle)
+
+
+class TestStackedEnsemble(unittest.TestCase):
+    def test_stacked_logits(self):
+        B, N = 5, 3
+        inputs = torch.randn((B, 1))
+        looped = _regressor_ensemble(N).get_logits(inputs)
+        stacked = _regressor_ensemble(N, stacked=True).get_logits(inputs)
+        self.assertEqual(stacked.size(), (B, N, 2))
+        tt.assert_almost_equal(stacked.detach(), looped.detach())
+
+    def test_stacked_predict(self):
+        B, N = 5, 3
+        inputs = torch.randn((B, 1))
+        looped = _regressor_ensemble(N).predict(inputs)
+        stacked = _regressor_ensemble(N, stacked=True).predict(inputs)
+        self.assertEqual(stacked.size(), (B, N, 2))
+        tt.assert_almost_equal(stacked.detach(), looped.detach())
+
+    def test_restack_after_add_member(self):
+        prob_ensemble = _regressor_ensemble(2, stacked=True)
+        inputs = torch.randn((4, 1))
+        prob_ensemble.get_logits(inputs)
+        prob_ensemble.add_member(_regressor())
+        self.assertEqual(prob_ensemble.get_logits(inputs).size(), (4, 3, 2))
+
+
+class TestParallelTraining(unittest.TestCase):
+    def test_parallel_training_updates_members(self):
+        prob_ensemble = _regressor_ensemble(3)
+        initial = [
+            member.layers[0].weight.clone()
+            for member in prob_ensemble.members
+        ]
+        prob_ensemble.train(_regression_loader(), 2, num_processes=2)
+        for member, weight in zip(prob_ensemble.members, initial):
+            self.assertFalse(torch.equal(member.layers[0].weight, weight))
+
+    def test_parallel_training_deterministic(self):
+        first, second = _regressor_ensemble(2), _regressor_ensemble(2)
+        first.train(_regression_loader(), 2, num_processes=2, seed=3)
+        second.train(_regression_loader(), 2, num_processes=2, seed=3)
+        for member_1, member_2 in zip(first.members, second.members):
+            tt.assert_equal(member_1.layers[0].weight,
+                            member_2.layers[0].weight)
+
+
+    def test_unsupported_combinations(self):
+        prob_ensemble = _regressor_ensemble(2)
+        for kwargs in (dict(num_processes=2, lockstep=True),
+                       dict(num_processes=2, shuffle_members=True),
+                       dict(shuffle_members=True)):
+            with self.subTest(**kwargs):
+                with self.assertRaises(ValueError):
+                    prob_ensemble.train(_regression_loader(), 1, **kwargs)
+
+    def test_non_cpu_fallback(self):
+        prob_ensemble = _regressor_ensemble(2)
+        prob_ensemble.members[0].device = torch.device("cuda")
+        with mock.patch.object(prob_ensemble, "_train_sequential") as train_sequential:
+            with self.assertLogs(prob_ensemble._log, level="WARNING"):
+                prob_ensemble.train(_regression_loader(), 1, num_processes=2)
+        train_sequential.assert_called_once()
+
+
+class TestLockstepTraining(unittest.TestCase):
+    def test_lockstep_equals_sequential(self):
+        sequential, lockstep = _regressor_ensemble(2), _regressor_ensemble(2)
+        sequential.train(_regression_loader(shuffle=False), 2)
+        lockstep.train(_regression_loader(shuffle=False), 2, lockstep=True)
+        for member_1, member_2 in zip(sequential.members, lockstep.members):
+            tt.assert_almost_equal(member_1.layers[0].weight,
+                                   member_2.layers[0].weight)
+
+    def test_lockstep_shuffle_members(self):
+        prob_ensemble = _regressor_ensemble(2)
+        initial = [
+            member.layers[0].weight.clone()
+            for member in prob_ensemble.members
+        ]
+        prob_ensemble.train(_regression_loader(),
+                            2,
+                            lockstep=True,
+                            shuffle_members=True)
+        for member, weight in zip(prob_ensemble.members, initial):
+            self.assertFalse(torch.equal(member.layers[0].weight, weight))
+
+    def test_lockstep_shuffle_members_batch_loader(self):
+        torch.manual_seed(1)
+        prob_ensemble = ensemble.Ensemble(output_size=2)
+        prob_ensemble.add_multiple(2, RecordingRegressor)
+        data_set = _regression_loader().dataset
+        inputs = data_set.tensors[0]
+        num_epochs, batch_size, shuffle_batches = 2, 5, 2
+        prob_ensemble.train(batched.batch_loader(data_set, batch_size=batch_size),
+                            num_epochs,
+                            lockstep=True,
+                            shuffle_members=True,
+                            shuffle_batches=shuffle_batches)
+
+        window_size = batch_size * shuffle_batches
+        member_inputs = list()
+        for member in prob_ensemble.members:
+            self.assertTrue(all(batch.size(0) == batch_size for batch in member.inputs))
+            epochs = torch.cat(member.inputs).reshape((num_epochs, -1))
+            for epoch in epochs:
+                # Every sample once per epoch, shuffled within the windows of the (sequential) loader
+                for start in range(0, inputs.size(0), window_size):
+                    tt.assert_equal(epoch[start:start + window_size].sort()[0],
+                                    inputs[start:start + window_size, 0].sort()[0])
+            member_inputs.append(epochs)
+        self.assertFalse(torch.equal(member_inputs[0], member_inputs[1]))
+
+    def test_lockstep_metrics_per_member(self):
+        sequential, lockstep = _regressor_ensemble(2), _regressor_ensemble(2)
+        for prob_ensemble in (sequential, lockstep):
+            member_metrics = prob_ensemble.add_metrics(
+                [metrics.Metric("MSE", lambda outputs, targets: outputs.sum().item())])
+        self.assertEqual(member_metrics["MSE"],
+                         [member.metrics["MSE"] for member in lockstep.members])
+        self.assertIsNot(member_metrics["MSE"][0], member_metrics["MSE"][1])
+
+        sequential.train(_regression_loader(shuffle=False), 1)
+        lockstep.train(_regression_loader(shuffle=False), 1, lockstep=True)
+        for member_1, member_2 in zip(sequential.members, lockstep.members):
+            self.assertEqual(member_2.metrics["MSE"].counter, 4)
+            self.assertAlmostEqual(member_2.metrics["MSE"].mean(),
+                                   member_1.metrics["MSE"].mean(),
+                                   places=NUM_DECIMALS)
+
+
+class TestEnsembleState(unittest.TestCase):
+    def test_save_load_with_manifest(self):
+        torch.manual_seed(1)
+        prob_ensemble = ensemble.Ensemble(output_size=10)
+        prob_ensemble.add_multiple(
+            2, lambda: cifar_resnet.ResNet(resnet_utils.BasicBlock,
+                                           [1, 1, 1, 1]))
+        inputs = torch.randn((2, 3, 32, 32))
+        for member in prob_ensemble.members:
+            member.eval_mode()
+
+        with tempfile.TemporaryDirectory() as directory:
+            prob_ensemble.save_ensemble_state(directory)
+            loaded = ensemble.Ensemble(output_size=10)
+            loaded.load_ensemble(directory, num_members=1)
+
+        self.assertEqual(len(loaded), 1)
+        loaded.members[0].eval_mode()
+        tt.assert_almost_equal(loaded.members[0](inputs),
+                               prob_ensemble.members[0](inputs))
+
+    def test_iter_with_constructor(self):
+        prob_ensemble = _regressor_ensemble(3)
+        inputs = torch.randn((4, 1))
+        with tempfile.TemporaryDirectory() as directory:
+            prob_ensemble.save_ensemble_state(directory)
+            with self.assertRaises(ValueError):
+                next(ensemble.iter_ensemble_state(directory))
+            members = list(
+                ensemble.iter_ensemble_state(directory,
+                                             constructor=_regressor))
+
+        self.assertEqual(len(members), 3)
+        for loaded, member in zip(members, prob_ensemble.members):
+            tt.assert_almost_equal(loaded.predict(inputs),
+                                   member.predict(inputs))
+
+
+if __name__ == '__main__':
+    unittest.main()
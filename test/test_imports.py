@@ -0,0 +1,32 @@
+import sys
+import unittest
+import subprocess
+from benchmarks import suite
+
+HEAVY_MODULES = ("matplotlib", "tensorflow", "git", "h5py")
+
+
+def _imported_modules(modules):
+    """Heavy modules loaded by importing modules in a fresh interpreter"""
+    code = "import sys\nimport {}\nprint(' '.join(m for m in {!r} if m in sys.modules))".format(
+        ", ".join(modules), HEAVY_MODULES)
+    output = subprocess.run([sys.executable, "-c", code],
+                            cwd=suite.ROOT_DIR,
+                            check=True,
+                            capture_output=True,
+                            text=True).stdout
+    return output.split()
+
+
+class TestImports(unittest.TestCase):
+    def test_core_imports(self):
+        self.assertEqual(_imported_modules(suite.CORE_MODULES), [])
+
+    def test_distilled_imports(self):
+        modules = ("src.distilled.cifar_resnet_distilled", "src.distilled.cifar_resnet_dirichlet",
+                   "src.distilled.norm_inv_wish")
+        self.assertEqual(_imported_modules(modules), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,10 @@
 import unittest
+import numpy as np
 import torch
 import torch_testing as tt
 from src import utils
 from src import metrics
+from src import loss
 
 NUM_DECIMALS = 5
 
@@ -65,6 +67,233 @@ class TestMetrics(unittest.TestCase):
         self.assertAlmostEqual(ep_unc.item(), 0.0349, places=4)
         self.assertAlmostEqual(al_unc.item(), 0.8464, places=4)
 
+    def test_streaming_metric(self):
+        observations = [0.5, 2.0, 1.25, -0.75]
+        metric = metrics.Metric("Test", lambda outputs, targets: outputs)
+        streaming = metrics.StreamingMetric("Test",
+                                            lambda outputs, targets: outputs)
+        for observation in observations:
+            metric.update(None, torch.tensor(observation))
+            streaming.update(None, torch.tensor(observation))
+        self.assertAlmostEqual(streaming.mean(), metric.mean(), places=5)
+        self.assertAlmostEqual(streaming.std(), metric.std(), places=5)
+        self.assertEqual(streaming.counter, len(observations))
+
+    def test_error(self):
+        true_label = torch.tensor([1, 0, 2, 0])
+        predictions = torch.tensor([[0.05, 0.09, 0.05], [0.1, 0.8, 0.1],
+                                    [0.1, 0.2, 0.7], [0.25, 0.5, 0.25]])
+        self.assertAlmostEqual(metrics.error(predictions, true_label), 0.5)
+
+    def test_streaming_metric_tensor_variant(self):
+        true_label = torch.tensor([1, 0, 2, 0])
+        predictions = torch.tensor([[0.05, 0.09, 0.05], [0.1, 0.8, 0.1],
+                                    [0.1, 0.2, 0.7], [0.25, 0.5, 0.25]])
+        streaming = metrics.StreamingMetric("Accuracy", metrics.accuracy)
+        self.assertIs(streaming.function, metrics.accuracy_tensor)
+        accuracy = streaming.function(predictions, true_label)
+        self.assertIsInstance(accuracy, torch.Tensor)
+        self.assertAlmostEqual(accuracy.item(),
+                               metrics.accuracy(predictions, true_label))
+
+        streaming.update(true_label, predictions)
+        streaming.update(true_label[:2], predictions[:2])
+        self.assertAlmostEqual(streaming.mean(), 0.5)
+
+    def test_streaming_metric_merge(self):
+        observations = [0.5, 2.0, 1.25, -0.75, 3.0]
+        metric = metrics.Metric("Test", lambda outputs, targets: outputs)
+        first = metrics.StreamingMetric("Test",
+                                        lambda outputs, targets: outputs)
+        second = metrics.StreamingMetric("Test",
+                                         lambda outputs, targets: outputs)
+        for i, observation in enumerate(observations):
+            metric.update(None, observation)
+            (first if i < 2 else second).update(None, observation)
+        first.merge(second)
+        self.assertAlmostEqual(first.mean(), metric.mean(), places=5)
+        self.assertAlmostEqual(first.std(), metric.std(), places=5)
+
+    def test_ece_equal_width(self):
+        predictions = np.array([[0.9, 0.1], [0.8, 0.2], [0.3, 0.7],
+                                [0.45, 0.55]])
+        labels = np.array([0, 1, 1, 1])
+        ece, (acc, conf, count) = metrics.ece(predictions,
+                                              labels,
+                                              num_bins=4,
+                                              binning="equal_width",
+                                              return_bins=True)
+        # Bin 3: (0.55, 0.7) both correct, bin 4: (0.9, 0.8) one correct
+        np.testing.assert_array_equal(count, [0, 0, 2, 2])
+        np.testing.assert_allclose(acc, [np.nan, np.nan, 1.0, 0.5])
+        np.testing.assert_allclose(conf, [np.nan, np.nan, 0.625, 0.85])
+        self.assertAlmostEqual(ece, 0.5 * 0.375 + 0.5 * 0.35)
+
+    def test_ece_quartiles(self):
+        predictions = np.array([[0.6, 0.4], [0.3, 0.7], [0.2, 0.8],
+                                [0.1, 0.9]])
+        labels = np.array([0, 0, 1, 1])
+        ece, (acc, _, count) = metrics.ece(predictions,
+                                           labels,
+                                           return_bins=True)
+        np.testing.assert_array_equal(count, [1, 1, 1, 1])
+        np.testing.assert_allclose(acc, [1.0, 0.0, 1.0, 1.0])
+        self.assertAlmostEqual(ece, (0.4 + 0.7 + 0.2 + 0.1) / 4)
+
+    def test_uncertainty_separation_dirichlet(self):
+        torch.manual_seed(1)
+        alphas = torch.tensor([[1.0, 2.0, 3.0], [10.0, 0.5, 0.5]])
+        samples = torch.distributions.Dirichlet(alphas).sample(
+            [200000]).transpose(0, 1)
+        sampled = metrics.uncertainty_separation_entropy(samples)
+        closed_form = metrics.uncertainty_separation_dirichlet(alphas)
+        for sampled_unc, closed_form_unc in zip(sampled, closed_form):
+            tt.assert_almost_equal(closed_form_unc,
+                                   sampled_unc,
+                                   decimal=2)
+
+    def test_uncertainty_separation_gaussian_logits(self):
+        torch.manual_seed(1)
+        B, num_samples, D = 3, 100000, 4
+        mean, var = torch.randn((B, D)), 0.5 * torch.rand((B, D))
+        samples = mean.unsqueeze(1) + torch.sqrt(var).unsqueeze(
+            1) * torch.randn((B, num_samples, D))
+        samples = torch.cat((samples, torch.zeros((B, num_samples, 1))),
+                            dim=-1)
+        sampled = metrics.uncertainty_separation_entropy(samples,
+                                                         logits=True)
+        sigma_points = metrics.uncertainty_separation_gaussian_logits(
+            mean, var)
+        for sampled_unc, sigma_point_unc in zip(sampled, sigma_points):
+            tt.assert_almost_equal(sigma_point_unc, sampled_unc, decimal=2)
+
+    def test_classification_evaluator(self):
+        torch.manual_seed(1)
+        B, N, K = 200, 5, 4
+        predictions = torch.softmax(torch.randn((B, N, K)), dim=-1)
+        labels = torch.randint(0, K, (B, ))
+        mean_predictions = predictions.mean(dim=1)
+
+        evaluator = metrics.ClassificationEvaluator(
+            ece_binnings=(("equal_mass", 4), ("equal_width", 10)))
+        for batch in range(0, B, 64):
+            evaluator.update(labels[batch:batch + 64],
+                             predictions[batch:batch + 64])
+        results = evaluator.compute()
+        self.assertEqual(evaluator.counter, B)
+
+        self.assertAlmostEqual(results["accuracy"],
+                               metrics.accuracy(mean_predictions, labels))
+        self.assertAlmostEqual(results["error"], 1 - results["accuracy"])
+        self.assertAlmostEqual(
+            results["ece_equal_mass_4"],
+            metrics.ece(mean_predictions.numpy(), labels.numpy()))
+        self.assertAlmostEqual(
+            results["ece_equal_width_10"],
+            metrics.ece(mean_predictions.numpy(),
+                        labels.numpy(),
+                        num_bins=10,
+                        binning="equal_width"))
+        self.assertAlmostEqual(
+            results["nll"],
+            torch.nn.functional.nll_loss(torch.log(mean_predictions),
+                                         labels).item(),
+            places=NUM_DECIMALS)
+        one_hot = torch.nn.functional.one_hot(labels, K)
+        self.assertAlmostEqual(results["brier"],
+                               torch.sum((mean_predictions - one_hot)**2,
+                                         dim=-1).mean().item(),
+                               places=NUM_DECIMALS)
+        self.assertAlmostEqual(results["entropy"],
+                               metrics.entropy(mean_predictions).mean().item(),
+                               places=NUM_DECIMALS)
+        for name, uncertainty in zip(
+            ("total_uncertainty", "epistemic_uncertainty",
+             "aleatoric_uncertainty"),
+                metrics.uncertainty_separation_entropy(predictions)):
+            self.assertAlmostEqual(results[name],
+                                   uncertainty.mean().item(),
+                                   places=NUM_DECIMALS)
+
+        evaluator.reset()
+        evaluator.update(labels.numpy(), mean_predictions.numpy())
+        self.assertAlmostEqual(evaluator.compute()["accuracy"],
+                               results["accuracy"])
+
+    def test_uncertainty_separation_gaussian_mixture(self):
+        torch.manual_seed(1)
+        B, N = 10, 5
+        mean, var = torch.randn((B, N, 1)), torch.rand((B, N, 1))
+        predictions = torch.cat((mean, var), dim=-1)
+        mixture_mean, total, epistemic, aleatoric = metrics.uncertainty_separation_gaussian_mixture(
+            predictions)
+
+        moments = utils.gaussian_mixture_moments(mean[:, :, 0], var[:, :, 0])
+        tt.assert_almost_equal(mixture_mean[:, 0], moments[0], decimal=NUM_DECIMALS)
+        tt.assert_almost_equal(total[:, 0], moments[1], decimal=NUM_DECIMALS)
+        variance_separation = metrics.uncertainty_separation_variance(
+            predictions.numpy(), None)
+        np.testing.assert_allclose(epistemic[:, 0].numpy(),
+                                   variance_separation[0],
+                                   rtol=1e-5)
+        tt.assert_almost_equal(aleatoric[:, 0], var.mean(dim=1)[:, 0], decimal=NUM_DECIMALS)
+
+        # Chunked and iterated inputs give the same result
+        for chunked in (metrics.uncertainty_separation_gaussian_mixture(
+                predictions, chunk_size=3),
+                        metrics.uncertainty_separation_gaussian_mixture(
+                            predictions.split(4))):
+            for unc, chunked_unc in zip(
+                (mixture_mean, total, epistemic, aleatoric), chunked):
+                tt.assert_almost_equal(chunked_unc, unc, decimal=NUM_DECIMALS)
+
+    def test_uncertainty_separation_norm_inv_wish(self):
+        torch.manual_seed(1)
+        B, D, num_samples = 3, 2, 200000
+        mu_0, psi = torch.randn((B, D)), torch.rand((B, D)) + 0.5
+        # Within the model's nu > D - 1 and below D + 3
+        lambda_, nu = torch.rand((B, 1)) + 0.5, torch.rand((B, 1)) * 3.5 + D - 0.75
+
+        # The variances of the ensemble members, with the density trained by loss.inv_wish_nll
+        var_distribution = torch.distributions.Gamma((D + 3 - nu) / 2,
+                                                     1 / (2 * psi))
+        var = torch.rand((B, 1, D)) + 0.5
+        var.requires_grad_(True)
+        loss.inv_wish_nll((psi, nu), var).backward()
+        nll_grad = var.grad * B
+        var.grad = None
+        (-var_distribution.log_prob(var.squeeze(1)).sum()).backward()
+        tt.assert_almost_equal(nll_grad, var.grad, decimal=NUM_DECIMALS)
+
+        # Sample ensemble members
+        var = var_distribution.sample([num_samples]).transpose(0, 1)
+        mean = mu_0.unsqueeze(1) + torch.sqrt(
+            var / lambda_.unsqueeze(1)) * torch.randn((B, num_samples, D))
+        sampled = metrics.uncertainty_separation_gaussian_mixture(
+            torch.cat((mean, var), dim=-1))
+        closed_form = metrics.uncertainty_separation_norm_inv_wish(
+            (mu_0, lambda_, psi, nu))
+        for sampled_unc, closed_form_unc in zip(sampled, closed_form):
+            np.testing.assert_allclose(closed_form_unc.numpy(),
+                                       sampled_unc.numpy(),
+                                       rtol=0.05,
+                                       atol=0.02)
+
+        chunked = metrics.uncertainty_separation_norm_inv_wish(
+            (mu_0, lambda_, psi, nu), chunk_size=2)
+        for unc, chunked_unc in zip(closed_form, chunked):
+            tt.assert_almost_equal(chunked_unc, unc, decimal=NUM_DECIMALS)
+
+    def test_uncertainty_separation_norm_inv_wish_improper(self):
+        B, D = 2, 2
+        nu = torch.tensor([[D + 2.5], [D + 3.0]])
+        with self.assertLogs(metrics.LOGGER, level="WARNING"):
+            _, total, epistemic, aleatoric = metrics.uncertainty_separation_norm_inv_wish(
+                (torch.zeros((B, D)), torch.ones((B, 1)), torch.ones((B, D)), nu))
+        for unc in (total, epistemic, aleatoric):
+            self.assertTrue(torch.isfinite(unc[0]).all())
+            self.assertTrue(torch.isnan(unc[1]).all())
+
 
 if __name__ == '__main__':
     unittest.main()
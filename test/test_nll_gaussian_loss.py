@@ -64,6 +64,23 @@ class TestGaussianNll(unittest.TestCase):
         self.assertAlmostEqual(gauss_nll.item(), (true_nll_1 + true_nll_2) / 2,
                                places=NUM_DECIMALS)
 
+    def test_multivariate_batch(self):
+        B, N, D = 4, 3, 5
+        torch.manual_seed(1)
+        target = torch.randn((B, N, D))
+        mean = torch.randn((B, D))
+        var = torch.rand((B, D)) + 0.1
+
+        gauss_nll = loss.gaussian_neg_log_likelihood((mean, var), target)
+        true_nll = 0.0
+        for b in range(B):
+            distr = torch.distributions.MultivariateNormal(
+                mean[b], torch.diag(var[b]))
+            true_nll -= distr.log_prob(target[b]).mean() / B
+        self.assertAlmostEqual(gauss_nll.item(),
+                               true_nll.item(),
+                               places=NUM_DECIMALS)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -4,6 +4,37 @@ import src.loss as loss
 import numpy as np
 
 
+def _inv_wish_nll_looped(parameters, target):
+    """Reference: per sample and ensemble member implementation"""
+    psi, nu = parameters
+    normalizer, ll = 0, 0
+    for i in np.arange(target.size(1)):
+        cov_mat = [torch.diag(target[b, i, :]) for b in np.arange(target.size(0))]
+        cov_mat_det = torch.unsqueeze(torch.stack([torch.det(c) for c in cov_mat], dim=0), dim=1)
+        psi_mat = [torch.diag(psi[b, :]) for b in np.arange(target.size(0))]
+        psi_mat_det = torch.unsqueeze(torch.stack([torch.det(p) for p in psi_mat], dim=0), dim=1)
+        normalizer += (-(nu / 2) * torch.log(psi_mat_det) +
+                       (nu * target.size(-1) / 2) * torch.log(torch.tensor(2, dtype=torch.float32)) +
+                       torch.lgamma(nu / 2) +
+                       ((nu - target.size(-1) - 1) / 2) * torch.log(cov_mat_det)) / target.size(1)
+        ll += torch.stack([0.5 * torch.trace(torch.inverse(p) * c) for p, c in zip(psi_mat, cov_mat)],
+                          dim=0) / target.size(1)
+    return torch.mean(normalizer + ll)
+
+
+def _norm_inv_wish_nll_looped(parameters, target):
+    """Reference: per ensemble member implementation"""
+    mu_0, lambda_, psi, nu = parameters
+    mu, var = target
+    nll_gaussian = 0.0
+    for sample in np.arange(mu.size(1)):
+        cov_mat = var[:, sample, :] / lambda_
+        for b in np.arange(mu.size(0)):
+            distr = torch.distributions.MultivariateNormal(mu_0[b], torch.diag(cov_mat[b]))
+            nll_gaussian -= torch.mean(distr.log_prob(mu[b])) / mu.size(0)
+    return nll_gaussian / mu.size(1) + _inv_wish_nll_looped((psi, nu), var)
+
+
 class TestWishartLoss(unittest.TestCase):
     def test_wishart_nll_one_dim(self):
         B, N, D = 1, 1, 1
@@ -51,5 +82,28 @@ class TestWishartLoss(unittest.TestCase):
                                places=5)
 
 
+class TestVectorisedLoss(unittest.TestCase):
+    def setUp(self):
+        torch.manual_seed(1)
+        B, N, D = 6, 4, 3
+        self.mu = torch.randn((B, N, D))
+        self.var = torch.rand((B, N, D)) + 0.5
+        self.mu_0 = torch.randn((B, D))
+        self.lambda_ = torch.rand((B, 1)) + 0.5
+        self.psi = torch.rand((B, D)) + 0.5
+        self.nu = torch.rand((B, 1)) + D + 1
+
+    def test_inv_wish_nll_equivalence(self):
+        nll = loss.inv_wish_nll((self.psi, self.nu), self.var)
+        true_nll = _inv_wish_nll_looped((self.psi, self.nu), self.var)
+        self.assertAlmostEqual(nll.item(), true_nll.item(), places=4)
+
+    def test_norm_inv_wish_nll_equivalence(self):
+        parameters = (self.mu_0, self.lambda_, self.psi, self.nu)
+        nll = loss.norm_inv_wish_nll(parameters, (self.mu, self.var))
+        true_nll = _norm_inv_wish_nll_looped(parameters, (self.mu, self.var))
+        self.assertAlmostEqual(nll.item(), true_nll.item(), places=4)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,73 @@
+"""Test: streaming prediction writer"""
+import tempfile
+import unittest
+from pathlib import Path
+import h5py
+import numpy as np
+from src.experiments.cifar10 import prediction_writer
+
+NUM_SAMPLES = 25
+BATCH_SIZE = 10
+
+
+class TestPredictionWriter(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.filepath = Path(self._tmp_dir.name) / "predictions.h5"
+        rng = np.random.RandomState(0)
+        self.logits = rng.randn(NUM_SAMPLES, 3, 10).astype(np.float32)
+        self.targets = rng.randint(0, 10, NUM_SAMPLES)
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def _write(self, writer, name, start, stop=NUM_SAMPLES):
+        for batch_start in range(start, stop, BATCH_SIZE):
+            batch_stop = min(batch_start + BATCH_SIZE, stop)
+            writer.write(name, batch_start, NUM_SAMPLES, logits=self.logits[batch_start:batch_stop],
+                         targets=self.targets[batch_start:batch_stop])
+
+    def test_write(self):
+        name = "brightness/intensity_1"
+        with prediction_writer.PredictionWriter(self.filepath, chunk_size=8) as writer:
+            self.assertEqual(writer.num_written(name), 0)
+            self._write(writer, name, 0)
+            self.assertFalse(writer.is_complete(name))
+            writer.finish(name)
+            self.assertTrue(writer.is_complete(name))
+
+        with h5py.File(self.filepath, "r") as f:
+            np.testing.assert_array_equal(f[name]["logits"][()], self.logits)
+            np.testing.assert_array_equal(f[name]["targets"][()], self.targets)
+            self.assertEqual(f[name]["logits"].chunks, (8, 3, 10))
+
+    def test_resume(self):
+        with prediction_writer.PredictionWriter(self.filepath) as writer:
+            # Interrupted after the first two batches
+            self._write(writer, "test", 0, stop=2 * BATCH_SIZE)
+
+        with prediction_writer.PredictionWriter(self.filepath) as writer:
+            start = writer.num_written("test")
+            self.assertEqual(start, 2 * BATCH_SIZE)
+            self._write(writer, "test", start)
+            writer.finish("test")
+
+        with h5py.File(self.filepath, "r") as f:
+            np.testing.assert_array_equal(f["test"]["logits"][()], self.logits)
+
+        with prediction_writer.PredictionWriter(self.filepath, resume=False) as writer:
+            self.assertEqual(writer.num_written("test"), 0)
+            self.assertFalse(writer.is_complete("test"))
+
+    def test_float16_logits(self):
+        with prediction_writer.PredictionWriter(self.filepath, dtypes={"logits": np.float16}) as writer:
+            self._write(writer, "test", 0)
+
+        with h5py.File(self.filepath, "r") as f:
+            self.assertEqual(f["test"]["logits"].dtype, np.float16)
+            self.assertEqual(f["test"]["targets"].dtype, self.targets.dtype)
+            np.testing.assert_allclose(f["test"]["logits"][()], self.logits, rtol=1e-3, atol=1e-3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+import unittest
+import tempfile
+from pathlib import Path
+import torch
+import torch_testing as tt
+import src.loss as custom_loss
+from src.ensemble import ensemble
+from src.ensemble import simple_regressor
+from src.distilled import norm_inv_wish
+from src.distilled import teacher_cache
+from src.dataloaders import augmentation
+
+
+class CountingEnsemble(ensemble.Ensemble):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.num_predicted = 0
+
+    def predict(self, inputs, t=None):
+        self.num_predicted += inputs.size(0)
+        # The simple regressors take no temperature, scale the predictions instead
+        predictions = super().predict(inputs)
+        return predictions if t is None else predictions / t
+
+
+class AugmentedSet(torch.utils.data.TensorDataset):
+    """Stand-in for an augmented set, only the augmentation attribute matters"""
+    def __init__(self, *tensors):
+        super().__init__(*tensors)
+        self.augmentation = augmentation.BatchAugmentation(seed=0)
+
+
+def _distilled_model():
+    torch.manual_seed(1)
+    teacher = CountingEnsemble(output_size=2)
+    teacher.add_multiple(
+        3, lambda: simple_regressor.Model(
+            layer_sizes=[1, 10, 2], loss_function=custom_loss.gaussian_nll_1d))
+    return norm_inv_wish.Model(layer_sizes=[1, 10, 4],
+                               target_dim=1,
+                               teacher=teacher)
+
+
+def _loader(num_samples=20):
+    inputs = torch.randn((num_samples, 1))
+    dataset = torch.utils.data.TensorDataset(inputs, torch.zeros(num_samples))
+    return torch.utils.data.DataLoader(teacher_cache.IndexedDataset(dataset),
+                                       batch_size=5,
+                                       shuffle=True)
+
+
+class TestTeacherCache(unittest.TestCase):
+    def test_teacher_called_once_per_sample(self):
+        model = _distilled_model()
+        model.enable_teacher_cache()
+        model.train(_loader(), num_epochs=3)
+        self.assertEqual(model.teacher.num_predicted, 20)
+
+    def test_fill_teacher_cache(self):
+        model = _distilled_model()
+        model.enable_teacher_cache()
+        loader = _loader()
+        model.fill_teacher_cache(loader)
+        model.train(loader, num_epochs=2)
+        self.assertEqual(model.teacher.num_predicted, 20)
+
+    def test_cached_outputs(self):
+        model = _distilled_model()
+        loader = _loader()
+        inputs = loader.dataset.dataset.tensors[0]
+        indices = torch.tensor([3, 1, 7])
+        expected = model.teacher.predict(inputs[indices])
+
+        model.enable_teacher_cache()
+        model.fill_teacher_cache(loader)
+        model.teacher.use_dataset(loader.dataset)
+        model.teacher.set_indices(indices)
+        # The cached outputs are used regardless of the inputs
+        tt.assert_almost_equal(model.teacher.predict(torch.zeros((3, 1))),
+                               expected)
+
+    def test_extra_arguments_not_cached(self):
+        model = _distilled_model()
+        loader = _loader()
+        model.enable_teacher_cache()
+        model.fill_teacher_cache(loader)
+        inputs = loader.dataset.dataset.tensors[0]
+        indices = torch.tensor([3, 1, 7])
+        model.teacher.use_dataset(loader.dataset)
+        model.teacher.set_indices(indices)
+        for t in (1.0, 2.0):
+            model.teacher.predict(inputs[indices], t)
+        self.assertEqual(model.teacher.num_predicted, 20 + 2 * 3)
+        _, storage, _ = model.teacher._active
+        self.assertEqual(list(storage), ["predict"])
+
+    def test_unindexed_batches_not_cached(self):
+        model = _distilled_model()
+        model.enable_teacher_cache()
+        num_samples = 20
+        inputs = torch.randn((num_samples, 1))
+        # Third element which is not a dataset index
+        dataset = torch.utils.data.TensorDataset(inputs, torch.zeros(num_samples),
+                                                 torch.zeros(num_samples))
+        model.train(torch.utils.data.DataLoader(dataset, batch_size=5), num_epochs=2)
+        self.assertEqual(model.teacher.num_predicted, 3 * num_samples)
+
+    def test_released_after_loops(self):
+        model = _distilled_model()
+        model.enable_teacher_cache()
+        loader = _loader()
+        inputs = torch.tensor([[100.0], [200.0], [300.0], [400.0], [500.0]])
+        expected = model.teacher.teacher.predict(inputs)
+        for run in (lambda: model.train(loader, num_epochs=1),
+                    lambda: model.fill_teacher_cache(loader),
+                    lambda: model.calculate_metric_dataloader(loader),
+                    lambda: model.calc_metrics(loader)):
+            run()
+            self.assertIsNone(model.teacher._active)
+            self.assertIsNone(model.teacher._indices)
+            tt.assert_almost_equal(model.teacher.predict(inputs), expected)
+
+    def test_size_mismatch_not_cached(self):
+        model = _distilled_model()
+        loader = _loader()
+        model.enable_teacher_cache()
+        model.fill_teacher_cache(loader)
+        inputs = torch.randn((3, 1))
+        model.teacher.use_dataset(loader.dataset)
+        model.teacher.set_indices(torch.tensor([0, 1]))
+        tt.assert_almost_equal(model.teacher.predict(inputs),
+                               model.teacher.teacher.predict(inputs))
+
+    def test_augmented_set_not_cached(self):
+        model = _distilled_model()
+        model.enable_teacher_cache()
+        num_samples = 20
+        dataset = AugmentedSet(torch.randn((num_samples, 1)), torch.zeros(num_samples))
+        loader = torch.utils.data.DataLoader(teacher_cache.IndexedDataset(dataset),
+                                             batch_size=5)
+        with self.assertLogs(level="WARNING"):
+            model.train(loader, num_epochs=2)
+        self.assertEqual(model.teacher.num_predicted, 3 * num_samples)
+
+    def test_memory_mapped_cache(self):
+        model = _distilled_model()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            model.enable_teacher_cache(cache_dir=cache_dir)
+            model.train(_loader(), num_epochs=2)
+            self.assertEqual(len(list(Path(cache_dir).iterdir())), 1)
+        self.assertEqual(model.teacher.num_predicted, 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import json
+import logging
+import unittest
+import tempfile
+from pathlib import Path
+import torch
+import src.loss as custom_loss
+from src.ensemble import ensemble
+from src.ensemble import simple_regressor
+from src.distilled import norm_inv_wish
+from src.utils_dir import timing
+
+MEMBER_PHASES = {"data", "to_device", "forward", "loss", "backward", "step", "metrics"}
+DISTILLED_PHASES = MEMBER_PHASES | {"teacher"}
+
+
+def _regressor():
+    torch.manual_seed(1)
+    model = simple_regressor.Model(layer_sizes=[1, 10, 2],
+                                   loss_function=custom_loss.gaussian_nll_1d)
+    model.optimizer = torch.optim.SGD(model.parameters(), lr=0.01)
+    return model
+
+
+def _loader(num_samples=20):
+    inputs = torch.randn((num_samples, 1))
+    return torch.utils.data.DataLoader(torch.utils.data.TensorDataset(
+        inputs, inputs),
+                                       batch_size=5,
+                                       shuffle=True)
+
+
+def _read_records(filepath):
+    with filepath.open() as jsonl_file:
+        return [json.loads(line) for line in jsonl_file]
+
+
+class TestTiming(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.output_file = Path(self._tmp_dir.name) / "train.timing.jsonl"
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def _assert_records(self, records, num_epochs, phases):
+        self.assertEqual(len(records), num_epochs)
+        for epoch, record in enumerate(records, start=1):
+            self.assertEqual(record["epoch"], epoch)
+            self.assertEqual(record["num_batches"], 4)
+            self.assertEqual(record["num_samples"], 20)
+            self.assertEqual(set(record["phases"]), phases)
+            self.assertGreater(record["samples_per_s"], 0)
+            phase_time = sum(phase["total"] for phase in record["phases"].values())
+            self.assertLessEqual(phase_time, record["time"] + 1e-6)
+            self.assertIn("loss", record)
+
+    def test_ensemble_member(self):
+        model = _regressor()
+        model.enable_timing(self.output_file)
+        model.train(_loader(), num_epochs=2)
+        self._assert_records(_read_records(self.output_file), 2, MEMBER_PHASES)
+
+    def test_distilled_model(self):
+        teacher = ensemble.Ensemble(output_size=2)
+        teacher.add_multiple(2, _regressor)
+        model = norm_inv_wish.Model(layer_sizes=[1, 10, 4],
+                                    target_dim=1,
+                                    teacher=teacher)
+        timer = model.enable_timing(self.output_file)
+        model.train(_loader(), num_epochs=3)
+        self._assert_records(_read_records(self.output_file), 3, DISTILLED_PHASES)
+        self.assertEqual(len(timer.history), 3)
+
+    def test_lockstep_ensemble(self):
+        prob_ensemble = ensemble.Ensemble(output_size=2)
+        prob_ensemble.add_multiple(2, _regressor)
+        output_files = [self.output_file.with_name("member_{}.timing.jsonl".format(ind)) for ind in range(2)]
+        for shuffle_members in (False, True):
+            with self.subTest(shuffle_members=shuffle_members):
+                for member, output_file in zip(prob_ensemble.members, output_files):
+                    output_file.unlink(missing_ok=True)
+                    member.enable_timing(output_file)
+                prob_ensemble.train(_loader(), 2, lockstep=True, shuffle_members=shuffle_members)
+                for output_file in output_files:
+                    self._assert_records(_read_records(output_file), 2,
+                                         (MEMBER_PHASES - {"data"}) | {"wait"})
+
+    def test_disabled(self):
+        model = _regressor()
+        model.enable_timing(self.output_file)
+        model.disable_timing()
+        model.train(_loader(), num_epochs=1)
+        self.assertFalse(self.output_file.exists())
+
+    def test_file_next_to_log(self):
+        logger = logging.getLogger("test_timing")
+        handler = logging.FileHandler(str(Path(self._tmp_dir.name) / "20200101_000000.log"))
+        logger.addHandler(handler)
+        try:
+            self.assertEqual(timing.timing_file(logger),
+                             Path(self._tmp_dir.name) / "20200101_000000.timing.jsonl")
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 import torch
 from src import utils
+from src.utils_dir import plot
 import torch_testing as tt
 
 
@@ -25,6 +26,52 @@ class TestMetrics(unittest.TestCase):
         tt.assert_equal(ind, torch.tensor([0, 1]))
         tt.assert_equal(value, torch.tensor([0.9, 0.7]))
 
+    def test_sparsification_error(self):
+        torch.manual_seed(1)
+        num_points, num_partitions = 50, 11
+        y_true, y_pred = torch.randn((num_points, 1)), torch.randn(
+            (num_points, 1))
+        uncert_meas = torch.rand((num_points, 2))
+        x, sparse_err, oracle = utils.sparsification_error(
+            y_true, y_pred, uncert_meas, num_partitions)
+        self.assertEqual(sparse_err.size(), (num_partitions, 2))
+
+        squared_error = ((y_true - y_pred)**2).reshape(num_points)
+        order = torch.argsort(uncert_meas[:, 1], descending=True)
+        full_error = squared_error.mean()
+        for i, ind in enumerate(range(0, num_points, 5)):
+            self.assertAlmostEqual(x[i].item(), ind / num_points, places=5)
+            self.assertAlmostEqual(
+                sparse_err[i, 1].item(),
+                (squared_error[order[ind:]].mean() / full_error).item(),
+                places=5)
+            oracle_error = torch.sort(squared_error)[0][:num_points - ind]
+            self.assertAlmostEqual(oracle[i].item(),
+                                   (oracle_error.mean() / full_error).item(),
+                                   places=5)
+        self.assertEqual(sparse_err[-1, 1].item(), 0.0)
+
+    def test_ause_single_measure(self):
+        torch.manual_seed(1)
+        num_points, num_partitions = 50, 11
+        y_true, y_pred = torch.randn((num_points, 1)), torch.randn(
+            (num_points, 1))
+        uncert_meas = torch.rand((num_points, 1))
+        _, sparse_err, _ = utils.sparsification_error(y_true, y_pred,
+                                                      uncert_meas,
+                                                      num_partitions)
+        self.assertEqual(sparse_err.size(), (num_partitions, ))
+
+        ause = utils.ause(y_true, y_pred, uncert_meas, num_partitions)
+        self.assertEqual(ause.dim(), 0)
+        self.assertAlmostEqual(
+            ause.item(),
+            utils.ause(y_true, y_pred, uncert_meas[:, 0],
+                       num_partitions).item())
+        self.assertAlmostEqual(
+            plot.ause(y_true, y_pred, uncert_meas, num_partitions).item(),
+            ause.item())
+
 
 if __name__ == '__main__':
     unittest.main()